@@ -0,0 +1,585 @@
+"""Banc d'essai de montée en charge de Chauffage Électrique Fil Pilote FR.
+
+Charge l'intégration (climate, sensor, binary_sensor) dans le noyau de substitution
+de `standin.py`, avec N pièces synthétiques, puis rejoue des flux d'événements
+température / fenêtre / présence. Résultat en JSON, une entrée par taille :
+
+    python benchmarks/bench_scale.py --rooms 5 50 500 --output bench_output.txt
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import standin  # noqa: E402
+
+standin.install()
+
+from homeassistant.components.climate import HVACMode  # noqa: E402
+
+DOMAIN = "electric_heater"
+
+
+class SelectRecorder:
+    """Service `select.select_option` de substitution : mémorise chaque ordre."""
+
+    def __init__(self, hass: standin.StandInHass, latency: float):
+        self.hass = hass
+        self.latency = latency
+        self.commands: list[tuple[float, str, str]] = []
+        hass.services.async_register("select", "select_option", self._handle)
+        standin.MQTT.subscribers[:] = [self._handle_mqtt]
+
+    async def _handle(self, data: dict) -> None:
+        self.commands.append((time.perf_counter(), data["entity_id"], data["option"]))
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        # Le module fil pilote confirme son nouvel état, comme Zigbee2MQTT.
+        self.hass.states.async_set(data["entity_id"], data["option"])
+
+    async def _handle_mqtt(self, topic: str, payload: str) -> None:
+        # zigbee2mqtt/bench_fp_<i>/set -> select.bench_fp_<i>
+        await self._handle({"entity_id": f"select.{topic.split('/')[1]}", "option": json.loads(payload)["fil_pilote"]})
+
+    def since(self, index: int) -> list[tuple[float, str, str]]:
+        return self.commands[index:]
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 3)
+
+
+def _central_data(args: argparse.Namespace) -> dict:
+    return {
+        "type": "central",
+        "name": "Chauffage Central",
+        "temp_method": "average",
+        "presence_sensor": "sensor.bench_persons",
+        "comfort_temp": 20.0,
+        "comfort_m1_temp": 19.0,
+        "comfort_m2_temp": 18.0,
+        "eco_temp": 16.5,
+        "frost_temp": 7.0,
+        "min_temp": 7.0,
+        "max_temp": 30.0,
+        "temp_step": 0.1,
+        "dispatch_concurrency": args.concurrency,
+        "command_rate": args.command_rate,
+        "command_burst": args.command_burst,
+        "startup_jitter": 0,
+        "min_dwell": args.min_dwell,
+        "presence_delay": 0,
+        "write_window": args.write_window,
+        "power_sensor": "sensor.bench_power",
+        "power_limit": args.power_limit,
+        "shed_order": "off",
+        "command_backend": args.backend,
+        "instrumentation": args.instrumentation,
+        "tariff_color_sensor": "sensor.bench_tempo",
+        "tariff_offpeak_sensor": "sensor.bench_hphc",
+    }
+
+
+def _zone_central_data(args: argparse.Namespace, zone: int) -> dict:
+    """Central d'une zone supplémentaire, sans délestage, présence ni tarif."""
+    data = _central_data(args)
+    for key in ("presence_sensor", "power_sensor", "power_limit", "tariff_color_sensor", "tariff_offpeak_sensor"):
+        del data[key]
+    data.update(name=f"Zone {zone}", zone=f"zone_{zone}")
+    return data
+
+
+def _room_data(index: int, pwm: bool, zones: int = 1) -> dict:
+    data = {
+        "type": "room",
+        "name": f"Pièce {index}",
+        "fil_pilote_select": f"select.bench_fp_{index}",
+        "temperature_sensor": f"sensor.bench_temp_{index}",
+        "window_sensors": f"binary_sensor.bench_window_{index}",
+        "area": 10 + index % 20,
+        "wattage": 1000,
+        "priority": 1 + index % 5,
+    }
+    if index % zones:
+        data["zone"] = f"zone_{index % zones}"
+    if pwm:
+        data["regulation"] = "pwm"
+    return data
+
+
+async def _run_size(rooms: int, args: argparse.Namespace) -> dict:
+    rng = random.Random(args.seed)
+    hass = standin.StandInHass()
+    recorder = SelectRecorder(hass, args.select_latency)
+
+    for i in range(rooms):
+        hass.states.async_set(f"sensor.bench_temp_{i}", round(rng.uniform(17, 21), 1))
+        hass.states.async_set(f"binary_sensor.bench_window_{i}", "off")
+        hass.states.async_set(f"select.bench_fp_{i}", "eco")
+        standin.ENTITY_REGISTRY.register(f"select.bench_fp_{i}", f"0x{i:016x}_fil_pilote_zigbee2mqtt", f"dev_{i}", f"bench_fp_{i}")
+    hass.states.async_set("sensor.bench_persons", 2)
+    hass.states.async_set("sensor.bench_power", 0, {"unit_of_measurement": "W"})
+    hass.states.async_set("sensor.bench_tempo", "Bleu")
+    hass.states.async_set("sensor.bench_hphc", "HP")
+
+    gc.collect()
+    tracemalloc.start()
+    mem_before = tracemalloc.take_snapshot()
+    setup_start = time.perf_counter()
+    await hass.config_entries.async_add(standin.ConfigEntry(DOMAIN, _central_data(args), "central"))
+    for zone in range(1, args.zones):
+        await hass.config_entries.async_add(standin.ConfigEntry(DOMAIN, _zone_central_data(args, zone), f"zone_{zone}"))
+    for i in range(rooms):
+        await hass.config_entries.async_add(
+            standin.ConfigEntry(DOMAIN, _room_data(i, i < rooms * args.pwm_ratio, args.zones), f"room_{i}")
+        )
+    await hass.async_block_till_done()
+    setup_s = time.perf_counter() - setup_start
+    gc.collect()
+    mem_after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    mem_per_room = sum(s.size_diff for s in mem_after.compare_to(mem_before, "filename")) / max(rooms, 1)
+
+    # Présence qui change pendant le démarrage : les pièces la reprennent à leur tour dans l'étalement.
+    mark = len(recorder.commands)
+    for persons in (0, 2):
+        hass.states.async_set("sensor.bench_persons", persons)
+        await hass.async_block_till_done()
+    presence_boot_staggered = not recorder.since(mark)
+
+    mark = len(recorder.commands)
+    await hass.async_start()
+    await hass.async_block_till_done()
+    startup_commands = len(recorder.since(mark))
+
+    # Flux de températures : aucun ordre attendu (hors PWM), mesure du débit brut.
+    writes_before = hass.states.writes
+    mark = len(recorder.commands)
+    start = time.perf_counter()
+    for _ in range(args.temperature_events):
+        i = rng.randrange(rooms)
+        hass.states.async_set(f"sensor.bench_temp_{i}", round(rng.uniform(17, 21), 1))
+    await hass.async_block_till_done()
+    temp_elapsed = time.perf_counter() - start
+    temp_commands = len(recorder.since(mark))
+    temp_writes = hass.states.writes - writes_before - args.temperature_events
+
+    # Pics hors bornes et valeurs non numériques : ignorés sans toucher à la mesure, à l'agrégat ni au modèle.
+    room = next(e for e in hass.config_entries.platform_entities["room_0"] if e.entity_id.startswith("climate."))
+    aggregator = room._coordinator.aggregator
+    for value in (20.1, 20.15):
+        hass.states.async_set("sensor.bench_temp_0", value)
+        await hass.async_block_till_done()
+    reading = (room._current_temp, aggregator.value, room._model._anchor)
+    spikes_ignored = reading[0] is not None
+    for value in (85, -40, "abc"):
+        hass.states.async_set("sensor.bench_temp_0", value)
+        await hass.async_block_till_done()
+        spikes_ignored &= (room._current_temp, aggregator.value, room._model._anchor) == reading
+    hass.states.async_set("sensor.bench_temp_0", "unavailable")
+    await hass.async_block_till_done()
+    spikes_ignored &= room._current_temp is None
+    hass.states.async_set("sensor.bench_temp_0", 20.2)
+    await hass.async_block_till_done()
+    spikes_ignored &= room._current_temp is not None
+
+    # Fenêtres : latence capteur → ordre fil pilote, un seul ordre attendu par événement.
+    latencies = []
+    window_commands = 0
+    for _ in range(args.window_events):
+        i = rng.randrange(rooms)
+        window = f"binary_sensor.bench_window_{i}"
+        new_state = "off" if hass.states.get(window).state == "on" else "on"
+        mark = len(recorder.commands)
+        start = time.perf_counter()
+        hass.states.async_set(window, new_state)
+        await hass.async_block_till_done()
+        commands = recorder.since(mark)
+        window_commands += len(commands)
+        if commands:
+            latencies.append((commands[0][0] - start) * 1000)
+
+    # Changement de preset central : un ordre par radiateur de sa zone au plus, aucun ailleurs.
+    zone_rooms = len(range(0, rooms, args.zones))
+    central = next(e for e in hass.config_entries.platform_entities["central"] if e.entity_id.startswith("climate."))
+    preset_changes = []
+    for preset in ("eco", "comfort", "comfort_-1"):
+        mark = len(recorder.commands)
+        start = time.perf_counter()
+        await central.async_set_preset_mode(preset)
+        await hass.async_block_till_done()
+        commands = recorder.since(mark)
+        preset_changes.append({
+            "preset": preset,
+            "commands": len(commands),
+            "commands_per_room": len(commands) / zone_rooms,
+            "other_zone_commands": sum(1 for _, select_id, _ in commands if int(select_id.rsplit("_", 1)[1]) % args.zones),
+            "first_command_ms": _ms(commands[0][0] - start) if commands else None,
+            "last_command_ms": _ms(commands[-1][0] - start) if commands else None,
+        })
+
+    # Dérogations : boost de quelques pièces, changement du central, puis fin des boosts par le minuteur commun.
+    boosted = [f"room_{i}" for i in range(0, min(rooms, 10 * args.zones), args.zones)]
+    room_entities = {
+        entry_id: next(e for e in hass.config_entries.platform_entities[entry_id] if e.entity_id.startswith("climate."))
+        for entry_id in boosted
+    }
+    for entry_id in boosted:
+        hass.config_entries.async_update_entry(hass.config_entries.async_get_entry(entry_id), options={"boost_duration": 0.005})
+    await hass.async_block_till_done()
+    mark = len(recorder.commands)
+    for entity in room_entities.values():
+        await entity.async_set_preset_mode("boost")
+    await hass.async_block_till_done()
+    boost_commands = recorder.since(mark)
+    mark = len(recorder.commands)
+    await central.async_set_preset_mode("eco")
+    await hass.async_block_till_done()
+    boosted_selects = {f"select.bench_fp_{entry_id.split('_')[1]}" for entry_id in boosted}
+    central_commands = recorder.since(mark)
+    timers = hass.data[DOMAIN]["services"].overrides
+    pending_timers = len(timers)
+    mark = len(recorder.commands)
+    await asyncio.sleep(0.4)
+    await hass.async_block_till_done()
+    expiry_commands = recorder.since(mark)
+    overrides = {
+        "rooms": len(boosted),
+        "boost_commands": len(boost_commands),
+        "boost_other_room_commands": sum(1 for _, select_id, _ in boost_commands if select_id not in boosted_selects),
+        "central_commands_to_boosted": sum(1 for _, select_id, _ in central_commands if select_id in boosted_selects),
+        "pending_timers": pending_timers,
+        "expiry_commands": len(expiry_commands),
+        "expiry_options": sorted({option for _, _, option in expiry_commands}),
+    }
+    await central.async_set_preset_mode("comfort_-1")
+    await hass.async_block_till_done()
+
+    # Programme : l'inscription arme le minuteur commun sur la prochaine transition, le retrait le libère.
+    from custom_components.electric_heater.schedule import WeeklySchedule
+
+    schedules = hass.data[DOMAIN]["services"].schedules
+    unregister = schedules.register("bench", WeeklySchedule("* 06:00=comfort 22:00=eco"), lambda preset: None)
+    schedule_armed = len(schedules._timer) == 1 and schedules.next_transition("bench") is not None
+    unregister()
+    schedule_armed = schedule_armed and not len(schedules._timer)
+
+    # Tarif : jour rouge en heures pleines (baisse plafonnée), heures creuses, puis retour au bleu.
+    optimizer = hass.data[DOMAIN]["zones"]["central"].tariff
+    tariff = {"steps": []}
+    rebuilds = optimizer.rebuilds
+    for entity_id, value in (("sensor.bench_tempo", "Rouge"), ("sensor.bench_hphc", "HC"), ("sensor.bench_tempo", "Bleu")):
+        mark = len(recorder.commands)
+        start = time.perf_counter()
+        hass.states.async_set(entity_id, value)
+        await hass.async_block_till_done()
+        commands = recorder.since(mark)
+        tariff["steps"].append({
+            "input": f"{entity_id.split('_')[-1]}={value}",
+            "level": optimizer.level,
+            "commands": len(commands),
+            "options": sorted({option for _, _, option in commands}),
+            "last_command_ms": _ms(commands[-1][0] - start) if commands else None,
+        })
+    tariff["plan_rebuilds"] = optimizer.rebuilds - rebuilds
+    # Couleur changée sans changer de cran (heures creuses) : l'attribut publié suit quand même.
+    tariff_attribute = hass.states.get(central.entity_id).attributes.get("tariff") or {}
+    tariff_attribute_current = optimizer.color is not None and tariff_attribute.get("color") == optimizer.color
+    hass.states.async_set("sensor.bench_hphc", "HP")
+    await hass.async_block_till_done()
+
+    # Anti-cycles courts : contact de fenêtre qui bat et compteur de présence qui oscille entre 0 et 1.
+    dispatcher = hass.data[DOMAIN]["services"].dispatcher
+    min_dwell, dispatcher.guard.min_dwell = dispatcher.guard.min_dwell, 0.2
+    hass.states.async_set("binary_sensor.bench_window_0", "off")
+    await hass.async_block_till_done()
+    await asyncio.sleep(0.25)
+    mark = len(recorder.commands)
+    suppressed = dispatcher.guard.suppressed
+    for n in range(20):
+        hass.states.async_set("binary_sensor.bench_window_0", "on" if n % 2 == 0 else "off")
+        await hass.async_block_till_done()
+    flap_commands = recorder.since(mark)
+    mark = len(recorder.commands)
+    await asyncio.sleep(0.3)
+    await hass.async_block_till_done()
+    release_commands = recorder.since(mark)
+    central_entry = hass.config_entries.async_get_entry("central")
+    hass.config_entries.async_update_entry(central_entry, options={"presence_delay": 0.2})
+    await hass.async_block_till_done()
+    mark = len(recorder.commands)
+    for n in range(10):
+        hass.states.async_set("sensor.bench_persons", n % 2)
+        await hass.async_block_till_done()
+    await asyncio.sleep(0.3)
+    await hass.async_block_till_done()
+    presence_flap_commands = len(recorder.since(mark))
+    dispatcher.guard.min_dwell = min_dwell
+    # Une option modifiée pendant le délai d'absence ne doit pas annuler le passage en éco.
+    hass.states.async_set("sensor.bench_persons", 0)
+    await hass.async_block_till_done()
+    hass.config_entries.async_update_entry(central_entry, options={"presence_delay": 0.2, "comfort_temp": 20.5})
+    await hass.async_block_till_done()
+    await asyncio.sleep(0.3)
+    await hass.async_block_till_done()
+    absence_after_options = central.extra_state_attributes["auto_eco_active"]
+    hass.config_entries.async_update_entry(central_entry, options={})
+    hass.states.async_set("sensor.bench_persons", 2)
+    await hass.async_block_till_done()
+    short_cycle = {
+        "window_flaps": 20,
+        "flap_commands": len(flap_commands),
+        "suppressed": dispatcher.guard.suppressed - suppressed,
+        "release_commands": [option for _, _, option in release_commands],
+        "final_state": hass.states.get("select.bench_fp_0").state,
+        "presence_flaps": 10,
+        "presence_flap_commands": presence_flap_commands,
+        "absence_after_options": absence_after_options,
+    }
+
+    # Présence : passage à 0 personne puis retour, chaque bascule est un changement logique.
+    presence = []
+    for persons in (0, 2):
+        mark = len(recorder.commands)
+        start = time.perf_counter()
+        hass.states.async_set("sensor.bench_persons", persons)
+        await hass.async_block_till_done()
+        commands = recorder.since(mark)
+        presence.append({
+            "persons": persons,
+            "commands": len(commands),
+            "last_command_ms": _ms(commands[-1][0] - start) if commands else None,
+        })
+
+    # Pièce hors de l'ordre du central : sa consigne suit les consignes du central, son preset l'absence.
+    room_sync = {}
+    await room.async_set_preset_mode("eco")
+    eco_before = central._temps["eco"]
+    await central.async_set_preset_temperature("eco", eco_before - 0.5)
+    await hass.async_block_till_done()
+    room_sync["override_target_follows"] = room._target_temp == eco_before - 0.5
+    await central.async_set_preset_temperature("eco", eco_before)
+    await room.async_set_hvac_mode(HVACMode.HEAT)
+    await central.async_set_preset_mode("eco")
+    room._scheduled_preset = "comfort"
+    room._sync_from_central()
+    hass.states.async_set("sensor.bench_persons", 0)
+    await hass.async_block_till_done()
+    room_sync["absence_caps_scheduled"] = room._preset_mode == "eco"
+    hass.states.async_set("sensor.bench_persons", 2)
+    await hass.async_block_till_done()
+    room_sync["presence_restores_scheduled"] = room._preset_mode == "comfort"
+    room._scheduled_preset = None
+    await central.async_set_preset_mode("comfort_-1")
+    await hass.async_block_till_done()
+
+    # Délestage : dépassement de la puissance souscrite, un ordre par pièce délestée.
+    mark = len(recorder.commands)
+    start = time.perf_counter()
+    hass.states.async_set("sensor.bench_power", args.power_limit * 1.2, {"unit_of_measurement": "W"})
+    await hass.async_block_till_done()
+    commands = recorder.since(mark)
+    shedder = hass.data[DOMAIN]["zones"]["central"].shedder
+    load_shedding = {
+        "shed_rooms": shedder.shed_count,
+        "commands": len(commands),
+        "first_command_ms": _ms(commands[0][0] - start) if commands else None,
+        "reaction_ms": round(shedder.last_reaction_ms, 3) if shedder.last_reaction_ms is not None else None,
+    }
+
+    dispatcher = hass.data[DOMAIN]["services"].dispatcher
+    acks = {k: v for k, v in vars(dispatcher.ack_stats).items() if k != "last_confirm_ms"}
+    publisher = dispatcher.publisher
+    mqtt = {
+        "published": publisher.published,
+        "last_batch_size": publisher.last_batch_size,
+        "last_publish_ms": round(publisher.last_latency_ms, 3) if publisher.last_latency_ms is not None else None,
+    } if publisher else None
+
+    # Options : modifications en place puis rechargements ; le nombre d'abonnements ne doit pas dériver.
+    entry = hass.config_entries.async_get_entry("room_0")
+    listeners_before = _subscriber_counts(hass)
+    start = time.perf_counter()
+    for n in range(args.reloads):
+        options = {"hysteresis": 0.5 if n % 2 else 0.2, "filter_window": 3 + n % 2}
+        hass.config_entries.async_update_entry(entry, options=options)
+        await hass.async_block_till_done()
+    in_place_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    for n in range(args.reloads):
+        # Activer ou couper la détection de fenêtre ajoute ou retire une entité : rechargement.
+        hass.config_entries.async_update_entry(entry, options={**entry.options, "window_detection": n % 2 == 0})
+        await hass.async_block_till_done()
+    hass.config_entries.async_update_entry(entry, options={})
+    await hass.async_block_till_done()
+    reload_ms = (time.perf_counter() - start) * 1000
+    options_changes = {
+        "changes": args.reloads,
+        "listeners_before": listeners_before,
+        "listeners_after": _subscriber_counts(hass),
+        "in_place_ms": round(in_place_ms / args.reloads, 3) if args.reloads else None,
+        "reload_ms": round(reload_ms / (args.reloads + 1), 3) if args.reloads else None,
+    }
+
+    for entry in list(hass.config_entries.async_entries(DOMAIN)):
+        await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+    # Tout décharger rend les services partagés : plus aucune écoute ni minuteur de l'intégration.
+    released = DOMAIN not in hass.data and hass.bus.listener_count() == 0
+
+    return {
+        "rooms": rooms,
+        "zones": args.zones,
+        "setup_s": round(setup_s, 4),
+        "setup_ms_per_room": round(setup_s * 1000 / max(rooms, 1), 3),
+        "memory_per_room_bytes": round(mem_per_room),
+        "startup_commands": startup_commands,
+        "temperature": {
+            "events": args.temperature_events,
+            "events_per_s": round(args.temperature_events / temp_elapsed) if temp_elapsed else None,
+            "commands": temp_commands,
+            "state_writes": temp_writes,
+        },
+        "window": {
+            "events": args.window_events,
+            "commands_per_event": window_commands / args.window_events if args.window_events else None,
+            "latency_ms_p50": round(statistics.median(latencies), 3) if latencies else None,
+            "latency_ms_max": round(max(latencies), 3) if latencies else None,
+        },
+        "preset_changes": preset_changes,
+        "overrides": overrides,
+        "tariff": tariff,
+        "short_cycle": short_cycle,
+        "presence": presence,
+        "load_shedding": load_shedding,
+        "mqtt": mqtt,
+        "acks": acks,
+        "options": options_changes,
+        "checks": {
+            "absence_survives_options": absence_after_options,
+            "listeners_stable": options_changes["listeners_before"] == options_changes["listeners_after"],
+            "presence_boot_staggered": presence_boot_staggered,
+            "schedule_armed": schedule_armed,
+            "services_released": released,
+            "spikes_ignored": spikes_ignored,
+            "tariff_attribute_current": tariff_attribute_current,
+            **{f"room_{name}": ok for name, ok in room_sync.items()},
+        },
+        "event_to_command_ms": dispatcher.instrumentation.latency.as_dict() if args.instrumentation else None,
+    }
+
+
+def _subscriber_counts(hass: standin.StandInHass) -> dict[str, int]:
+    """Abonnements au bus et, zone par zone, aux états partagés du coordinateur."""
+    counts = {"bus": hass.bus.listener_count()}
+    for zone, coordinator in hass.data[DOMAIN]["zones"].items():
+        counts[f"{zone}.central"] = len(coordinator._central_listeners)
+        counts[f"{zone}.rooms"] = len(coordinator._room_listeners)
+        counts[f"{zone}.aggregator"] = len(coordinator.aggregator._listeners)
+        counts[f"{zone}.aggregator_sensors"] = len(coordinator.aggregator.sensors)
+        counts[f"{zone}.shedder"] = len(coordinator.shedder._listeners)
+        counts[f"{zone}.tariff"] = len(coordinator.tariff._listeners)
+        counts[f"{zone}.energy"] = len(coordinator.energy._total_listeners) + sum(
+            len(meter.listeners) for meter in coordinator.energy._meters.values()
+        )
+    return counts
+
+
+async def _check_queue_reconfigure() -> bool:
+    """Régression : régler la file pendant un envoi ne doit bloquer ni cet ordre ni les suivants."""
+    from custom_components.electric_heater.command_queue import CommandQueue
+
+    started, release, sent = asyncio.Event(), asyncio.Event(), []
+
+    async def sender(select_id: str, option: str) -> None:
+        if not sent and not started.is_set():
+            started.set()
+            await release.wait()
+        sent.append(select_id)
+
+    queue = CommandQueue(sender, rate=10000, burst=10000, concurrency=1)
+    first = queue.submit("select.a", "eco", 1)
+    await asyncio.wait_for(started.wait(), 1)
+    # Le deuxième ordre attend une place libre quand la file est réglée à nouveau.
+    later = [queue.submit("select.b", "eco", 1)]
+    await asyncio.sleep(0)
+    queue.configure(10000, 10000, 1)
+    later.append(queue.submit("select.c", "eco", 1))
+    release.set()
+    try:
+        results = await asyncio.wait_for(asyncio.gather(first, *later), 1)
+    except asyncio.TimeoutError:
+        return False
+    return all(results) and sent == ["select.a", "select.b", "select.c"]
+
+
+def _failed_checks(report: dict) -> list[str]:
+    failed = [name for name, ok in report["checks"].items() if not ok]
+    for result in report["results"]:
+        failed += [f"{result['rooms']} pièces : {name}" for name, ok in result.get("checks", {}).items() if not ok]
+    return failed
+
+
+def _manifest_version() -> str:
+    manifest = ROOT / "custom_components" / DOMAIN / "manifest.json"
+    return json.loads(manifest.read_text(encoding="utf-8"))["version"]
+
+
+async def _main(args: argparse.Namespace) -> dict:
+    results = [await _run_size(rooms, args) for rooms in args.rooms]
+    return {
+        "integration_version": _manifest_version(),
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "parameters": {k: v for k, v in vars(args).items() if k != "output"},
+        "checks": {"queue_reconfigure_in_flight": await _check_queue_reconfigure()},
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rooms", type=int, nargs="+", default=[5, 50, 500])
+    parser.add_argument("--temperature-events", type=int, default=5000)
+    parser.add_argument("--window-events", type=int, default=50)
+    parser.add_argument("--backend", choices=("select", "mqtt"), default="select", help="envoi des ordres")
+    parser.add_argument("--instrumentation", action="store_true", help="active l'instrumentation de débogage")
+    parser.add_argument("--zones", type=int, default=1, help="nombre de zones, pièces réparties en alternance")
+    parser.add_argument("--pwm-ratio", type=float, default=0.0, help="part des pièces en régulation PWM")
+    parser.add_argument("--select-latency", type=float, default=0.0, help="latence simulée d'un ordre (s)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--command-rate", type=float, default=10000.0, help="débit du seau à jetons (ordres/s)")
+    parser.add_argument("--command-burst", type=int, default=10000)
+    parser.add_argument("--write-window", type=float, default=0.0)
+    parser.add_argument("--power-limit", type=float, default=9000.0, help="puissance souscrite simulée (W)")
+    parser.add_argument("--min-dwell", type=float, default=0.0, help="maintien minimal d'un ordre (s)")
+    parser.add_argument("--reloads", type=int, default=10, help="modifications d'options en place puis rechargements")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", type=Path, help="fichier JSON (sortie standard par défaut)")
+    args = parser.parse_args()
+
+    report = asyncio.run(_main(args))
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    if failed := _failed_checks(report):
+        sys.exit(f"Vérifications en échec : {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
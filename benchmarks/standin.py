@@ -0,0 +1,724 @@
+"""Noyau Home Assistant de substitution pour les bancs d'essai hors ligne.
+
+Fournit juste ce que l'intégration importe (`homeassistant.*`) : machine d'états,
+bus d'événements, registre de services, minuteurs, entrées de configuration et
+classes d'entités minimales. Tout tourne dans la boucle asyncio courante, sans
+réseau ni disque. À n'utiliser que pour mesurer l'intégration, jamais en production.
+"""
+from __future__ import annotations
+
+import asyncio
+import enum
+import importlib
+import re
+import sys
+import time
+import types
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+_INSTALLED = False
+
+
+# --- Cœur : états, bus, services --------------------------------------------------------
+
+
+def callback(func):
+    func._hass_callback = True
+    return func
+
+
+class Event:
+    __slots__ = ("event_type", "data", "time_fired")
+
+    def __init__(self, event_type: str, data: dict | None = None):
+        self.event_type = event_type
+        self.data = data or {}
+        self.time_fired = time.monotonic()
+
+
+class State:
+    __slots__ = ("entity_id", "state", "attributes", "last_updated")
+
+    def __init__(self, entity_id: str, state: str, attributes: dict | None = None):
+        self.entity_id = entity_id
+        self.state = state
+        self.attributes = dict(attributes or {})
+        self.last_updated = time.monotonic()
+
+
+class StateMachine:
+    def __init__(self, hass: "StandInHass"):
+        self._hass = hass
+        self._states: dict[str, State] = {}
+        self.writes = 0
+
+    def get(self, entity_id: str) -> State | None:
+        return self._states.get(entity_id)
+
+    def async_all(self) -> list[State]:
+        return list(self._states.values())
+
+    def async_set(self, entity_id: str, new_state: Any, attributes: dict | None = None) -> None:
+        new_state = str(new_state.value if isinstance(new_state, enum.Enum) else new_state)
+        old = self._states.get(entity_id)
+        attributes = dict(attributes or {})
+        if old and old.state == new_state and old.attributes == attributes:
+            return
+        state = State(entity_id, new_state, attributes)
+        self._states[entity_id] = state
+        self.writes += 1
+        self._hass.bus.async_fire(
+            "state_changed", {"entity_id": entity_id, "old_state": old, "new_state": state}
+        )
+
+
+class EventBus:
+    def __init__(self, hass: "StandInHass"):
+        self._hass = hass
+        self._listeners: dict[str, list[Callable]] = {}
+        self._state_listeners: dict[str, list[Callable]] = {}
+        self.fired = 0
+
+    def async_listen(self, event_type: str, listener: Callable) -> Callable[[], None]:
+        self._listeners.setdefault(event_type, []).append(listener)
+        return lambda: self._listeners[event_type].remove(listener)
+
+    def async_fire(self, event_type: str, event_data: dict | None = None) -> None:
+        self.fired += 1
+        event = Event(event_type, event_data)
+        if event_type == "state_changed":
+            for listener in list(self._state_listeners.get(event.data["entity_id"], ())):
+                self._hass.async_run_job(listener, event)
+        for listener in list(self._listeners.get(event_type, ())):
+            self._hass.async_run_job(listener, event)
+
+    def track_state(self, entity_ids: list[str], listener: Callable) -> Callable[[], None]:
+        for entity_id in entity_ids:
+            self._state_listeners.setdefault(entity_id, []).append(listener)
+
+        def _remove() -> None:
+            for entity_id in entity_ids:
+                self._state_listeners[entity_id].remove(listener)
+
+        return _remove
+
+    def listener_count(self) -> int:
+        return sum(map(len, self._listeners.values())) + sum(map(len, self._state_listeners.values()))
+
+
+class ServiceRegistry:
+    def __init__(self, hass: "StandInHass"):
+        self._hass = hass
+        self._services: dict[tuple[str, str], Callable] = {}
+
+    def async_register(self, domain: str, service: str, handler: Callable) -> None:
+        self._services[(domain, service)] = handler
+
+    async def async_call(self, domain: str, service: str, data: dict | None = None, blocking: bool = False, **_):
+        handler = self._services[(domain, service)]
+        result = handler(dict(data or {}))
+        if asyncio.iscoroutine(result):
+            if blocking:
+                await result
+            else:
+                self._hass.async_create_task(result)
+
+
+class ConfigEntry:
+    def __init__(self, domain: str, data: dict, entry_id: str, title: str = "", options: dict | None = None):
+        self.domain = domain
+        self.data = data
+        self.options = options or {}
+        self.entry_id = entry_id
+        self.title = title
+        self._on_unload: list[Callable] = []
+        self.update_listeners: list[Callable] = []
+
+    def async_on_unload(self, func: Callable) -> None:
+        self._on_unload.append(func)
+
+    def add_update_listener(self, listener: Callable) -> Callable[[], None]:
+        self.update_listeners.append(listener)
+        return lambda: self.update_listeners.remove(listener)
+
+
+class ConfigEntries:
+    def __init__(self, hass: "StandInHass"):
+        self._hass = hass
+        self._entries: dict[str, ConfigEntry] = {}
+        self.platform_entities: dict[str, list["Entity"]] = {}
+
+    def async_entries(self, domain: str | None = None) -> list[ConfigEntry]:
+        return [e for e in self._entries.values() if domain is None or e.domain == domain]
+
+    def async_get_entry(self, entry_id: str) -> ConfigEntry | None:
+        return self._entries.get(entry_id)
+
+    async def async_add(self, entry: ConfigEntry) -> None:
+        self._entries[entry.entry_id] = entry
+        integration = importlib.import_module(f"custom_components.{entry.domain}")
+        await integration.async_setup_entry(self._hass, entry)
+
+    async def async_forward_entry_setups(self, entry: ConfigEntry, platforms: list[str]) -> None:
+        for platform in platforms:
+            module = importlib.import_module(f"custom_components.{entry.domain}.{platform}")
+            added: list[Entity] = []
+            await module.async_setup_entry(self._hass, entry, added.extend)
+            for entity in added:
+                await self._hass.async_add_entity(platform, entity)
+            self.platform_entities.setdefault(entry.entry_id, []).extend(added)
+
+    async def async_unload_platforms(self, entry: ConfigEntry, platforms: list[str]) -> bool:
+        for entity in self.platform_entities.pop(entry.entry_id, []):
+            await entity.async_remove()
+        return True
+
+    async def async_unload(self, entry_id: str) -> bool:
+        entry = self._entries[entry_id]
+        integration = importlib.import_module(f"custom_components.{entry.domain}")
+        result = await integration.async_unload_entry(self._hass, entry)
+        for func in entry._on_unload:
+            func()
+        entry._on_unload.clear()
+        return result
+
+    async def async_reload(self, entry_id: str) -> None:
+        entry = self._entries[entry_id]
+        await self.async_unload(entry_id)
+        integration = importlib.import_module(f"custom_components.{entry.domain}")
+        await integration.async_setup_entry(self._hass, entry)
+
+    def async_update_entry(self, entry: ConfigEntry, data: dict | None = None, options: dict | None = None, **_) -> bool:
+        if data is not None:
+            entry.data = data
+        if options is not None:
+            entry.options = options
+        for listener in list(entry.update_listeners):
+            self._hass.async_create_task(listener(self._hass, entry))
+        return True
+
+
+class CoreState(enum.Enum):
+    not_running = "NOT_RUNNING"
+    starting = "STARTING"
+    running = "RUNNING"
+
+
+class StandInHass:
+    """Substitut de `HomeAssistant` limité à ce qu'utilise l'intégration."""
+
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.data: dict[str, Any] = {}
+        self.state = CoreState.not_running
+        self.states = StateMachine(self)
+        self.bus = EventBus(self)
+        self.services = ServiceRegistry(self)
+        self.config_entries = ConfigEntries(self)
+        # Intégrations chargées : le courtier MQTT en mémoire est toujours disponible.
+        self.config = types.SimpleNamespace(components={"mqtt"})
+        self.storage: dict[str, Any] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._start_callbacks: list[Callable] = []
+
+    @property
+    def is_running(self) -> bool:
+        return self.state is CoreState.running
+
+    def async_run_job(self, target: Callable, *args) -> None:
+        # Tout s'exécute dans la boucle : le substitut n'a pas d'exécuteur.
+        result = target(*args)
+        if asyncio.iscoroutine(result):
+            self.async_create_task(result)
+
+    async def async_add_executor_job(self, target: Callable, *args):
+        return target(*args)
+
+    def async_create_task(self, coro, name: str | None = None, eager_start: bool = True) -> asyncio.Task:
+        task = self.loop.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    create_task = async_create_task
+    async_create_background_task = async_create_task
+
+    async def async_add_entity(self, platform: str, entity: "Entity") -> None:
+        entity.hass = self
+        entity.platform = platform
+        if not getattr(entity, "entity_id", None):
+            entity.entity_id = f"{platform}.{_slug(entity.unique_id or entity.name or 'entity')}"
+        await entity.async_added_to_hass()
+        entity.async_write_ha_state()
+
+    async def async_start(self) -> None:
+        self.state = CoreState.running
+        for cb in self._start_callbacks:
+            self.async_run_job(cb, self)
+        self._start_callbacks.clear()
+        await self.async_block_till_done()
+
+    async def async_block_till_done(self) -> None:
+        current = asyncio.current_task()
+        while True:
+            await asyncio.sleep(0)
+            pending = [t for t in asyncio.all_tasks() if t is not current and not t.done()]
+            if not pending:
+                return
+            await asyncio.wait(pending)
+
+
+def _parse_datetime(text: str) -> datetime | None:
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        return None
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^a-z0-9_]+", "_", str(text).lower()).strip("_")
+
+
+# --- Aides (helpers) --------------------------------------------------------------------
+
+
+def async_track_state_change_event(hass: StandInHass, entity_ids, action: Callable) -> Callable[[], None]:
+    if isinstance(entity_ids, str):
+        entity_ids = [entity_ids]
+    return hass.bus.track_state(list(entity_ids), action)
+
+
+def async_call_later(hass: StandInHass, delay, action: Callable) -> Callable[[], None]:
+    delay = delay.total_seconds() if hasattr(delay, "total_seconds") else delay
+    handle = hass.loop.call_later(max(0.0, delay), lambda: hass.async_run_job(action, None))
+    return handle.cancel
+
+
+def async_track_time_interval(hass: StandInHass, action: Callable, interval) -> Callable[[], None]:
+    seconds = interval.total_seconds() if hasattr(interval, "total_seconds") else interval
+    handle: asyncio.TimerHandle | None = None
+
+    def _tick() -> None:
+        nonlocal handle
+        handle = hass.loop.call_later(seconds, _tick)
+        hass.async_run_job(action, None)
+
+    handle = hass.loop.call_later(seconds, _tick)
+    return lambda: handle.cancel()
+
+
+def async_at_started(hass: StandInHass, at_start_cb: Callable) -> Callable[[], None]:
+    if hass.is_running:
+        hass.async_run_job(at_start_cb, hass)
+        return lambda: None
+    hass._start_callbacks.append(at_start_cb)
+    return lambda: at_start_cb in hass._start_callbacks and hass._start_callbacks.remove(at_start_cb)
+
+
+def async_dispatcher_connect(hass: StandInHass, signal: str, target: Callable) -> Callable[[], None]:
+    # Les signaux passent par le bus : ils comptent dans `listener_count`.
+    return hass.bus.async_listen(f"dispatcher_{signal}", lambda event: target(*event.data["args"]))
+
+
+def async_dispatcher_send(hass: StandInHass, signal: str, *args) -> None:
+    hass.bus.async_fire(f"dispatcher_{signal}", {"args": args})
+
+
+class Store:
+    def __init__(self, hass: StandInHass, version: int, key: str, **_):
+        self.hass = hass
+        self.key = key
+        self.saves = 0
+        self._handle: asyncio.TimerHandle | None = None
+
+    async def async_load(self):
+        return self.hass.storage.get(self.key)
+
+    async def async_save(self, data) -> None:
+        if self._handle:
+            self._handle.cancel()
+            self._handle = None
+        self.saves += 1
+        self.hass.storage[self.key] = data
+
+    def async_delay_save(self, data_func: Callable, delay: float = 0) -> None:
+        if self._handle:
+            self._handle.cancel()
+
+        def _write() -> None:
+            self._handle = None
+            self.saves += 1
+            self.hass.storage[self.key] = data_func()
+
+        self._handle = self.hass.loop.call_later(delay, _write)
+
+
+class _DeviceRegistry:
+    def __init__(self):
+        self.devices: dict[str, types.SimpleNamespace] = {}
+
+    def async_get_or_create(self, **kwargs):
+        return types.SimpleNamespace(**kwargs)
+
+    def async_get(self, device_id: str):
+        return self.devices.get(device_id)
+
+
+class _EntityRegistry:
+    def __init__(self):
+        self.entities: dict[str, types.SimpleNamespace] = {}
+
+    def async_get(self, entity_id: str):
+        return self.entities.get(entity_id)
+
+    def register(self, entity_id: str, unique_id: str, device_id: str, device_name: str) -> None:
+        self.entities[entity_id] = types.SimpleNamespace(unique_id=unique_id, device_id=device_id, platform="mqtt")
+        _DEVICE_REGISTRY.devices[device_id] = types.SimpleNamespace(id=device_id, name=device_name)
+
+
+_DEVICE_REGISTRY = _DeviceRegistry()
+ENTITY_REGISTRY = _EntityRegistry()
+
+
+class MqttStandIn:
+    """Courtier MQTT en mémoire : chaque publication est remise aux abonnés, dans l'ordre."""
+
+    def __init__(self):
+        self.subscribers: list[Callable[[str, str], Any]] = []
+        self.published = 0
+
+    async def async_publish(self, hass, topic: str, payload: str, qos: int = 0, retain: bool = False) -> None:
+        self.published += 1
+        for subscriber in list(self.subscribers):
+            result = subscriber(topic, payload)
+            if asyncio.iscoroutine(result):
+                await result
+
+
+MQTT = MqttStandIn()
+
+
+# --- Constantes et entités --------------------------------------------------------------
+
+
+class HVACMode(enum.StrEnum):
+    OFF = "off"
+    HEAT = "heat"
+    AUTO = "auto"
+
+
+class HVACAction(enum.StrEnum):
+    OFF = "off"
+    HEATING = "heating"
+    IDLE = "idle"
+
+
+class ClimateEntityFeature(enum.IntFlag):
+    TARGET_TEMPERATURE = 1
+    PRESET_MODE = 16
+    TURN_OFF = 128
+    TURN_ON = 256
+
+
+class UnitOfTemperature(enum.StrEnum):
+    CELSIUS = "°C"
+
+
+class UnitOfPower(enum.StrEnum):
+    WATT = "W"
+
+
+class UnitOfEnergy(enum.StrEnum):
+    KILO_WATT_HOUR = "kWh"
+
+
+class UnitOfTime(enum.StrEnum):
+    HOURS = "h"
+    MINUTES = "min"
+    SECONDS = "s"
+    MILLISECONDS = "ms"
+
+
+class EntityCategory(enum.StrEnum):
+    CONFIG = "config"
+    DIAGNOSTIC = "diagnostic"
+
+
+class SensorDeviceClass(enum.StrEnum):
+    TEMPERATURE = "temperature"
+    POWER = "power"
+    ENERGY = "energy"
+    DURATION = "duration"
+
+
+class SensorStateClass(enum.StrEnum):
+    MEASUREMENT = "measurement"
+    TOTAL = "total"
+    TOTAL_INCREASING = "total_increasing"
+
+
+class BinarySensorDeviceClass(enum.StrEnum):
+    HEAT = "heat"
+    OCCUPANCY = "occupancy"
+    RUNNING = "running"
+    WINDOW = "window"
+    SAFETY = "safety"
+    PROBLEM = "problem"
+
+
+class NumberMode(enum.StrEnum):
+    AUTO = "auto"
+    BOX = "box"
+    SLIDER = "slider"
+
+
+class Entity:
+    entity_id: str | None = None
+    hass: StandInHass | None = None
+    platform: str | None = None
+    _attr_name: str | None = None
+    _attr_unique_id: str | None = None
+    _attr_has_entity_name = False
+    _attr_should_poll = False
+    _attr_extra_state_attributes: dict | None = None
+    _attr_entity_category = None
+    _attr_entity_registry_enabled_default = True
+    _attr_translation_key: str | None = None
+    _attr_device_class = None
+    _attr_icon: str | None = None
+    _attr_available = True
+    _unrecorded_attributes: frozenset = frozenset()
+
+    @property
+    def name(self):
+        return self._attr_name
+
+    @property
+    def unique_id(self):
+        return self._attr_unique_id
+
+    @property
+    def available(self) -> bool:
+        return self._attr_available
+
+    @property
+    def should_poll(self) -> bool:
+        return self._attr_should_poll
+
+    @property
+    def state(self):
+        return None
+
+    @property
+    def state_attributes(self) -> dict | None:
+        return None
+
+    @property
+    def extra_state_attributes(self) -> dict | None:
+        return self._attr_extra_state_attributes
+
+    @property
+    def enabled(self) -> bool:
+        return True
+
+    async def async_added_to_hass(self) -> None:
+        return None
+
+    async def async_will_remove_from_hass(self) -> None:
+        return None
+
+    def async_on_remove(self, func: Callable[[], None]) -> None:
+        self.__dict__.setdefault("_on_remove", []).append(func)
+
+    async def async_remove(self) -> None:
+        await self.async_will_remove_from_hass()
+        for func in self.__dict__.pop("_on_remove", []):
+            func()
+
+    def async_write_ha_state(self) -> None:
+        attributes = dict(self.state_attributes or {})
+        attributes.update(self.extra_state_attributes or {})
+        state = self.state
+        self.hass.states.async_set(self.entity_id, "unknown" if state is None else state, attributes)
+
+    def async_schedule_update_ha_state(self, force_refresh: bool = False) -> None:
+        self.async_write_ha_state()
+
+
+class RestoreEntity(Entity):
+    async def async_get_last_state(self):
+        return None
+
+
+class ClimateEntity(Entity):
+    _attr_hvac_modes: list = []
+    _attr_preset_modes: list | None = None
+    _attr_supported_features = 0
+    _attr_temperature_unit = "°C"
+    _attr_precision = 0.1
+    _attr_min_temp = 7.0
+    _attr_max_temp = 35.0
+    _attr_target_temperature_step = None
+    _attr_current_temperature = None
+    _attr_target_temperature = None
+    _attr_hvac_mode = None
+    _attr_hvac_action = None
+    _attr_preset_mode = None
+
+    @property
+    def state(self):
+        return self.hvac_mode
+
+    @property
+    def hvac_mode(self):
+        return self._attr_hvac_mode
+
+    @property
+    def hvac_action(self):
+        return self._attr_hvac_action
+
+    @property
+    def preset_mode(self):
+        return self._attr_preset_mode
+
+    @property
+    def current_temperature(self):
+        return self._attr_current_temperature
+
+    @property
+    def target_temperature(self):
+        return self._attr_target_temperature
+
+    @property
+    def state_attributes(self) -> dict:
+        return {
+            "current_temperature": self.current_temperature,
+            "temperature": self.target_temperature,
+            "hvac_action": self.hvac_action,
+            "preset_mode": self.preset_mode,
+        }
+
+
+class SensorEntity(Entity):
+    _attr_native_value = None
+    _attr_native_unit_of_measurement = None
+    _attr_state_class = None
+    _attr_suggested_display_precision = None
+    _attr_last_reset = None
+
+    @property
+    def native_value(self):
+        return self._attr_native_value
+
+    @property
+    def state(self):
+        return self.native_value
+
+
+class RestoreSensor(SensorEntity, RestoreEntity):
+    async def async_get_last_sensor_data(self):
+        return None
+
+
+class BinarySensorEntity(Entity):
+    _attr_is_on: bool | None = None
+
+    @property
+    def is_on(self):
+        return self._attr_is_on
+
+    @property
+    def state(self):
+        if self.is_on is None:
+            return None
+        return "on" if self.is_on else "off"
+
+
+class NumberEntity(Entity):
+    _attr_native_value = None
+    _attr_native_min_value = 0.0
+    _attr_native_max_value = 100.0
+    _attr_native_step = None
+    _attr_native_unit_of_measurement = None
+    _attr_mode = "auto"
+
+    @property
+    def native_value(self):
+        return self._attr_native_value
+
+    @property
+    def state(self):
+        return self.native_value
+
+
+def install() -> None:
+    """Enregistre le substitut sous le nom `homeassistant` dans `sys.modules`."""
+    global _INSTALLED
+    if _INSTALLED:
+        return
+
+    def module(name: str, **attrs) -> types.ModuleType:
+        mod = types.ModuleType(name)
+        mod.__dict__.update(attrs)
+        mod.__path__ = []
+        sys.modules[name] = mod
+        parent, _, child = name.rpartition(".")
+        if parent:
+            setattr(sys.modules[parent], child, mod)
+        return mod
+
+    module("homeassistant")
+    module("homeassistant.core", HomeAssistant=StandInHass, callback=callback, Event=Event, State=State, CoreState=CoreState)
+    module(
+        "homeassistant.const",
+        UnitOfTemperature=UnitOfTemperature, UnitOfPower=UnitOfPower, UnitOfEnergy=UnitOfEnergy, UnitOfTime=UnitOfTime,
+        PRECISION_TENTHS=0.1, EntityCategory=EntityCategory, CONF_NAME="name",
+        EVENT_HOMEASSISTANT_STARTED="homeassistant_started", STATE_ON="on", STATE_OFF="off",
+        STATE_UNKNOWN="unknown", STATE_UNAVAILABLE="unavailable", ATTR_ENTITY_ID="entity_id",
+    )
+    module("homeassistant.config_entries", ConfigEntry=ConfigEntry, ConfigFlow=object, OptionsFlow=object)
+    module("homeassistant.components")
+    module(
+        "homeassistant.components.climate",
+        ClimateEntity=ClimateEntity, ClimateEntityFeature=ClimateEntityFeature, HVACAction=HVACAction, HVACMode=HVACMode,
+    )
+    module(
+        "homeassistant.components.sensor",
+        SensorEntity=SensorEntity, RestoreSensor=RestoreSensor, SensorDeviceClass=SensorDeviceClass,
+        SensorStateClass=SensorStateClass,
+    )
+    module(
+        "homeassistant.components.binary_sensor",
+        BinarySensorEntity=BinarySensorEntity, BinarySensorDeviceClass=BinarySensorDeviceClass,
+    )
+    module("homeassistant.components.number", NumberEntity=NumberEntity, NumberMode=NumberMode)
+    module("homeassistant.components.mqtt", async_publish=MQTT.async_publish)
+    module("homeassistant.helpers")
+    module("homeassistant.helpers.entity", Entity=Entity)
+    module(
+        "homeassistant.helpers.dispatcher",
+        async_dispatcher_connect=async_dispatcher_connect, async_dispatcher_send=async_dispatcher_send,
+    )
+    module(
+        "homeassistant.helpers.event",
+        async_track_state_change_event=async_track_state_change_event,
+        async_call_later=async_call_later,
+        async_track_time_interval=async_track_time_interval,
+    )
+    module("homeassistant.helpers.restore_state", RestoreEntity=RestoreEntity)
+    module("homeassistant.helpers.start", async_at_started=async_at_started)
+    module("homeassistant.helpers.storage", Store=Store)
+    module(
+        "homeassistant.helpers.device_registry",
+        async_get=lambda hass: _DEVICE_REGISTRY, EVENT_DEVICE_REGISTRY_UPDATED="device_registry_updated",
+    )
+    module("homeassistant.helpers.entity_registry", async_get=lambda hass: ENTITY_REGISTRY)
+    module("homeassistant.util")
+    module(
+        "homeassistant.util.dt",
+        now=lambda: datetime.now().astimezone(), utcnow=lambda: datetime.now(timezone.utc),
+        as_utc=lambda moment: moment.astimezone(timezone.utc), as_local=lambda moment: moment.astimezone(),
+        parse_datetime=_parse_datetime,
+    )
+    _INSTALLED = True
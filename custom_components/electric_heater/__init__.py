@@ -1,29 +1,175 @@
 """Chauffage Électrique Fil Pilote FR - Intégration complète."""
+import logging
+
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_NAME
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers import device_registry as dr
-from .const import DOMAIN
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from .const import (
+    DOMAIN, CONF_DISPATCH_CONCURRENCY, DEFAULT_DISPATCH_CONCURRENCY, CONF_TEMP_METHOD, CONF_TEMP_METHOD_AVERAGE,
+    CONF_WRITE_WINDOW, DEFAULT_WRITE_WINDOW, CONF_COMMAND_RATE, DEFAULT_COMMAND_RATE, CONF_COMMAND_BURST,
+    DEFAULT_COMMAND_BURST, CONF_STARTUP_JITTER, DEFAULT_STARTUP_JITTER, CONF_POWER_SENSOR, CONF_POWER_LIMIT,
+    CONF_SHED_ORDER, DEFAULT_SHED_ORDER, CONF_OUTDOOR_SENSOR, CONF_COMMAND_BACKEND, BACKEND_SELECT,
+    CONF_MQTT_BASE_TOPIC, DEFAULT_MQTT_BASE_TOPIC, CONF_INSTRUMENTATION, CENTRAL, CONF_PRESENCE_SENSOR,
+    LIVE_OPTIONS, SIGNAL_OPTIONS_UPDATED, CONF_TARIFF_COLOR_SENSOR, CONF_TARIFF_NEXT_COLOR_SENSOR,
+    CONF_TARIFF_OFFPEAK_SENSOR, CONF_TARIFF_CALENDAR, CONF_TARIFF_OFFPEAK_HOURS, CONF_TARIFF_FLOOR, CONF_TARIFF_PREHEAT,
+    CONF_MIN_DWELL, DEFAULT_MIN_DWELL, DEFAULT_ZONE, ROOM
+)
+from .coordinator import (
+    HeatingCoordinator, HeatingServices, energy_storage_key, entry_config, zone_of, zone_device_id
+)
+from .energy import EnergyAccounting
+from .thermal import ThermalModels
+from .tariff import TariffCalendar
+
+_LOGGER = logging.getLogger(__name__)
 
-PLATFORMS = ["climate", "sensor", "binary_sensor"]
+PLATFORMS = ["climate", "sensor", "binary_sensor", "number"]
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    data = hass.data.setdefault(DOMAIN, {"zones": {}, "configs": {}})
+    if "services" not in data:
+        data["services"] = HeatingServices(hass)
+        await data["services"].async_load()
+    zone = zone_of(entry)
+    if zone not in data["zones"]:
+        data["zones"][zone] = HeatingCoordinator(hass, data["services"], zone)
+        await data["zones"][zone].async_load()
+    coordinator: HeatingCoordinator = data["zones"][zone]
     if entry.data.get("type") == "central":
+        _configure_dispatch(hass, {*data["configs"], entry.entry_id})
+        coordinator.aggregator.set_method(entry.data.get(CONF_TEMP_METHOD, CONF_TEMP_METHOD_AVERAGE))
+        coordinator.write_window = entry.data.get(CONF_WRITE_WINDOW, DEFAULT_WRITE_WINDOW)
+        coordinator.startup_jitter = entry.data.get(CONF_STARTUP_JITTER, DEFAULT_STARTUP_JITTER)
+        coordinator.shed_order = entry.data.get(CONF_SHED_ORDER) or DEFAULT_SHED_ORDER
+        coordinator.outdoor_sensor = entry.data.get(CONF_OUTDOOR_SENSOR)
+        coordinator.instrumentation.enabled = any(
+            e.data.get(CONF_INSTRUMENTATION)
+            for e in hass.config_entries.async_entries(DOMAIN)
+            if e.data.get("type") == CENTRAL
+        )
+        if entry.data.get(CONF_POWER_SENSOR) and entry.data.get(CONF_POWER_LIMIT):
+            entry.async_on_unload(
+                coordinator.shedder.async_start(entry.data[CONF_POWER_SENSOR], entry.data[CONF_POWER_LIMIT])
+            )
+        await _async_start_tariff(hass, entry, coordinator)
         device_registry = dr.async_get(hass)
         device_registry.async_get_or_create(
             config_entry_id=entry.entry_id,
-            identifiers={(DOMAIN, "electric_heater_central")},
-            name="Chauffage Central",
+            identifiers={(DOMAIN, zone_device_id(zone))},
+            name=entry.data.get(CONF_NAME) or "Chauffage Central",
             manufacturer="XAV59213",
             model="Fil Pilote Français",
             sw_version="1.0.0",
         )
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
-    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
+    data["configs"][entry.entry_id] = entry_config(entry)
+    entry.async_on_unload(entry.add_update_listener(async_update_options))
     return True
 
+def _configure_dispatch(hass: HomeAssistant, loaded: set[str]) -> None:
+    """Un seul réseau Zigbee, une seule file : l'envoi des ordres se règle sur un seul central.
+
+    Le central de la zone par défaut fait foi ; s'il n'est pas chargé, le premier central
+    chargé d'une autre zone prend le relais (ses réglages d'envoi sont recopiés du premier
+    central à sa création). Sans aucun central chargé, les derniers réglages restent en place.
+    """
+    data = hass.data[DOMAIN]
+    centrals = [
+        e for e in hass.config_entries.async_entries(DOMAIN) if e.data.get("type") == CENTRAL and e.entry_id in loaded
+    ]
+    owner = next((e for e in centrals if zone_of(e) == DEFAULT_ZONE), next(iter(centrals), None))
+    if owner is None or data.get("dispatch_entry") == owner.entry_id:
+        return
+    data["dispatch_entry"] = owner.entry_id
+    data["services"].dispatcher.configure(
+        owner.data.get(CONF_DISPATCH_CONCURRENCY, DEFAULT_DISPATCH_CONCURRENCY),
+        owner.data.get(CONF_COMMAND_RATE, DEFAULT_COMMAND_RATE),
+        owner.data.get(CONF_COMMAND_BURST, DEFAULT_COMMAND_BURST),
+        owner.data.get(CONF_COMMAND_BACKEND, BACKEND_SELECT),
+        owner.data.get(CONF_MQTT_BASE_TOPIC, DEFAULT_MQTT_BASE_TOPIC),
+        owner.data.get(CONF_MIN_DWELL, DEFAULT_MIN_DWELL),
+    )
+
+async def _async_start_tariff(hass: HomeAssistant, entry: ConfigEntry, coordinator: HeatingCoordinator) -> None:
+    """Démarre l'optimisation tarifaire si une couleur Tempo ou un calendrier local est configuré."""
+    config = entry_config(entry)
+    calendar = None
+    if path := config.get(CONF_TARIFF_CALENDAR):
+        try:
+            calendar = await hass.async_add_executor_job(TariffCalendar.load, path)
+        except (OSError, ValueError) as err:
+            _LOGGER.error("Calendrier tarifaire %s illisible : %s", path, err)
+    if not calendar and not config.get(CONF_TARIFF_COLOR_SENSOR):
+        return
+    entry.async_on_unload(coordinator.tariff.async_start(
+        config.get(CONF_TARIFF_COLOR_SENSOR),
+        config.get(CONF_TARIFF_NEXT_COLOR_SENSOR),
+        config.get(CONF_TARIFF_OFFPEAK_SENSOR),
+        calendar,
+        config.get(CONF_TARIFF_OFFPEAK_HOURS),
+        config.get(CONF_TARIFF_FLOOR),
+        config.get(CONF_TARIFF_PREHEAT),
+    ))
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
-    return await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    data = hass.data[DOMAIN]
+    data["configs"].pop(entry.entry_id, None)
+    unloaded = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    if data.get("dispatch_entry") == entry.entry_id:
+        data.pop("dispatch_entry")
+        _configure_dispatch(hass, set(data["configs"]))
+    zone = zone_of(entry)
+    if unloaded and not any(
+        zone_of(e) == zone for e in hass.config_entries.async_entries(DOMAIN) if e.entry_id in data["configs"]
+    ):
+        # Dernière entrée de la zone : son état (central, délestage, tarif) ne doit pas survivre à un nouvel ajout.
+        if coordinator := data["zones"].pop(zone, None):
+            await coordinator.async_unload()
+    if unloaded and not data["configs"]:
+        # Dernière entrée déchargée : les services partagés libèrent leurs écoutes et minuteurs.
+        await data["services"].async_unload()
+        hass.data.pop(DOMAIN)
+    return unloaded
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Pièce supprimée : son modèle thermique et ses compteurs ne sont plus enregistrés."""
+    if entry.data.get("type") != ROOM:
+        return
+    data = hass.data.get(DOMAIN, {})
+    if services := data.get("services"):
+        thermal = services.thermal
+    else:
+        thermal = ThermalModels(hass)
+        await thermal.async_load()
+    await thermal.async_forget(entry.entry_id)
+    zone = zone_of(entry)
+    if coordinator := data.get("zones", {}).get(zone):
+        energy = coordinator.energy
+    else:
+        energy = EnergyAccounting(hass, energy_storage_key(zone))
+        await energy.async_load()
+    await energy.async_forget(entry.entry_id)
+
+def _needs_reload(applied: dict, config: dict) -> bool:
+    """Vrai si le changement ne peut pas être appliqué en place (ajout ou retrait d'entités)."""
+    if any(applied.get(key) != config.get(key) for key in applied.keys() | config.keys() if key not in LIVE_OPTIONS):
+        return True
+    return any(
+        bool(str(applied.get(key) or "").strip()) != bool(str(config.get(key) or "").strip())
+        for key in (CONF_PRESENCE_SENSOR, "window_sensors")
+    )
 
-async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
-    await async_unload_entry(hass, entry)
-    await async_setup_entry(hass, entry)
+async def async_update_options(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Applique les options aux entités vivantes ; ne recharge l'entrée que si ses entités changent."""
+    configs = hass.data[DOMAIN]["configs"]
+    config = entry_config(entry)
+    applied = configs.get(entry.entry_id)
+    if applied == config:
+        return
+    if applied is None or _needs_reload(applied, config):
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
+    configs[entry.entry_id] = config
+    async_dispatcher_send(hass, SIGNAL_OPTIONS_UPDATED.format(entry.entry_id), config)
@@ -0,0 +1,161 @@
+"""Agrégation incrémentale des températures pour Chauffage Électrique Fil Pilote FR."""
+from bisect import bisect_left, insort
+from typing import Callable
+
+from .const import (
+    CONF_TEMP_METHOD_AVERAGE,
+    CONF_TEMP_METHOD_WEIGHTED,
+    CONF_TEMP_METHOD_MEDIAN,
+    CONF_TEMP_METHOD_MIN,
+    CONF_TEMP_METHOD_MAX,
+    CONF_TEMP_METHOD_TRIMMED,
+    TRIMMED_MEAN_RATIO,
+)
+
+# Les sommes courantes sont recalculées de temps en temps pour éviter la dérive flottante.
+RESYNC_EVERY = 1000
+
+
+class TemperatureAggregator:
+    """Température centrale tenue à jour capteur par capteur.
+
+    Chaque mise à jour ne touche que le capteur concerné : somme et somme pondérée
+    courantes pour les moyennes (O(1)), liste triée pour médiane, min et max (recherche
+    par bisect, insertion et retrait en O(n) par décalage de la liste, sans rescanner
+    les capteurs). La moyenne tronquée retire en plus les extrêmes, en O(n × ratio).
+
+    Une sonde partagée par plusieurs pièces n'est comptée qu'une fois, avec la somme
+    de leurs poids ; elle reste suivie tant qu'une pièce l'utilise.
+    """
+
+    def __init__(self, method: str = CONF_TEMP_METHOD_AVERAGE):
+        self.method = method
+        self._values: dict[str, float] = {}
+        self._weights: dict[str, float] = {}
+        self._registrations: dict[str, dict[object, float]] = {}
+        self._sorted: list[float] = []
+        self._sum = 0.0
+        self._weighted_sum = 0.0
+        self._weight_total = 0.0
+        self._updates = 0
+        self._value: float | None = None
+        self._listeners: list[Callable[[], None]] = []
+
+    @property
+    def value(self) -> float | None:
+        return self._value
+
+    @property
+    def sensors(self) -> list[str]:
+        return list(self._weights)
+
+    def set_method(self, method: str) -> None:
+        self.method = method
+        self._refresh()
+
+    def add_listener(self, listener: Callable[[], None]) -> Callable[[], None]:
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    def add_sensor(self, sensor: str, weight: float | None = None) -> Callable[[], None]:
+        """Inscrit `sensor` pour une pièce ; la fonction renvoyée ne retire que cette inscription."""
+        token = object()
+        self._registrations.setdefault(sensor, {})[token] = float(weight) if weight else 1.0
+        self._reweight(sensor)
+        return lambda: self._unregister(sensor, token)
+
+    def remove_sensor(self, sensor: str) -> None:
+        """Retire `sensor` pour toutes les pièces qui l'utilisent."""
+        self._registrations.pop(sensor, None)
+        self._discard(sensor)
+        if self._weights.pop(sensor, None) is not None:
+            self._refresh()
+
+    def _unregister(self, sensor: str, token: object) -> None:
+        registrations = self._registrations.get(sensor)
+        if registrations is None or registrations.pop(token, None) is None:
+            return
+        if registrations:
+            self._reweight(sensor)
+        else:
+            self.remove_sensor(sensor)
+
+    def _reweight(self, sensor: str) -> None:
+        weight = sum(self._registrations[sensor].values())
+        if self._weights.get(sensor) == weight:
+            return
+        value = self._values.get(sensor)
+        self._discard(sensor)
+        self._weights[sensor] = weight
+        if value is None:
+            return
+        # Même valeur, nouveau poids : seules les sommes pondérées bougent.
+        self._values[sensor] = value
+        self._sum += value
+        self._weighted_sum += value * weight
+        self._weight_total += weight
+        insort(self._sorted, value)
+        self._refresh()
+
+    def update(self, sensor: str, value: float | None) -> None:
+        """Remplace la valeur d'un capteur (None = indisponible)."""
+        if sensor not in self._weights or self._values.get(sensor) == value:
+            return
+        self._discard(sensor)
+        if value is not None:
+            weight = self._weights[sensor]
+            self._values[sensor] = value
+            self._sum += value
+            self._weighted_sum += value * weight
+            self._weight_total += weight
+            insort(self._sorted, value)
+        self._updates += 1
+        if self._updates % RESYNC_EVERY == 0:
+            self._resync()
+        self._refresh()
+
+    def _discard(self, sensor: str) -> None:
+        old = self._values.pop(sensor, None)
+        if old is None:
+            return
+        weight = self._weights[sensor]
+        self._sum -= old
+        self._weighted_sum -= old * weight
+        self._weight_total -= weight
+        del self._sorted[bisect_left(self._sorted, old)]
+        if not self._values:
+            self._sum = self._weighted_sum = self._weight_total = 0.0
+
+    def _resync(self) -> None:
+        self._sum = sum(self._values.values())
+        self._weighted_sum = sum(v * self._weights[s] for s, v in self._values.items())
+        self._weight_total = sum(self._weights[s] for s in self._values)
+
+    def _compute(self) -> float | None:
+        count = len(self._sorted)
+        if not count:
+            return None
+        if self.method == CONF_TEMP_METHOD_WEIGHTED and self._weight_total > 0:
+            return self._weighted_sum / self._weight_total
+        if self.method == CONF_TEMP_METHOD_MEDIAN:
+            mid = count // 2
+            return self._sorted[mid] if count % 2 else (self._sorted[mid - 1] + self._sorted[mid]) / 2
+        if self.method == CONF_TEMP_METHOD_MIN:
+            return self._sorted[0]
+        if self.method == CONF_TEMP_METHOD_MAX:
+            return self._sorted[-1]
+        if self.method == CONF_TEMP_METHOD_TRIMMED:
+            trim = int(count * TRIMMED_MEAN_RATIO)
+            if trim:
+                kept = self._sum - sum(self._sorted[:trim]) - sum(self._sorted[-trim:])
+                return kept / (count - 2 * trim)
+        return self._sum / count
+
+    def _refresh(self) -> None:
+        value = self._compute()
+        value = round(value, 1) if value is not None else None
+        if value == self._value:
+            return
+        self._value = value
+        for listener in list(self._listeners):
+            listener()
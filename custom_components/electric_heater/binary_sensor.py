@@ -1,69 +1,75 @@
 """Binary sensors pour Chauffage Électrique Fil Pilote FR."""
 from homeassistant.components.binary_sensor import BinarySensorEntity, BinarySensorDeviceClass
+from homeassistant.components.climate import HVACMode
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.event import async_track_state_change_event
-from .const import DOMAIN, CENTRAL, ROOM, CONF_PRESENCE_SENSOR
+from .const import DOMAIN, CENTRAL, ROOM, CONF_PRESENCE_SENSOR, CONF_WINDOW_DETECTION
+from .coordinator import HeatingCoordinator, entry_config, get_coordinator, zone_device_id
+from .entity import SourceSensorMixin
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_entities):
     entities = []
+    config = entry_config(entry)
     if entry.data.get("type") == CENTRAL:
-        entities.extend([CentralHeatingActive(hass), CentralPresence(hass, entry), CentralAutoEcoMode(hass)])
+        entities.extend([CentralHeatingActive(hass, entry), CentralPresence(hass, entry), CentralAutoEcoMode(hass, entry)])
     else:
-        if entry.data.get("window_sensors", "").strip():
+        if config.get("window_sensors", "").strip():
             entities.extend([RoomWindowOpen(hass, entry), RoomWindowSecurity(hass, entry)])
+        if config.get(CONF_WINDOW_DETECTION):
+            entities.append(RoomWindowDetected(hass, entry))
     async_add_entities(entities)
 
 
 class CentralHeatingActive(BinarySensorEntity):
     _attr_has_entity_name = True
     _attr_name = "Chauffage Actif"
-    _attr_unique_id = "electric_heater_central_chauffage_actif"
     _attr_device_class = BinarySensorDeviceClass.HEAT
 
-    def __init__(self, hass: HomeAssistant):
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry):
         self.hass = hass
+        self._coordinator: HeatingCoordinator = get_coordinator(hass, entry)
+        self._attr_unique_id = f"{zone_device_id(self._coordinator.zone)}_chauffage_actif"
         self._attr_is_on = False
 
     @property
     def device_info(self):
-        return {"identifiers": {(DOMAIN, "electric_heater_central")}}
+        return {"identifiers": {(DOMAIN, zone_device_id(self._coordinator.zone))}}
 
     async def async_added_to_hass(self):
-        self.hass.bus.async_listen(f"{DOMAIN}_central_changed", self._update)
+        self.async_on_remove(self._coordinator.async_subscribe_central({"ready", "hvac_mode"}, self._update))
         self._update()
 
     @callback
-    def _update(self, event=None):
-        central = self.hass.states.get("climate.electric_heater_central")
-        self._attr_is_on = central and central.state == "heat"
+    def _update(self, changes=None):
+        central = self._coordinator.central
+        self._attr_is_on = central.ready and central.hvac_mode == HVACMode.HEAT
         self.async_write_ha_state()
 
 
-class CentralPresence(BinarySensorEntity):
+class CentralPresence(SourceSensorMixin, BinarySensorEntity):
     _attr_has_entity_name = True
     _attr_name = "Présence"
-    _attr_unique_id = "electric_heater_central_presence"
     _attr_device_class = BinarySensorDeviceClass.OCCUPANCY
 
     def __init__(self, hass: HomeAssistant, entry: ConfigEntry):
         self.hass = hass
-        self._sensor = entry.data.get(CONF_PRESENCE_SENSOR)
+        self.entry = entry
+        self._device_id = zone_device_id(get_coordinator(hass, entry).zone)
+        self._attr_unique_id = f"{self._device_id}_presence"
         self._attr_is_on = False
 
     @property
     def device_info(self):
-        return {"identifiers": {(DOMAIN, "electric_heater_central")}}
+        return {"identifiers": {(DOMAIN, self._device_id)}}
 
-    async def async_added_to_hass(self):
-        if self._sensor:
-            async_track_state_change_event(self.hass, [self._sensor], self._update)
-            self._update()
+    def _source_sensors(self, config):
+        return [config[CONF_PRESENCE_SENSOR]] if config.get(CONF_PRESENCE_SENSOR) else []
 
     @callback
     def _update(self, event=None):
-        state = self.hass.states.get(self._sensor) if self._sensor else None
+        state = self.hass.states.get(self._sensors[0]) if self._sensors else None
         self._attr_is_on = bool(state and state.state not in ("unknown", "unavailable") and int(float(state.state or 0)) > 0)
         self.async_write_ha_state()
 
@@ -71,29 +77,29 @@ class CentralPresence(BinarySensorEntity):
 class CentralAutoEcoMode(BinarySensorEntity):
     _attr_has_entity_name = True
     _attr_name = "Mode Éco Auto"
-    _attr_unique_id = "electric_heater_central_mode_eco_auto"
     _attr_device_class = BinarySensorDeviceClass.RUNNING
 
-    def __init__(self, hass: HomeAssistant):
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry):
         self.hass = hass
+        self._coordinator: HeatingCoordinator = get_coordinator(hass, entry)
+        self._attr_unique_id = f"{zone_device_id(self._coordinator.zone)}_mode_eco_auto"
         self._attr_is_on = False
 
     @property
     def device_info(self):
-        return {"identifiers": {(DOMAIN, "electric_heater_central")}}
+        return {"identifiers": {(DOMAIN, zone_device_id(self._coordinator.zone))}}
 
     async def async_added_to_hass(self):
-        self.hass.bus.async_listen(f"{DOMAIN}_central_changed", self._update)
+        self.async_on_remove(self._coordinator.async_subscribe_central({"auto_eco_active"}, self._update))
         self._update()
 
     @callback
-    def _update(self, event=None):
-        central = self.hass.states.get("climate.electric_heater_central")
-        self._attr_is_on = bool(central and central.attributes.get("auto_eco_active"))
+    def _update(self, changes=None):
+        self._attr_is_on = self._coordinator.central.auto_eco_active
         self.async_write_ha_state()
 
 
-class RoomWindowOpen(BinarySensorEntity):
+class RoomWindowOpen(SourceSensorMixin, BinarySensorEntity):
     _attr_has_entity_name = True
     _attr_name = "Fenêtre Ouverte"
     _attr_device_class = BinarySensorDeviceClass.WINDOW
@@ -101,18 +107,19 @@ class RoomWindowOpen(BinarySensorEntity):
     def __init__(self, hass: HomeAssistant, entry: ConfigEntry):
         self.hass = hass
         self.entry = entry
+        self._coordinator: HeatingCoordinator = get_coordinator(hass, entry)
         self._attr_unique_id = f"electric_heater_room_{entry.entry_id}_fenetre_ouverte"
-        self._sensors = [s.strip() for s in entry.data.get("window_sensors", "").split(",") if s.strip()]
         self._attr_is_on = False
 
     @property
     def device_info(self):
-        return {"identifiers": {(DOMAIN, f"room_{self.entry.entry_id}")}, "via_device": (DOMAIN, "electric_heater_central")}
+        return {
+            "identifiers": {(DOMAIN, f"room_{self.entry.entry_id}")},
+            "via_device": (DOMAIN, zone_device_id(self._coordinator.zone)),
+        }
 
-    async def async_added_to_hass(self):
-        if self._sensors:
-            async_track_state_change_event(self.hass, self._sensors, self._update)
-            self._update()
+    def _source_sensors(self, config):
+        return [s.strip() for s in config.get("window_sensors", "").split(",") if s.strip()]
 
     @callback
     def _update(self, event=None):
@@ -128,16 +135,20 @@ class RoomWindowSecurity(BinarySensorEntity):
     def __init__(self, hass: HomeAssistant, entry: ConfigEntry):
         self.hass = hass
         self.entry = entry
+        self._coordinator: HeatingCoordinator = get_coordinator(hass, entry)
         self._attr_unique_id = f"electric_heater_room_{entry.entry_id}_securite_fenetre"
         self._attr_is_on = False
 
     @property
     def device_info(self):
-        return {"identifiers": {(DOMAIN, f"room_{self.entry.entry_id}")}, "via_device": (DOMAIN, "electric_heater_central")}
+        return {
+            "identifiers": {(DOMAIN, f"room_{self.entry.entry_id}")},
+            "via_device": (DOMAIN, zone_device_id(self._coordinator.zone)),
+        }
 
     async def async_added_to_hass(self):
         eid = f"binary_sensor.electric_heater_room_{self.entry.entry_id}_fenetre_ouverte"
-        async_track_state_change_event(self.hass, [eid], self._update)
+        self.async_on_remove(async_track_state_change_event(self.hass, [eid], self._update))
         self._update()
 
     @callback
@@ -145,3 +156,35 @@ class RoomWindowSecurity(BinarySensorEntity):
         state = self.hass.states.get(f"binary_sensor.electric_heater_room_{self.entry.entry_id}_fenetre_ouverte")
         self._attr_is_on = bool(state and state.state == "on")
         self.async_write_ha_state()
+
+
+class RoomWindowDetected(BinarySensorEntity):
+    """Fenêtre ouverte déduite d'une chute brutale de la température de la pièce."""
+
+    _attr_has_entity_name = True
+    _attr_name = "Fenêtre Ouverte Détectée"
+    _attr_device_class = BinarySensorDeviceClass.WINDOW
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry):
+        self.hass = hass
+        self.entry = entry
+        self._coordinator: HeatingCoordinator = get_coordinator(hass, entry)
+        self._attr_unique_id = f"electric_heater_room_{entry.entry_id}_fenetre_detectee"
+        self._attr_is_on = False
+
+    @property
+    def device_info(self):
+        return {
+            "identifiers": {(DOMAIN, f"room_{self.entry.entry_id}")},
+            "via_device": (DOMAIN, zone_device_id(self._coordinator.zone)),
+        }
+
+    async def async_added_to_hass(self):
+        self._detector = self._coordinator.window_detector(self.entry.entry_id, entry_config(self.entry))
+        self.async_on_remove(self._detector.add_listener(self._update))
+        self._update()
+
+    @callback
+    def _update(self):
+        self._attr_is_on = self._detector.detected
+        self.async_write_ha_state()
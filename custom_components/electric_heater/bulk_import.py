@@ -0,0 +1,139 @@
+"""Import groupé de pièces pour Chauffage Électrique Fil Pilote FR."""
+import csv
+import io
+import re
+from typing import Any, Callable
+
+import yaml
+
+from homeassistant.const import CONF_NAME
+
+from .const import CONF_PRIORITY, CONF_WATTAGE, CONF_ZONE, DEFAULT_PRIORITY, DEFAULT_WATTAGE
+
+# Colonnes reconnues ; seules les trois premières sont obligatoires.
+COLUMNS = ("name", "fil_pilote_select", "temperature_sensor", "window_sensors", "priority", "wattage", "zone")
+REQUIRED = ("name", "fil_pilote_select", "temperature_sensor")
+# Nombre d'erreurs rapportées au plus, pour garder le formulaire lisible.
+MAX_ERRORS = 5
+
+
+def _read_rows(text: str) -> list[tuple[int, dict[str, Any]]]:
+    """Lignes brutes numérotées : liste YAML de pièces, ou CSV avec en-tête (séparateur `,` ou `;`)."""
+    if text.lstrip().startswith("-"):
+        try:
+            rows = yaml.safe_load(text)
+        except yaml.YAMLError as err:
+            raise ValueError(f"YAML invalide : {err}") from err
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise ValueError("le YAML doit être une liste de pièces")
+        return list(enumerate(rows, 1))
+
+    lines = text.strip().splitlines()
+    delimiter = ";" if ";" in lines[0] else ","
+    reader = csv.DictReader(io.StringIO("\n".join(lines)), delimiter=delimiter, skipinitialspace=True)
+    reader.fieldnames = [(field or "").strip().lower() for field in reader.fieldnames or ()]
+    if unknown := set(reader.fieldnames) - set(COLUMNS):
+        raise ValueError(f"colonnes inconnues : {', '.join(sorted(unknown))}")
+    # Ligne 1 = en-tête : la première pièce est en ligne 2. Les champs en trop sont rangés sous la clé None.
+    return [
+        (line, row) for line, row in enumerate(reader, 2)
+        if None in row or any((v or "").strip() for v in row.values())
+    ]
+
+
+def _entity_list(value: Any) -> list[str]:
+    if isinstance(value, list):
+        return [str(v).strip() for v in value if str(v).strip()]
+    return [v for v in re.split(r"[\s,|]+", str(value or "")) if v]
+
+
+def parse_rooms(
+    text: str,
+    exists: Callable[[str], bool],
+    used_selects: set[str],
+    zones: set[str],
+) -> list[dict[str, Any]]:
+    """Valide toutes les pièces d'un texte YAML ou CSV en une passe et les renvoie normalisées."""
+    if not text or not text.strip():
+        raise ValueError("aucune pièce")
+    return validate_rooms(_read_rows(text), exists, used_selects, zones)
+
+
+def validate_rooms(
+    rows: list[tuple[int, dict[Any, Any]]],
+    exists: Callable[[str], bool],
+    used_selects: set[str],
+    zones: set[str],
+) -> list[dict[str, Any]]:
+    """Valide des pièces numérotées et les renvoie normalisées.
+
+    Lève ValueError listant les premières erreurs avec leur numéro de ligne : champ
+    manquant ou en trop, entité inconnue ou du mauvais domaine, select déjà utilisé (par
+    une pièce existante ou une autre ligne), priorité ou puissance hors bornes, zone inconnue.
+    """
+    rooms: list[dict[str, Any]] = []
+    errors: list[str] = []
+    seen_selects = set(used_selects)
+    seen_names: set[str] = set()
+
+    def check(line: int, entity_id: str, domain: str) -> bool:
+        if not entity_id.startswith(f"{domain}.") or not exists(entity_id):
+            errors.append(f"ligne {line} : {entity_id} n'est pas une entité {domain} connue")
+            return False
+        return True
+
+    for line, row in rows:
+        if None in row:
+            errors.append(f"ligne {line} : {len(row[None])} champ(s) de plus que l'en-tête")
+            continue
+        row = {str(k).strip().lower(): v for k, v in row.items()}
+        if missing := [field for field in REQUIRED if not str(row.get(field) or "").strip()]:
+            errors.append(f"ligne {line} : {', '.join(missing)} manquant")
+            continue
+        name = str(row["name"]).strip()
+        select_id = str(row["fil_pilote_select"]).strip()
+        sensor_id = str(row["temperature_sensor"]).strip()
+        windows = _entity_list(row.get("window_sensors"))
+        valid = check(line, select_id, "select") & check(line, sensor_id, "sensor")
+        valid &= all([check(line, window, "binary_sensor") for window in windows])
+        if select_id in seen_selects:
+            errors.append(f"ligne {line} : {select_id} commande déjà une pièce")
+            valid = False
+        if name.casefold() in seen_names:
+            errors.append(f"ligne {line} : pièce {name} en double")
+            valid = False
+        try:
+            priority = int(row.get("priority") or DEFAULT_PRIORITY)
+            wattage = float(row.get("wattage") or DEFAULT_WATTAGE)
+        except (TypeError, ValueError):
+            errors.append(f"ligne {line} : priorité ou puissance non numérique")
+            continue
+        if not 1 <= priority <= 5:
+            errors.append(f"ligne {line} : priorité {priority} hors de 1 → 5")
+            valid = False
+        if not 100 <= wattage <= 5000:
+            errors.append(f"ligne {line} : puissance {wattage:g} W hors de 100 → 5000 W")
+            valid = False
+        zone = str(row.get("zone") or "").strip() or None
+        if zone and zone not in zones:
+            errors.append(f"ligne {line} : zone {zone} inconnue")
+            valid = False
+        seen_selects.add(select_id)
+        seen_names.add(name.casefold())
+        if valid:
+            rooms.append({
+                CONF_NAME: name,
+                "fil_pilote_select": select_id,
+                "temperature_sensor": sensor_id,
+                "window_sensors": windows,
+                CONF_PRIORITY: priority,
+                CONF_WATTAGE: wattage,
+                CONF_ZONE: zone,
+            })
+
+    if errors:
+        more = f" (et {len(errors) - MAX_ERRORS} autre(s))" if len(errors) > MAX_ERRORS else ""
+        raise ValueError(" ; ".join(errors[:MAX_ERRORS]) + more)
+    if not rooms:
+        raise ValueError("aucune pièce")
+    return rooms
@@ -1,5 +1,8 @@
 """Climate entities for Chauffage Électrique Fil Pilote FR."""
 import logging
+import random
+from datetime import datetime, timedelta
+from functools import partial
 from typing import Any
 
 from homeassistant.components.climate import (
@@ -11,12 +14,14 @@ from homeassistant.components.climate import (
 from homeassistant.const import UnitOfTemperature, PRECISION_TENTHS
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant, callback
-from homeassistant.helpers.event import async_track_state_change_event
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.event import async_call_later, async_track_state_change_event
 from homeassistant.helpers.restore_state import RestoreEntity
+from homeassistant.helpers.start import async_at_started
+from homeassistant.util import dt as dt_util
 from .const import (
     DOMAIN,
     CENTRAL,
-    ROOM,
     PRESETS,
     PRESET_COMFORT,
     PRESET_COMFORT_M1,
@@ -24,13 +29,51 @@ from .const import (
     PRESET_ECO,
     PRESET_FROST_PROTECTION,
     PRESET_OFF,
+    PRESET_BOOST,
+    ROOM_PRESETS,
+    CONF_OVERRIDE_DURATION,
+    DEFAULT_OVERRIDE_DURATION,
+    CONF_BOOST_DURATION,
+    DEFAULT_BOOST_DURATION,
     FIL_PILOTE_PAYLOAD,
     HYSTERESIS,
     CONF_TEMP_METHOD,
     CONF_TEMP_METHOD_AVERAGE,
     CONF_TEMP_METHOD_REFERENCE,
     CONF_PRESENCE_SENSOR,
+    CONF_PRESENCE_DELAY,
+    DEFAULT_PRESENCE_DELAY,
+    CONF_AREA,
+    CONF_REGULATION,
+    REGULATION_PWM,
+    CONF_PWM_CYCLE,
+    CONF_PWM_LOW_ORDER,
+    DEFAULT_PWM_CYCLE,
+    PWM_PRESETS,
+    PRIORITY_SAFETY,
+    PRIORITY_ROOM,
+    PRIORITY_CENTRAL,
+    ORDER_LEVEL,
+    CONF_WATTAGE,
+    CONF_PRIORITY,
+    DEFAULT_PRIORITY,
+    PRESET_TEMP_KEY,
+    CONF_SCHEDULE,
+    CONF_FILTER,
+    CONF_FILTER_WINDOW,
+    CONF_WINDOW_DETECTION,
+    CONF_WINDOW_DROP_RATE,
+    CONF_WINDOW_TIMEOUT,
+    CONF_HYSTERESIS,
+    DEFAULT_WATTAGE,
+    TEMP_CONF_KEYS,
+    SIGNAL_OPTIONS_UPDATED,
 )
+from .coordinator import HeatingCoordinator, entry_config, get_coordinator, zone_device_id
+from .entity import CoalescedWriteMixin
+from .filters import build_filter, is_unavailable, parse_temperature
+from .regulation import PiController
+from .schedule import WeeklySchedule
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -50,28 +93,28 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_e
         async_add_entities([RoomThermostat(hass, entry)])
 
 
-class CentralThermostat(ClimateEntity, RestoreEntity):
+class CentralThermostat(CoalescedWriteMixin, ClimateEntity, RestoreEntity):
     _attr_has_entity_name = True
     _attr_name = None
-    _attr_unique_id = "electric_heater_central"
-    entity_id = "climate.electric_heater_central"
     _attr_temperature_unit = UnitOfTemperature.CELSIUS
     _attr_hvac_modes = [HVACMode.HEAT, HVACMode.OFF]
     _attr_preset_modes = PRESETS
     _attr_supported_features = SUPPORTED_FEATURES
     _attr_precision = PRECISION_TENTHS
+    # Les consignes sont exposées par les entités number, le tarif change peu et pèse dans
+    # l'historique : inutile de les enregistrer à chaque écriture.
+    _unrecorded_attributes = frozenset({"temperatures", "tariff"})
 
     def __init__(self, hass: HomeAssistant, entry: ConfigEntry):
         self.hass = hass
         self.entry = entry
+        self._coordinator: HeatingCoordinator = get_coordinator(hass, entry)
+        self._zone = self._coordinator.zone
+        self._attr_unique_id = zone_device_id(self._zone)
+        self.entity_id = f"climate.{self._attr_unique_id}"
 
-        self._temps = {
-            "comfort": entry.data["comfort_temp"],
-            "comfort_m1": entry.data["comfort_m1_temp"],
-            "comfort_m2": entry.data["comfort_m2_temp"],
-            "eco": entry.data["eco_temp"],
-            "frost_protection": entry.data["frost_temp"],
-        }
+        config = entry_config(entry)
+        self._temps = {key: config[conf] for key, conf in TEMP_CONF_KEYS.items()}
 
         self._attr_min_temp = entry.data["min_temp"]
         self._attr_max_temp = entry.data["max_temp"]
@@ -86,21 +129,20 @@ class CentralThermostat(ClimateEntity, RestoreEntity):
         self._auto_eco_active = False
 
         self._temp_method = entry.data.get(CONF_TEMP_METHOD, CONF_TEMP_METHOD_AVERAGE)
-        self._reference_sensor = (
-            entry.data.get("temperature_sensor")
-            if self._temp_method == CONF_TEMP_METHOD_REFERENCE
-            else None
-        )
-        self._presence_sensor = entry.data.get(CONF_PRESENCE_SENSOR)
+        self._read_sensor_options(config)
+        self._schedule = WeeklySchedule(entry.data[CONF_SCHEDULE]) if entry.data.get(CONF_SCHEDULE) else None
 
         self._unsub_temp = None
         self._unsub_presence = None
+        self._unsub_absence = None
+        self._unsub_aggregator = None
+        self._unsub_schedule = None
 
     @property
     def device_info(self):
         return {
-            "identifiers": {(DOMAIN, "electric_heater_central")},
-            "name": "Chauffage Central",
+            "identifiers": {(DOMAIN, zone_device_id(self._zone))},
+            "name": self.entry.data.get("name") or "Chauffage Central",
             "manufacturer": "XAV59213",
             "model": "Fil Pilote FR",
             "sw_version": "1.0.0",
@@ -131,9 +173,15 @@ class CentralThermostat(ClimateEntity, RestoreEntity):
         return {
             "temperatures": self._temps,
             "auto_eco_active": self._auto_eco_active,
-            "current_temperature": self._current_temp,
+            "tariff": self._tariff_attributes(),
         }
 
+    def _tariff_attributes(self) -> dict[str, Any] | None:
+        tariff = self._coordinator.tariff
+        if not tariff.enabled:
+            return None
+        return {"color": tariff.color, "offpeak": tariff.offpeak, "level": tariff.level, "preheat": tariff.preheat}
+
     async def async_added_to_hass(self):
         await super().async_added_to_hass()
 
@@ -141,54 +189,125 @@ class CentralThermostat(ClimateEntity, RestoreEntity):
             self._hvac_mode = HVACMode(last_state.state) if last_state.state in ("heat", "off") else HVACMode.HEAT
             self._preset_mode = last_state.attributes.get("preset_mode", PRESET_COMFORT)
             self._last_manual_preset = self._preset_mode if self._preset_mode != PRESET_ECO else PRESET_COMFORT
+            if isinstance(temps := last_state.attributes.get("temperatures"), dict):
+                self._temps.update({k: v for k, v in temps.items() if k in self._temps})
+        self._coordinator.central_thermostat = self
+
+        self._track_sensors()
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass, SIGNAL_OPTIONS_UPDATED.format(self.entry.entry_id), self._apply_options
+            )
+        )
+        self.async_on_remove(self._coordinator.tariff.add_listener(self._handle_tariff))
 
-        sensors = self._get_temperature_sensors()
-        if sensors:
+        if self._schedule:
+            self._unsub_schedule = self._coordinator.schedules.register(
+                self._zone, self._schedule, self._handle_schedule
+            )
+            self._handle_schedule(self._coordinator.schedules.current_preset(self._zone), push=self.hass.is_running)
+
+        self._update_target_temp()
+        self._update_central_temperature()
+
+    async def async_will_remove_from_hass(self):
+        self._untrack_sensors()
+        self._cancel_absence()
+        if self._unsub_schedule:
+            self._unsub_schedule()
+        if self._coordinator.central_thermostat is self:
+            self._coordinator.central_thermostat = None
+
+    def _read_sensor_options(self, config: dict[str, Any]) -> None:
+        self._reference_sensor = (
+            config.get("temperature_sensor")
+            if self._temp_method == CONF_TEMP_METHOD_REFERENCE
+            else None
+        )
+        self._presence_sensor = config.get(CONF_PRESENCE_SENSOR)
+        self._presence_delay = config.get(CONF_PRESENCE_DELAY, DEFAULT_PRESENCE_DELAY) or 0
+        self._filter = build_filter(config.get(CONF_FILTER), config.get(CONF_FILTER_WINDOW))
+
+    @callback
+    def _track_sensors(self) -> None:
+        instrument = partial(self._coordinator.instrumentation.wrap, self.entity_id)
+        if self._reference_sensor:
             self._unsub_temp = async_track_state_change_event(
-                self.hass, sensors, self._update_central_temperature
+                self.hass, [self._reference_sensor], instrument(self._update_central_temperature)
             )
+        elif self._temp_method != CONF_TEMP_METHOD_REFERENCE:
+            self._unsub_aggregator = self._aggregator.add_listener(instrument(self._update_central_temperature))
 
         if self._presence_sensor:
             self._unsub_presence = async_track_state_change_event(
-                self.hass, [self._presence_sensor], self._handle_presence_change
+                self.hass, [self._presence_sensor], instrument(self._handle_presence_change)
             )
 
-        self._update_central_temperature()
+    @callback
+    def _untrack_sensors(self) -> None:
+        for unsub in (self._unsub_temp, self._unsub_presence, self._unsub_aggregator):
+            if unsub:
+                unsub()
+        self._unsub_temp = self._unsub_presence = self._unsub_aggregator = None
+
+    @callback
+    def _apply_options(self, config: dict[str, Any]) -> None:
+        """Options modifiées : consignes, sondes et filtre changent sans recharger l'entité."""
+        self._temps.update({key: config[conf] for key, conf in TEMP_CONF_KEYS.items() if conf in config})
+        presence_sensor = self._presence_sensor
+        self._untrack_sensors()
+        self._read_sensor_options(config)
+        self._track_sensors()
+        if self._presence_sensor != presence_sensor:
+            # Autre capteur : le délai d'absence en cours ne vaut plus, l'état actuel du nouveau décide.
+            self._cancel_absence()
+            self._apply_presence(self.hass.states.get(self._presence_sensor) if self._presence_sensor else None)
         self._update_target_temp()
-        self._update_hvac_action()
+        self._update_central_temperature()
 
-    async def async_will_remove_from_hass(self):
-        if self._unsub_temp:
-            self._unsub_temp()
-        if self._unsub_presence:
-            self._unsub_presence()
-
-    def _get_temperature_sensors(self):
-        if self._temp_method == CONF_TEMP_METHOD_AVERAGE:
-            return [
-                e.data["temperature_sensor"]
-                for e in self.hass.config_entries.async_entries(DOMAIN)
-                if e.data.get("type") == ROOM
-            ]
-        return [self._reference_sensor] if self._reference_sensor else []
+    @property
+    def _aggregator(self):
+        return self._coordinator.aggregator
+
+    @callback
+    def _write_state(self, immediate: bool = True) -> None:
+        self._coordinator.update_central(
+            ready=True,
+            hvac_mode=self._hvac_mode,
+            preset_mode=self._preset_mode,
+            target_temperature=self._target_temp,
+            current_temperature=self._current_temp,
+            temperatures=dict(self._temps),
+            auto_eco_active=self._auto_eco_active,
+            tariff_level=self._coordinator.tariff.level,
+            tariff_preheat=self._coordinator.tariff.preheat,
+        )
+        self.async_write_coalesced(immediate)
+
+    def _read_reference_temperature(self) -> float | None:
+        state = self.hass.states.get(self._reference_sensor) if self._reference_sensor else None
+        value = parse_temperature(state)
+        if value is None and not is_unavailable(state):
+            # Mesure rejetée : la dernière valeur filtrée reste en place.
+            return self._current_temp
+        value = self._filter.update(value)
+        return round(value, 1) if value is not None else None
 
     @callback
     def _update_central_temperature(self, event=None):
-        temps = []
-        for entity_id in self._get_temperature_sensors():
-            state = self.hass.states.get(entity_id)
-            if state and state.state not in ("unknown", "unavailable"):
-                try:
-                    temps.append(float(state.state))
-                except ValueError:
-                    pass
-        self._current_temp = round(sum(temps) / len(temps), 1) if temps else None
+        if self._temp_method == CONF_TEMP_METHOD_REFERENCE:
+            self._current_temp = self._read_reference_temperature()
+        else:
+            self._current_temp = self._aggregator.value
         self._update_hvac_action()
-        self.async_write_ha_state()
+        self._write_state(immediate=False)
 
     @callback
     def _handle_presence_change(self, event):
-        state = event.data.get("new_state")
+        self._apply_presence(event.data.get("new_state"))
+
+    @callback
+    def _apply_presence(self, state) -> None:
         if not state or state.state in ("unknown", "unavailable"):
             return
         try:
@@ -196,35 +315,72 @@ class CentralThermostat(ClimateEntity, RestoreEntity):
         except (ValueError, TypeError):
             persons = 0
 
-        changed = False
+        if persons > 0:
+            # Retour avant la fin du délai : l'absence n'a jamais été appliquée.
+            self._cancel_absence()
         if persons == 0 and not self._auto_eco_active:
+            # Un compteur qui oscille entre 0 et 1 ne bascule pas toute la zone : l'absence doit durer.
+            if not self._presence_delay:
+                self._set_absent(True)
+            elif not self._unsub_absence:
+                self._unsub_absence = async_call_later(self.hass, self._presence_delay, self._handle_absence_delay)
+        elif persons > 0 and self._auto_eco_active:
+            self._set_absent(False)
+
+    @callback
+    def _cancel_absence(self) -> None:
+        if self._unsub_absence:
+            self._unsub_absence()
+            self._unsub_absence = None
+
+    @callback
+    def _handle_absence_delay(self, _now=None) -> None:
+        self._unsub_absence = None
+        self._set_absent(True)
+
+    @callback
+    def _set_absent(self, absent: bool) -> None:
+        if absent:
             self._last_manual_preset = self._preset_mode
             self._preset_mode = PRESET_ECO
-            self._auto_eco_active = True
-            changed = True
-        elif persons > 0 and self._auto_eco_active:
+        else:
             self._preset_mode = self._last_manual_preset
-            self._auto_eco_active = False
-            changed = True
+        self._auto_eco_active = absent
+        self._update_target_temp()
+        self._update_hvac_action()
+        self._write_state()
+        self.hass.async_create_task(self._push_to_all_rooms())
+
+    @callback
+    def _handle_tariff(self) -> None:
+        """Changement de période ou de couleur : une seule diffusion pour toutes les pièces de la zone.
 
-        if changed:
-            self._update_target_temp()
-            self._update_hvac_action()
-            self.async_write_ha_state()
-            self.hass.bus.async_fire(f"{DOMAIN}_central_changed")
+        Sans changement de cran ni de préchauffage, seul l'attribut `tariff` est réécrit.
+        """
+        tariff, central = self._coordinator.tariff, self._coordinator.central
+        orders_change = (tariff.level, tariff.preheat) != (central.tariff_level, central.tariff_preheat)
+        self._write_state()
+        if orders_change:
+            self.hass.async_create_task(self._push_to_all_rooms())
+
+    @callback
+    def _handle_schedule(self, preset: str, push: bool = True) -> None:
+        """Transition du programme ; à l'arrêt ou en éco auto, elle sera reprise au retour."""
+        self._last_manual_preset = preset
+        if self._hvac_mode == HVACMode.OFF or self._auto_eco_active or preset == self._preset_mode:
+            return
+        self._preset_mode = preset
+        self._update_target_temp()
+        self._update_hvac_action()
+        self._write_state()
+        if push:
+            self.hass.async_create_task(self._push_to_all_rooms())
 
     def _update_target_temp(self):
         if self._hvac_mode == HVACMode.OFF or self._preset_mode == PRESET_OFF:
             self._target_temp = None
             return
-        key = {
-            PRESET_COMFORT: "comfort",
-            PRESET_COMFORT_M1: "comfort_m1",
-            PRESET_COMFORT_M2: "comfort_m2",
-            PRESET_ECO: "eco",
-            PRESET_FROST_PROTECTION: "frost_protection",
-        }.get(self._preset_mode, "comfort")
-        self._target_temp = self._temps[key]
+        self._target_temp = self._temps[PRESET_TEMP_KEY.get(self._preset_mode, "comfort")]
 
     def _update_hvac_action(self):
         if self._hvac_mode == HVACMode.OFF:
@@ -243,9 +399,16 @@ class CentralThermostat(ClimateEntity, RestoreEntity):
             self._auto_eco_active = False
         self._update_target_temp()
         self._update_hvac_action()
-        self.async_write_ha_state()
+        self._write_state()
         await self._push_to_all_rooms()
 
+    async def async_set_preset_temperature(self, key: str, value: float) -> None:
+        """Nouvelle consigne d'un preset ; les ordres fil pilote ne changent pas."""
+        self._temps[key] = value
+        self._update_target_temp()
+        self._update_hvac_action()
+        self._write_state()
+
     async def async_set_hvac_mode(self, hvac_mode: HVACMode):
         self._hvac_mode = hvac_mode
         if hvac_mode == HVACMode.OFF:
@@ -254,7 +417,7 @@ class CentralThermostat(ClimateEntity, RestoreEntity):
             self._preset_mode = self._last_manual_preset or PRESET_COMFORT
         self._update_target_temp()
         self._update_hvac_action()
-        self.async_write_ha_state()
+        self._write_state()
         await self._push_to_all_rooms()
 
     async def async_set_preset_mode(self, preset_mode: str):
@@ -267,24 +430,26 @@ class CentralThermostat(ClimateEntity, RestoreEntity):
         self._hvac_mode = HVACMode.OFF if preset_mode == PRESET_OFF else HVACMode.HEAT
         self._update_target_temp()
         self._update_hvac_action()
-        self.async_write_ha_state()
+        self._write_state()
         await self._push_to_all_rooms()
 
     async def _push_to_all_rooms(self):
         preset = PRESET_OFF if self._hvac_mode == HVACMode.OFF else self._preset_mode
         option = FIL_PILOTE_PAYLOAD[preset]["fil_pilote"]
-        for entry in self.hass.config_entries.async_entries(DOMAIN):
-            if entry.data.get("type") == ROOM and (select_id := entry.data.get("fil_pilote_select")):
-                await self.hass.services.async_call("select", "select_option", {"entity_id": select_id, "option": option})
-        self.hass.bus.async_fire(f"{DOMAIN}_central_changed")
+        dispatcher = self._coordinator.dispatcher
+        # Les pièces qui attendent leur tour dans l'étalement du démarrage enverront l'ordre à jour elles-mêmes.
+        started = {room_id for room_id, state in self._coordinator.rooms.items() if state.started}
+        await dispatcher.async_dispatch(dispatcher.orders_for(option, self._zone, started), PRIORITY_CENTRAL)
+        self.hass.bus.async_fire(f"{DOMAIN}_central_changed", {"zone": self._zone})
 
 
-class RoomThermostat(ClimateEntity, RestoreEntity):
+class RoomThermostat(CoalescedWriteMixin, ClimateEntity, RestoreEntity):
     _attr_has_entity_name = True
     _attr_name = None
+    _unrecorded_attributes = frozenset({"duty_cycle"})
     _attr_temperature_unit = UnitOfTemperature.CELSIUS
     _attr_hvac_modes = [HVACMode.HEAT, HVACMode.OFF]
-    _attr_preset_modes = PRESETS
+    _attr_preset_modes = ROOM_PRESETS
     _attr_supported_features = SUPPORTED_FEATURES
     _attr_precision = PRECISION_TENTHS
 
@@ -293,6 +458,7 @@ class RoomThermostat(ClimateEntity, RestoreEntity):
         self.entry = entry
         self._attr_name = f"Chauffage {entry.data['name']}"
         self._attr_unique_id = f"electric_heater_room_{entry.entry_id}"
+        self._coordinator: HeatingCoordinator = get_coordinator(hass, entry)
 
         self._current_temp: float | None = None
         self._target_temp: float | None = None
@@ -300,21 +466,44 @@ class RoomThermostat(ClimateEntity, RestoreEntity):
         self._hvac_mode = HVACMode.HEAT
         self._hvac_action = HVACAction.IDLE
         self._window_open = False
-        self._hysteresis = 0.3
 
-        self._temp_sensor = entry.data["temperature_sensor"]
+        config = entry_config(entry)
         self._fil_pilote_select = entry.data["fil_pilote_select"]
-        self._window_sensors = [s.strip() for s in entry.data.get("window_sensors", "").split(",") if s.strip()]
+        self._override: str | None = None
+        self._override_end: datetime | None = None
+        self._read_options(config)
+        self._hysteresis = self._preset_hysteresis()
+        self._window_detection = config.get(CONF_WINDOW_DETECTION, False)
+        self._detector = None
+
+        self._pwm = PiController() if entry.data.get(CONF_REGULATION) == REGULATION_PWM else None
+        self._pwm_cycle = entry.data.get(CONF_PWM_CYCLE, DEFAULT_PWM_CYCLE) * 60
+        self._pwm_low_option = FIL_PILOTE_PAYLOAD[entry.data.get(CONF_PWM_LOW_ORDER, PRESET_ECO)]["fil_pilote"]
+        self._pwm_on = False
+        self._shed = False
+        self._schedule = WeeklySchedule(entry.data[CONF_SCHEDULE]) if entry.data.get(CONF_SCHEDULE) else None
+        self._scheduled_preset: str | None = None
+        self._preheat: str | None = None
+        self._model = None
 
         self._unsub_temp = None
         self._unsub_windows = None
+        self._unsub_dispatcher = None
+        self._unsub_aggregator = None
+        self._unsub_cycle = None
+        self._unsub_central = None
+        self._unsub_startup = None
+        self._unsub_shedder = None
+        self._unsub_schedule = None
+        self._unsub_detector = None
+        self._started = False
 
     @property
     def device_info(self):
         return {
             "identifiers": {(DOMAIN, f"room_{self.entry.entry_id}")},
             "name": self.entry.data["name"],
-            "via_device": (DOMAIN, "electric_heater_central"),
+            "via_device": (DOMAIN, zone_device_id(self._coordinator.zone)),
         }
 
     @property
@@ -327,12 +516,14 @@ class RoomThermostat(ClimateEntity, RestoreEntity):
 
     @property
     def hvac_mode(self) -> HVACMode:
-        return self._hvac_mode
+        return HVACMode.OFF if self._override == PRESET_OFF else self._hvac_mode
 
     @property
     def hvac_action(self) -> HVACAction:
-        if self._window_open or self._hvac_mode == HVACMode.OFF:
+        if self._window_open or self.hvac_mode == HVACMode.OFF:
             return HVACAction.OFF
+        if self._pwm_active():
+            return HVACAction.HEATING if self._pwm_on else HVACAction.IDLE
         if self._current_temp is None or self._target_temp is None:
             return HVACAction.IDLE
         return HVACAction.HEATING if self._current_temp < self._target_temp - self._hysteresis else HVACAction.IDLE
@@ -341,54 +532,372 @@ class RoomThermostat(ClimateEntity, RestoreEntity):
     def preset_mode(self) -> str | None:
         return self._preset_mode
 
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        attributes = {"load_shed": True} if self._shed else {}
+        if self._preheat:
+            attributes["preheat"] = self._preheat
+        if self._pwm:
+            attributes["duty_cycle"] = round(self._pwm.duty * 100)
+        if self._override:
+            attributes["override"] = self._override
+            attributes["override_end"] = self._override_end.isoformat()
+        return attributes
+
     async def async_added_to_hass(self):
         await super().async_added_to_hass()
+        if last_state := await self.async_get_last_state():
+            if last_state.state in (HVACMode.HEAT, HVACMode.OFF):
+                self._hvac_mode = HVACMode(last_state.state)
+            if last_state.attributes.get("preset_mode") in PRESETS:
+                self._preset_mode = last_state.attributes["preset_mode"]
+            self._target_temp = last_state.attributes.get("temperature")
+            self._hysteresis = self._preset_hysteresis()
+            # Une dérogation en cours au redémarrage reprend pour le temps qui lui restait.
+            end = dt_util.parse_datetime(str(last_state.attributes.get("override_end") or ""))
+            if last_state.attributes.get("override") in ROOM_PRESETS and end:
+                self._start_override(last_state.attributes["override"], end)
+
+        self._model = self._coordinator.thermal.get(self.entry.entry_id)
+        if self._schedule:
+            self._unsub_schedule = self._coordinator.schedules.register(
+                self.entry.entry_id, self._schedule, self._handle_schedule
+            )
+            self._scheduled_preset = self._coordinator.schedules.current_preset(self.entry.entry_id)
+
+        self._unsub_dispatcher = self._coordinator.dispatcher.register_room(
+            self.entry.entry_id,
+            self._fil_pilote_select,
+            self._resolve_central_option,
+            self._coordinator.zone,
+            self._desired_option,
+        )
+        instrument = partial(self._coordinator.instrumentation.wrap, self.entity_id)
         self._sync_from_central()
-        self.hass.bus.async_listen(f"{DOMAIN}_central_changed", self._sync_from_central)
+        self._unsub_central = self._coordinator.async_subscribe_central(
+            {
+                "ready", "hvac_mode", "preset_mode", "target_temperature", "temperatures", "auto_eco_active",
+                "tariff_level", "tariff_preheat",
+            },
+            instrument(self._sync_from_central),
+        )
 
-        self._unsub_temp = async_track_state_change_event(self.hass, [self._temp_sensor], self._update_room_temp)
-        if self._window_sensors:
-            self._unsub_windows = async_track_state_change_event(self.hass, self._window_sensors, self._check_windows)
+        if self._window_detection:
+            self._detector = self._coordinator.window_detector(self.entry.entry_id, entry_config(self.entry))
+            self._unsub_detector = self._detector.add_listener(instrument(self._check_windows))
+
+        self._track_sensors()
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass, SIGNAL_OPTIONS_UPDATED.format(self.entry.entry_id), self._apply_options
+            )
+        )
 
         self._update_room_temp()
         self._check_windows()
 
+        if self._pwm:
+            self._unsub_cycle = self._coordinator.cycles.register(
+                self.entry.entry_id, self._pwm_cycle, self._compute_duty, self._handle_pwm_switch
+            )
+        self._unsub_shedder = self._coordinator.shedder.register_room(
+            self.entry.entry_id,
+            int(self.entry.data.get(CONF_PRIORITY, DEFAULT_PRIORITY)),
+            self.entry.data.get(CONF_WATTAGE),
+            self._async_set_shed,
+            self._draws_power,
+        )
+
+        booting = not self.hass.is_running
+        self.async_on_remove(async_at_started(self.hass, partial(self._async_hass_started, booting)))
+
+    @callback
+    def _async_hass_started(self, booting: bool, _hass: HomeAssistant) -> None:
+        """Au démarrage, réaligne le radiateur après un délai aléatoire, seulement s'il a dérivé."""
+        delay = random.uniform(0, self._coordinator.startup_jitter) if booting else 0
+        self._unsub_startup = async_call_later(self.hass, delay, self._reconcile_startup)
+
+    @callback
+    def _reconcile_startup(self, _now=None) -> None:
+        self._unsub_startup = None
+        self._started = True
+        self._coordinator.update_room(self.entry.entry_id, started=True)
+        self.hass.async_create_task(
+            self._coordinator.dispatcher.async_reconcile(self._fil_pilote_select, self._desired_option(), self._priority())
+        )
+
     async def async_will_remove_from_hass(self):
-        if self._unsub_temp:
-            self._unsub_temp()
-        if self._unsub_windows:
-            self._unsub_windows()
+        if self._unsub_startup:
+            self._unsub_startup()
+        self._untrack_sensors()
+        self._coordinator.overrides.cancel(self.entry.entry_id)
+        if self._unsub_dispatcher:
+            self._unsub_dispatcher()
+        if self._unsub_cycle:
+            self._unsub_cycle()
+        if self._unsub_central:
+            self._unsub_central()
+        if self._unsub_shedder:
+            self._unsub_shedder()
+        if self._unsub_schedule:
+            self._unsub_schedule()
+        if self._unsub_detector:
+            self._unsub_detector()
+        self._coordinator.energy.set_power(self.entry.entry_id, 0)
+        self._coordinator.remove_room(self.entry.entry_id)
+
+    def _read_options(self, config: dict[str, Any]) -> None:
+        self._override_minutes = config.get(CONF_OVERRIDE_DURATION) or DEFAULT_OVERRIDE_DURATION
+        self._boost_minutes = config.get(CONF_BOOST_DURATION) or DEFAULT_BOOST_DURATION
+        self._temp_sensor = config["temperature_sensor"]
+        self._window_sensors = [s.strip() for s in config.get("window_sensors", "").split(",") if s.strip()]
+        self._filter = build_filter(config.get(CONF_FILTER), config.get(CONF_FILTER_WINDOW))
+        self._hysteresis_override = config.get(CONF_HYSTERESIS)
+
+    @callback
+    def _track_sensors(self) -> None:
+        instrument = partial(self._coordinator.instrumentation.wrap, self.entity_id)
+        self._unsub_aggregator = self._coordinator.aggregator.add_sensor(
+            self._temp_sensor, self.entry.data.get(CONF_AREA)
+        )
+        self._unsub_temp = async_track_state_change_event(
+            self.hass, [self._temp_sensor], instrument(self._update_room_temp)
+        )
+        if self._window_sensors:
+            self._unsub_windows = async_track_state_change_event(
+                self.hass, self._window_sensors, instrument(self._check_windows)
+            )
+
+    @callback
+    def _untrack_sensors(self) -> None:
+        for unsub in (self._unsub_temp, self._unsub_windows, self._unsub_aggregator):
+            if unsub:
+                unsub()
+        self._unsub_temp = self._unsub_windows = self._unsub_aggregator = None
+
+    @callback
+    def _apply_options(self, config: dict[str, Any]) -> None:
+        """Options modifiées : sondes, filtre, hystérésis et détection de fenêtre changent en place."""
+        self._untrack_sensors()
+        self._read_options(config)
+        self._track_sensors()
+        self._hysteresis = self._preset_hysteresis()
+        if self._detector:
+            self._detector.configure(config.get(CONF_WINDOW_DROP_RATE), config.get(CONF_WINDOW_TIMEOUT))
+        self._update_room_temp()
+        self._check_windows()
+
+    def _preset_hysteresis(self) -> float:
+        if self._hysteresis_override is not None:
+            return float(self._hysteresis_override)
+        return HYSTERESIS.get(self._preset_mode, 0.3)
 
     @callback
-    def _sync_from_central(self, event=None):
-        central = self.hass.states.get("climate.electric_heater_central")
-        if not central:
+    def _sync_from_central(self, changes=None, immediate: bool = False):
+        """Reprend l'état du central ; l'ordre fil pilote est envoyé par le central lui-même."""
+        central = self._coordinator.central
+        if not central.ready:
             return
-        self._hvac_mode = HVACMode(central.state)
-        self._preset_mode = central.attributes.get("preset_mode", PRESET_COMFORT)
-        temps = central.attributes.get("temperatures", {})
-        key = {"comfort": "comfort", "comfort_-1": "comfort_m1", "comfort_-2": "comfort_m2", "eco": "eco", "frost_protection": "frost_protection"}.get(self._preset_mode, "comfort")
-        self._target_temp = temps.get(key)
-        self._hysteresis = HYSTERESIS.get(self._preset_mode, 0.3)
-        self.hass.create_task(self._apply_fil_pilote())
-        self.async_write_ha_state()
+        self._hvac_mode = central.hvac_mode
+        self._preset_mode = self._effective_preset(central.preset_mode)
+        if self._preset_mode == central.preset_mode:
+            self._target_temp = central.target_temperature
+        else:
+            key = PRESET_TEMP_KEY.get(self._preset_mode)
+            self._target_temp = central.temperatures.get(key) if key else None
+        self._hysteresis = self._preset_hysteresis()
+        self._write_state(immediate)
+
+    def _effective_preset(self, central_preset: str) -> str:
+        """Dérogation, programme de la pièce ajusté au tarif, puis préchauffage ; l'arrêt l'emporte et une absence plafonne à éco."""
+        if central_preset == PRESET_OFF or self._hvac_mode == HVACMode.OFF:
+            return central_preset
+        if self._override:
+            # Choisie à la main sur la pièce : elle passe avant le programme, le préchauffage et l'absence.
+            return self._override
+        tariff = self._coordinator.tariff
+        preset = tariff.adjust(self._scheduled_preset or central_preset)
+        if self._coordinator.central.auto_eco_active:
+            return min(preset, PRESET_ECO, key=ORDER_LEVEL.__getitem__)
+        if self._preheat and ORDER_LEVEL[tariff.adjust(self._preheat)] > ORDER_LEVEL[preset]:
+            return tariff.adjust(self._preheat)
+        return preset
+
+    @callback
+    def _handle_schedule(self, preset: str) -> None:
+        self._scheduled_preset = preset
+        self._preheat = None
+        self._sync_from_central()
+        self.hass.async_create_task(self._apply_fil_pilote())
+
+    @callback
+    def _update_preheat(self) -> None:
+        """Anticipe la prochaine période de confort du programme d'après le modèle thermique."""
+        preheat = None
+        central = self._coordinator.central
+        upcoming = self._coordinator.schedules.next_transition(
+            self.entry.entry_id if self._schedule else self._coordinator.zone
+        )
+        if upcoming and self._current_temp is not None and not self._window_open and not central.auto_eco_active:
+            delay, preset = upcoming
+            target = central.temperatures.get(PRESET_TEMP_KEY.get(preset, ""))
+            if preset in PWM_PRESETS and target is not None:
+                lead = self._model.time_to_reach(self._current_temp, target, self._coordinator.outdoor_temperature())
+                if lead is not None and delay <= lead:
+                    preheat = preset
+        if preheat != self._preheat:
+            self._preheat = preheat
+            self._sync_from_central()
+            self.hass.async_create_task(self._apply_fil_pilote())
 
     @callback
     def _update_room_temp(self, event=None):
         state = self.hass.states.get(self._temp_sensor)
-        self._current_temp = float(state.state) if state and state.state not in ("unknown", "unavailable") else None
-        self.async_write_ha_state()
+        raw = parse_temperature(state)
+        if raw is None and not is_unavailable(state):
+            # Pic ou valeur non numérique : ignorée, sans toucher au filtre, à l'agrégat ni au modèle.
+            return
+        if self._detector and event is not None:
+            # La détection de fenêtre travaille sur les mesures brutes : le filtrage retarderait la chute.
+            self._detector.add_sample(raw)
+        value = self._filter.update(raw)
+        self._current_temp = round(value, 2) if value is not None else None
+        self._coordinator.aggregator.update(self._temp_sensor, self._current_temp)
+        if self._current_temp is None or self._window_open:
+            self._model.reset_anchor()
+        elif self._model.observe(
+            self._current_temp, self.hvac_action == HVACAction.HEATING, self._coordinator.outdoor_temperature()
+        ):
+            self._coordinator.thermal.async_schedule_save()
+        self._update_preheat()
+        self._write_state()
 
     @callback
     def _check_windows(self, event=None):
-        self._window_open = any(self.hass.states.get(eid) and self.hass.states.get(eid).state == "on" for eid in self._window_sensors)
+        contact = any(self.hass.states.get(eid) and self.hass.states.get(eid).state == "on" for eid in self._window_sensors)
+        self._window_open = contact or bool(self._detector and self._detector.detected)
         self.hass.create_task(self._apply_fil_pilote())
-        self.async_write_ha_state()
+        self._write_state()
+
+    def _pwm_active(self) -> bool:
+        return self._pwm is not None and self._preset_mode in PWM_PRESETS
+
+    def _compute_duty(self) -> float:
+        if not self._pwm_active() or self._window_open or self._hvac_mode == HVACMode.OFF:
+            self._pwm.reset()
+            return 0.0
+        return self._pwm.update(self._target_temp, self._current_temp)
+
+    @callback
+    def _handle_pwm_switch(self, on: bool) -> None:
+        self._pwm_on = on
+        if self._pwm_active():
+            self.hass.create_task(self._apply_fil_pilote())
+        self._write_state()
+
+    def _resolve_central_option(self, option: str) -> str:
+        if self._window_open:
+            return "off"
+        if self._override or self._scheduled_preset or self._preheat or self._coordinator.tariff.active:
+            option = FIL_PILOTE_PAYLOAD[self._effective_preset(option)]["fil_pilote"]
+        if self._pwm and self._override != PRESET_BOOST and option in (FIL_PILOTE_PAYLOAD[p]["fil_pilote"] for p in PWM_PRESETS):
+            option = FIL_PILOTE_PAYLOAD[PRESET_COMFORT]["fil_pilote"] if self._pwm_on else self._pwm_low_option
+        if self._shed:
+            shed_option = FIL_PILOTE_PAYLOAD[self._coordinator.shed_order]["fil_pilote"]
+            if ORDER_LEVEL[shed_option] < ORDER_LEVEL.get(option, 0):
+                return shed_option
+        return option
+
+    def _desired_option(self) -> str:
+        if self._hvac_mode == HVACMode.OFF:
+            return "off"
+        # Même résolution que la diffusion du central : l'ajustement tarifaire ne doit pas s'appliquer deux fois.
+        central = self._coordinator.central
+        preset = central.preset_mode if central.ready else self._preset_mode
+        return self._resolve_central_option(FIL_PILOTE_PAYLOAD[preset]["fil_pilote"])
+
+    @callback
+    def _write_state(self, immediate: bool = False) -> None:
+        changes = self._coordinator.update_room(
+            self.entry.entry_id,
+            current_temperature=self._current_temp,
+            hvac_action=self.hvac_action,
+            option=self._desired_option(),
+            window_open=self._window_open,
+        )
+        if "hvac_action" in changes or "option" in changes:
+            self._coordinator.energy.set_power(self.entry.entry_id, self._heating_power())
+        self.async_write_coalesced(immediate)
+
+    def _heating_power(self) -> float:
+        """Puissance estimée : celle du radiateur tant qu'il chauffe et que l'ordre le permet."""
+        if self.hvac_action != HVACAction.HEATING or self._desired_option() == PRESET_OFF:
+            return 0.0
+        return float(self.entry.data.get(CONF_WATTAGE) or DEFAULT_WATTAGE)
+
+    def _priority(self) -> int:
+        return PRIORITY_SAFETY if self._window_open or self._shed else PRIORITY_ROOM
+
+    def _draws_power(self) -> bool:
+        """Vrai si l'ordre courant chauffe davantage que l'ordre de délestage."""
+        return ORDER_LEVEL.get(self._desired_option(), 0) > ORDER_LEVEL[self._coordinator.shed_order]
+
+    async def _async_set_shed(self, shed: bool) -> None:
+        """Appelé par le délestage ; l'ordre part même pendant l'étalement du démarrage."""
+        self._shed = shed
+        self._write_state()
+        await self._coordinator.dispatcher.async_send(self._fil_pilote_select, self._desired_option(), self._priority())
 
     async def _apply_fil_pilote(self):
-        option = "off" if self._window_open or self._hvac_mode == HVACMode.OFF else FIL_PILOTE_PAYLOAD[self._preset_mode]["fil_pilote"]
-        await self.hass.services.async_call("select", "select_option", {"entity_id": self._fil_pilote_select, "option": option})
+        if not self._started:
+            # Pendant le démarrage, l'ordre est envoyé une seule fois par _reconcile_startup.
+            return
+        await self._coordinator.dispatcher.async_send(self._fil_pilote_select, self._desired_option(), self._priority())
+
+    @callback
+    def _start_override(self, preset: str, end: datetime) -> bool:
+        remaining = (end - dt_util.now()).total_seconds()
+        if remaining <= 0:
+            return False
+        self._override = preset
+        self._override_end = end
+        self._coordinator.overrides.schedule(self.entry.entry_id, remaining, self._end_override)
+        return True
+
+    @callback
+    def _end_override(self) -> None:
+        self._set_override(None)
+
+    @callback
+    def _set_override(self, preset: str | None, minutes: float = 0) -> None:
+        """Dérogation de la pièce seule : seul son radiateur est commandé, ici comme à l'échéance."""
+        if preset is None or not self._start_override(preset, dt_util.now() + timedelta(minutes=minutes)):
+            self._coordinator.overrides.cancel(self.entry.entry_id)
+            self._override = self._override_end = None
+        # Changement demandé par l'utilisateur : affiché tout de suite, hors fenêtre de regroupement.
+        self._sync_from_central(immediate=True)
+        self.hass.async_create_task(self._apply_fil_pilote())
+
+    async def async_set_temperature(self, **kwargs):
+        """Le fil pilote ne connaît que des ordres : dérogation au preset dont la consigne est la plus proche."""
+        if (temperature := kwargs.get("temperature")) is None:
+            return
+        temperatures = self._coordinator.central.temperatures
+        preset = min(
+            (p for p in PRESETS if PRESET_TEMP_KEY.get(p) in temperatures),
+            key=lambda p: abs(temperatures[PRESET_TEMP_KEY[p]] - temperature),
+            default=None,
+        )
+        if preset:
+            self._set_override(preset, self._override_minutes)
+
+    async def async_set_hvac_mode(self, hvac_mode: HVACMode):
+        """Arrêt : dérogation à l'arrêt ; chauffe : retour immédiat à l'ordre du central."""
+        self._set_override(PRESET_OFF if hvac_mode == HVACMode.OFF else None, self._override_minutes)
 
-    async def async_set_temperature(self, **kwargs): pass
-    async def async_set_hvac_mode(self, hvac_mode: HVACMode): pass
-    async def async_set_preset_mode(self, preset_mode: str): pass
+    async def async_set_preset_mode(self, preset_mode: str):
+        if preset_mode not in ROOM_PRESETS:
+            return
+        self._set_override(
+            preset_mode, self._boost_minutes if preset_mode == PRESET_BOOST else self._override_minutes
+        )
@@ -0,0 +1,157 @@
+"""File d'attente des ordres fil pilote pour Chauffage Électrique Fil Pilote FR."""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+from .const import DEFAULT_COMMAND_RATE, DEFAULT_COMMAND_BURST, DEFAULT_DISPATCH_CONCURRENCY
+
+_LOGGER = logging.getLogger(__name__)
+
+Sender = Callable[[str, str], Awaitable[None]]
+
+
+@dataclass
+class _Pending:
+    option: str
+    priority: int
+    seq: int
+    futures: list[asyncio.Future] = field(default_factory=list)
+
+
+class CommandQueue:
+    """File unique pour tous les selects, limitée par un seau à jetons.
+
+    - au plus `rate` ordres par seconde en régime établi, `burst` d'un coup ;
+    - les ordres de plus haute priorité (valeur la plus basse) partent d'abord ;
+    - un nouvel ordre pour un select déjà en attente remplace l'ancien, qui n'est
+      jamais envoyé (son attente se termine avec False).
+    """
+
+    def __init__(
+        self,
+        sender: Sender,
+        rate: float = DEFAULT_COMMAND_RATE,
+        burst: int = DEFAULT_COMMAND_BURST,
+        concurrency: int = DEFAULT_DISPATCH_CONCURRENCY,
+    ):
+        self._sender = sender
+        self._heap: list[tuple[int, int, str]] = []
+        self._pending: dict[str, _Pending] = {}
+        self._seq = itertools.count()
+        self._worker: asyncio.Task | None = None
+        self._in_flight = 0
+        self._slot_freed: asyncio.Future | None = None
+        self._tokens = float(burst)
+        self.superseded = 0
+        self.configure(rate, burst, concurrency)
+
+    def configure(self, rate: float, burst: int, concurrency: int) -> None:
+        """Réglage en place : les envois en cours gardent leur place dans la limite de concurrence."""
+        self.rate = max(0.1, float(rate))
+        self.burst = max(1, int(burst))
+        self._tokens = min(self._tokens, float(self.burst))
+        self._refilled_at = time.monotonic()
+        self.concurrency = max(1, int(concurrency))
+        self._wake()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def pending_option(self, select_id: str) -> str | None:
+        pending = self._pending.get(select_id)
+        return pending.option if pending else None
+
+    def submit(self, select_id: str, option: str, priority: int) -> asyncio.Future:
+        """Met un ordre en file ; le futur vaut True une fois l'ordre envoyé."""
+        future = asyncio.get_running_loop().create_future()
+        pending = self._pending.get(select_id)
+        if pending is None:
+            pending = self._pending[select_id] = _Pending(option, priority, next(self._seq))
+            heapq.heappush(self._heap, (priority, pending.seq, select_id))
+        else:
+            if pending.option != option:
+                self.superseded += 1
+                for old in pending.futures:
+                    if not old.done():
+                        old.set_result(False)
+                pending.futures.clear()
+                pending.option = option
+            if priority < pending.priority:
+                # L'ancienne entrée du tas devient obsolète (numéro de séquence différent).
+                pending.priority, pending.seq = priority, next(self._seq)
+                heapq.heappush(self._heap, (priority, pending.seq, select_id))
+        pending.futures.append(future)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+        return future
+
+    async def _take_token(self) -> None:
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+            self._refilled_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def _pop(self) -> tuple[str, _Pending] | None:
+        while self._heap:
+            _, seq, select_id = heapq.heappop(self._heap)
+            pending = self._pending.get(select_id)
+            if pending and pending.seq == seq:
+                del self._pending[select_id]
+                return select_id, pending
+        return None
+
+    def _wake(self) -> None:
+        if self._slot_freed and not self._slot_freed.done():
+            self._slot_freed.set_result(None)
+
+    def _release(self) -> None:
+        self._in_flight -= 1
+        self._wake()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            # Compteur plutôt que sémaphore : `configure` change la limite sans perdre les envois en cours.
+            while self._in_flight >= self.concurrency:
+                self._slot_freed = loop.create_future()
+                await self._slot_freed
+            self._in_flight += 1
+            await self._take_token()
+            # Dépilé au dernier moment : les ordres arrivés pendant l'attente sont fusionnés.
+            item = self._pop()
+            if item is None:
+                self._release()
+                continue
+            loop.create_task(self._send(*item))
+
+    async def _send(self, select_id: str, pending: _Pending) -> None:
+        try:
+            await self._sender(select_id, pending.option)
+        except Exception as err:  # noqa: BLE001 - transmis à chaque demandeur
+            for future in pending.futures:
+                if not future.done():
+                    future.set_exception(err)
+        else:
+            for future in pending.futures:
+                if not future.done():
+                    future.set_result(True)
+        finally:
+            self._release()
+
+    def cancel(self) -> None:
+        if self._worker:
+            self._worker.cancel()
+        for pending in self._pending.values():
+            for future in pending.futures:
+                if not future.done():
+                    future.cancel()
+        self._pending.clear()
+        self._heap.clear()
@@ -1,32 +1,155 @@
+import asyncio
+from typing import Any
+
 import voluptuous as vol
 from homeassistant import config_entries
 from homeassistant.const import CONF_NAME
+from homeassistant.core import callback
 from homeassistant.helpers import selector
+from homeassistant.util import slugify
 from .const import (
     DOMAIN, CENTRAL, ROOM, CONF_TEMP_METHOD, CONF_TEMP_METHOD_AVERAGE,
-    CONF_TEMP_METHOD_REFERENCE, CONF_PRESENCE_SENSOR
+    CONF_TEMP_METHOD_REFERENCE, CONF_PRESENCE_SENSOR, CONF_DISPATCH_CONCURRENCY, DEFAULT_DISPATCH_CONCURRENCY,
+    CONF_TEMP_METHOD_WEIGHTED, CONF_TEMP_METHOD_MEDIAN, CONF_TEMP_METHOD_MIN, CONF_TEMP_METHOD_MAX,
+    CONF_TEMP_METHOD_TRIMMED, CONF_AREA, CONF_REGULATION, REGULATION_FIL_PILOTE, REGULATION_PWM,
+    CONF_PWM_CYCLE, CONF_PWM_LOW_ORDER, DEFAULT_PWM_CYCLE, PRESET_ECO, PRESET_OFF,
+    CONF_WRITE_WINDOW, DEFAULT_WRITE_WINDOW, CONF_COMMAND_RATE, DEFAULT_COMMAND_RATE, CONF_COMMAND_BURST,
+    DEFAULT_COMMAND_BURST, CONF_STARTUP_JITTER, DEFAULT_STARTUP_JITTER, CONF_POWER_SENSOR, CONF_POWER_LIMIT,
+    CONF_SHED_ORDER, DEFAULT_SHED_ORDER, CONF_WATTAGE, CONF_PRIORITY, DEFAULT_WATTAGE, DEFAULT_PRIORITY, CONF_SCHEDULE,
+    CONF_OUTDOOR_SENSOR, CONF_FILTER, CONF_FILTER_WINDOW, FILTER_NONE, FILTER_MEDIAN, FILTER_EMA, FILTER_RATE,
+    DEFAULT_FILTER_WINDOW, CONF_WINDOW_DETECTION, CONF_WINDOW_DROP_RATE, CONF_WINDOW_TIMEOUT, DEFAULT_WINDOW_DROP_RATE,
+    DEFAULT_WINDOW_TIMEOUT, CONF_ZONE, DEFAULT_ZONE, CONF_COMMAND_BACKEND, BACKEND_SELECT, BACKEND_MQTT,
+    CONF_MQTT_BASE_TOPIC, DEFAULT_MQTT_BASE_TOPIC, CONF_INSTRUMENTATION, CONF_HYSTERESIS, TEMP_CONF_KEYS,
+    CONF_OVERRIDE_DURATION, DEFAULT_OVERRIDE_DURATION, CONF_BOOST_DURATION, DEFAULT_BOOST_DURATION,
+    CONF_TARIFF_COLOR_SENSOR, CONF_TARIFF_NEXT_COLOR_SENSOR, CONF_TARIFF_OFFPEAK_SENSOR, CONF_TARIFF_CALENDAR,
+    CONF_TARIFF_OFFPEAK_HOURS, DEFAULT_TARIFF_OFFPEAK_HOURS, CONF_TARIFF_FLOOR, DEFAULT_TARIFF_FLOOR,
+    CONF_TARIFF_PREHEAT, DEFAULT_TARIFF_PREHEAT, PRESET_COMFORT_M1, PRESET_COMFORT_M2, CONF_MIN_DWELL,
+    DEFAULT_MIN_DWELL, CONF_PRESENCE_DELAY, DEFAULT_PRESENCE_DELAY
 )
+from .bulk_import import parse_rooms, validate_rooms
+from .coordinator import entry_config
+from .schedule import WeeklySchedule
+from .tariff import TariffCalendar, parse_hours
+
+
+# Réglages d'envoi des ordres, communs à toutes les zones : saisis sur le premier central et
+# recopiés dans les centraux des zones suivantes, qui peuvent ainsi prendre le relais.
+SHARED_DISPATCH_KEYS = (
+    CONF_DISPATCH_CONCURRENCY, CONF_COMMAND_RATE, CONF_COMMAND_BURST, CONF_COMMAND_BACKEND, CONF_MQTT_BASE_TOPIC,
+    CONF_MIN_DWELL,
+)
+
+
+def _filter_selector() -> selector.SelectSelector:
+    return selector.SelectSelector(
+        selector.SelectSelectorConfig(options=[
+            {"value": FILTER_NONE, "label": "Aucun (valeurs aberrantes seulement)"},
+            {"value": FILTER_MEDIAN, "label": "Médiane glissante"},
+            {"value": FILTER_EMA, "label": "Moyenne mobile exponentielle"},
+            {"value": FILTER_RATE, "label": "Limitation de la vitesse de variation"}
+        ], mode="dropdown")
+    )
+
+
+def _schedule_error(user_input: dict) -> dict:
+    """Valide le programme hebdomadaire saisi, s'il y en a un."""
+    if text := user_input.get(CONF_SCHEDULE):
+        try:
+            WeeklySchedule(text)
+        except ValueError:
+            return {CONF_SCHEDULE: "invalid_schedule"}
+    return {}
+
+
+async def _tariff_error(hass, user_input: dict) -> dict:
+    """Valide les heures creuses et le calendrier tarifaire saisis."""
+    try:
+        parse_hours(user_input.get(CONF_TARIFF_OFFPEAK_HOURS) or DEFAULT_TARIFF_OFFPEAK_HOURS)
+    except ValueError:
+        return {CONF_TARIFF_OFFPEAK_HOURS: "invalid_hours"}
+    if path := user_input.get(CONF_TARIFF_CALENDAR):
+        try:
+            await hass.async_add_executor_job(TariffCalendar.load, path)
+        except (OSError, ValueError):
+            return {CONF_TARIFF_CALENDAR: "invalid_calendar"}
+    return {}
+
+
+def _room_entry_data(user_input: dict, default_zone: str) -> dict:
+    """Données d'une entrée pièce ; les champs absents prennent leur valeur par défaut."""
+    return {
+        "type": ROOM,
+        CONF_ZONE: user_input.get(CONF_ZONE) or default_zone,
+        CONF_NAME: user_input[CONF_NAME],
+        "fil_pilote_select": user_input["fil_pilote_select"],
+        "temperature_sensor": user_input["temperature_sensor"],
+        "window_sensors": ",".join(user_input.get("window_sensors", [])),
+        CONF_WINDOW_DETECTION: user_input.get(CONF_WINDOW_DETECTION, not user_input.get("window_sensors")),
+        CONF_WINDOW_DROP_RATE: user_input.get(CONF_WINDOW_DROP_RATE, DEFAULT_WINDOW_DROP_RATE),
+        CONF_WINDOW_TIMEOUT: user_input.get(CONF_WINDOW_TIMEOUT, DEFAULT_WINDOW_TIMEOUT),
+        CONF_FILTER: user_input.get(CONF_FILTER, FILTER_MEDIAN),
+        CONF_FILTER_WINDOW: int(user_input.get(CONF_FILTER_WINDOW, DEFAULT_FILTER_WINDOW)),
+        CONF_AREA: user_input.get(CONF_AREA),
+        CONF_REGULATION: user_input.get(CONF_REGULATION, REGULATION_FIL_PILOTE),
+        CONF_PWM_CYCLE: user_input.get(CONF_PWM_CYCLE, DEFAULT_PWM_CYCLE),
+        CONF_PWM_LOW_ORDER: user_input.get(CONF_PWM_LOW_ORDER, PRESET_ECO),
+        CONF_WATTAGE: user_input.get(CONF_WATTAGE, DEFAULT_WATTAGE),
+        CONF_PRIORITY: int(user_input.get(CONF_PRIORITY, DEFAULT_PRIORITY)),
+        CONF_SCHEDULE: user_input.get(CONF_SCHEDULE),
+    }
+
 
 class ElectricHeaterConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry: config_entries.ConfigEntry) -> config_entries.OptionsFlow:
+        return ElectricHeaterOptionsFlow()
+
+    def _zones(self) -> dict[str, str]:
+        """Zones existantes et le nom de leur central."""
+        return {
+            e.data.get(CONF_ZONE) or DEFAULT_ZONE: e.title
+            for e in self.hass.config_entries.async_entries(DOMAIN)
+            if e.data.get("type") == CENTRAL
+        }
+
+    def _shared_dispatch(self) -> dict[str, Any]:
+        """Réglages d'envoi du central de la zone par défaut."""
+        for e in self.hass.config_entries.async_entries(DOMAIN):
+            if e.data.get("type") == CENTRAL and (e.data.get(CONF_ZONE) or DEFAULT_ZONE) == DEFAULT_ZONE:
+                return {key: e.data[key] for key in SHARED_DISPATCH_KEYS if key in e.data}
+        return {}
+
     async def async_step_user(self, user_input=None):
-        central_exists = any(e.data.get("type") == CENTRAL for e in self.hass.config_entries.async_entries(DOMAIN))
-        if not central_exists:
+        if not self._zones():
             return await self.async_step_central()
-        return await self.async_step_room()
+        return self.async_show_menu(step_id="user", menu_options=["room", "import_rooms", "central"])
 
     async def async_step_central(self, user_input=None):
         errors = {}
         if user_input is not None:
+            zones = self._zones()
+            # Le premier central garde la zone historique, et donc ses identifiants.
+            zone = slugify(user_input[CONF_NAME]) if zones else DEFAULT_ZONE
+            if zone in zones or not zone:
+                errors[CONF_NAME] = "zone_exists"
+            else:
+                errors = _schedule_error(user_input)
+        if user_input is not None and not errors:
             return self.async_create_entry(
                 title=user_input.get(CONF_NAME, "Chauffage Central"),
                 data={
                     "type": CENTRAL,
+                    CONF_ZONE: zone,
                     CONF_NAME: user_input[CONF_NAME],
                     CONF_TEMP_METHOD: user_input[CONF_TEMP_METHOD],
                     "temperature_sensor": user_input.get("temperature_sensor"),
                     CONF_PRESENCE_SENSOR: user_input.get(CONF_PRESENCE_SENSOR),
+                    CONF_OUTDOOR_SENSOR: user_input.get(CONF_OUTDOOR_SENSOR),
+                    CONF_FILTER: user_input.get(CONF_FILTER, FILTER_MEDIAN),
+                    CONF_FILTER_WINDOW: int(user_input.get(CONF_FILTER_WINDOW, DEFAULT_FILTER_WINDOW)),
                     "comfort_temp": user_input["comfort_temp"],
                     "comfort_m1_temp": user_input["comfort_m1_temp"],
                     "comfort_m2_temp": user_input["comfort_m2_temp"],
@@ -35,60 +158,303 @@ class ElectricHeaterConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                     "min_temp": user_input["min_temp"],
                     "max_temp": user_input["max_temp"],
                     "temp_step": user_input["temp_step"],
+                    CONF_DISPATCH_CONCURRENCY: int(user_input.get(CONF_DISPATCH_CONCURRENCY, DEFAULT_DISPATCH_CONCURRENCY)),
+                    CONF_WRITE_WINDOW: user_input.get(CONF_WRITE_WINDOW, DEFAULT_WRITE_WINDOW),
+                    CONF_COMMAND_RATE: user_input.get(CONF_COMMAND_RATE, DEFAULT_COMMAND_RATE),
+                    CONF_COMMAND_BURST: int(user_input.get(CONF_COMMAND_BURST, DEFAULT_COMMAND_BURST)),
+                    CONF_STARTUP_JITTER: user_input.get(CONF_STARTUP_JITTER, DEFAULT_STARTUP_JITTER),
+                    CONF_MIN_DWELL: user_input.get(CONF_MIN_DWELL, DEFAULT_MIN_DWELL),
+                    CONF_COMMAND_BACKEND: user_input.get(CONF_COMMAND_BACKEND, BACKEND_SELECT),
+                    CONF_MQTT_BASE_TOPIC: user_input.get(CONF_MQTT_BASE_TOPIC, DEFAULT_MQTT_BASE_TOPIC),
+                    CONF_POWER_SENSOR: user_input.get(CONF_POWER_SENSOR),
+                    CONF_POWER_LIMIT: user_input.get(CONF_POWER_LIMIT),
+                    CONF_SHED_ORDER: user_input.get(CONF_SHED_ORDER, DEFAULT_SHED_ORDER),
+                    CONF_SCHEDULE: user_input.get(CONF_SCHEDULE),
+                    CONF_INSTRUMENTATION: user_input.get(CONF_INSTRUMENTATION, False),
+                    **self._shared_dispatch(),
                 }
             )
 
+        schema = {
+            vol.Optional(CONF_NAME, default="Chauffage Central"): str,
+            vol.Required(CONF_TEMP_METHOD, default=CONF_TEMP_METHOD_AVERAGE): selector.SelectSelector(
+                selector.SelectSelectorConfig(options=[
+                    {"value": CONF_TEMP_METHOD_AVERAGE, "label": "Moyenne des pièces"},
+                    {"value": CONF_TEMP_METHOD_WEIGHTED, "label": "Moyenne pondérée par la surface"},
+                    {"value": CONF_TEMP_METHOD_MEDIAN, "label": "Médiane des pièces"},
+                    {"value": CONF_TEMP_METHOD_TRIMMED, "label": "Moyenne sans les extrêmes"},
+                    {"value": CONF_TEMP_METHOD_MIN, "label": "Pièce la plus froide"},
+                    {"value": CONF_TEMP_METHOD_MAX, "label": "Pièce la plus chaude"},
+                    {"value": CONF_TEMP_METHOD_REFERENCE, "label": "Pièce de référence"}
+                ], mode="dropdown")
+            ),
+            vol.Optional("temperature_sensor"): selector.EntitySelector(
+                selector.EntitySelectorConfig(domain="sensor", device_class="temperature")
+            ),
+            vol.Optional(CONF_FILTER, default=FILTER_MEDIAN): _filter_selector(),
+            vol.Optional(CONF_FILTER_WINDOW, default=DEFAULT_FILTER_WINDOW): selector.NumberSelector(selector.NumberSelectorConfig(min=2, max=15, step=1, mode="box")),
+            vol.Optional(CONF_PRESENCE_SENSOR): selector.EntitySelector(selector.EntitySelectorConfig(domain="sensor")),
+            vol.Optional(CONF_OUTDOOR_SENSOR): selector.EntitySelector(
+                selector.EntitySelectorConfig(domain="sensor", device_class="temperature")
+            ),
+            vol.Required("comfort_temp", default=20.0): selector.NumberSelector(selector.NumberSelectorConfig(min=15, max=30, step=0.1, mode="box", unit_of_measurement="°C")),
+            vol.Required("comfort_m1_temp", default=19.0): selector.NumberSelector(selector.NumberSelectorConfig(min=15, max=30, step=0.1, mode="box", unit_of_measurement="°C")),
+            vol.Required("comfort_m2_temp", default=18.0): selector.NumberSelector(selector.NumberSelectorConfig(min=15, max=30, step=0.1, mode="box", unit_of_measurement="°C")),
+            vol.Required("eco_temp", default=16.5): selector.NumberSelector(selector.NumberSelectorConfig(min=10, max=25, step=0.1, mode="box", unit_of_measurement="°C")),
+            vol.Required("frost_temp", default=7.0): selector.NumberSelector(selector.NumberSelectorConfig(min=5, max=10, step=0.1, mode="box", unit_of_measurement="°C")),
+            vol.Required("min_temp", default=7.0): selector.NumberSelector(selector.NumberSelectorConfig(min=5, max=15, step=0.1, mode="box", unit_of_measurement="°C")),
+            vol.Required("max_temp", default=30.0): selector.NumberSelector(selector.NumberSelectorConfig(min=20, max=35, step=0.1, mode="box", unit_of_measurement="°C")),
+            vol.Required("temp_step", default=0.1): selector.NumberSelector(selector.NumberSelectorConfig(min=0.1, max=1.0, step=0.1, mode="box")),
+            vol.Optional(CONF_DISPATCH_CONCURRENCY, default=DEFAULT_DISPATCH_CONCURRENCY): selector.NumberSelector(selector.NumberSelectorConfig(min=1, max=50, step=1, mode="box")),
+            vol.Optional(CONF_COMMAND_RATE, default=DEFAULT_COMMAND_RATE): selector.NumberSelector(selector.NumberSelectorConfig(min=0.5, max=50, step=0.5, mode="box", unit_of_measurement="ordres/s")),
+            vol.Optional(CONF_COMMAND_BURST, default=DEFAULT_COMMAND_BURST): selector.NumberSelector(selector.NumberSelectorConfig(min=1, max=100, step=1, mode="box")),
+            vol.Optional(CONF_COMMAND_BACKEND, default=BACKEND_SELECT): selector.SelectSelector(
+                selector.SelectSelectorConfig(options=[
+                    {"value": BACKEND_SELECT, "label": "Service select (par défaut)"},
+                    {"value": BACKEND_MQTT, "label": "Publication MQTT directe vers Zigbee2MQTT"}
+                ], mode="dropdown")
+            ),
+            vol.Optional(CONF_MQTT_BASE_TOPIC, default=DEFAULT_MQTT_BASE_TOPIC): str,
+            vol.Optional(CONF_STARTUP_JITTER, default=DEFAULT_STARTUP_JITTER): selector.NumberSelector(selector.NumberSelectorConfig(min=0, max=600, step=1, mode="box", unit_of_measurement="s")),
+            vol.Optional(CONF_MIN_DWELL, default=DEFAULT_MIN_DWELL): selector.NumberSelector(selector.NumberSelectorConfig(min=0, max=900, step=5, mode="box", unit_of_measurement="s")),
+            vol.Optional(CONF_WRITE_WINDOW, default=DEFAULT_WRITE_WINDOW): selector.NumberSelector(selector.NumberSelectorConfig(min=0, max=60, step=0.5, mode="box", unit_of_measurement="s")),
+            vol.Optional(CONF_POWER_SENSOR): selector.EntitySelector(
+                selector.EntitySelectorConfig(domain="sensor", device_class="power")
+            ),
+            vol.Optional(CONF_POWER_LIMIT): selector.NumberSelector(selector.NumberSelectorConfig(min=1000, max=36000, step=100, mode="box", unit_of_measurement="W")),
+            vol.Optional(CONF_SHED_ORDER, default=DEFAULT_SHED_ORDER): selector.SelectSelector(
+                selector.SelectSelectorConfig(options=[
+                    {"value": PRESET_OFF, "label": "Arrêt"},
+                    {"value": PRESET_ECO, "label": "Éco"}
+                ], mode="dropdown")
+            ),
+            vol.Optional(CONF_SCHEDULE): selector.TextSelector(selector.TextSelectorConfig(multiline=True)),
+            vol.Optional(CONF_INSTRUMENTATION, default=False): selector.BooleanSelector(),
+        }
+        if self._zones():
+            # Réglages d'envoi communs à toutes les zones : recopiés du premier central.
+            schema = {key: value for key, value in schema.items() if key not in SHARED_DISPATCH_KEYS}
         return self.async_show_form(
             step_id="central",
-            data_schema=vol.Schema({
-                vol.Optional(CONF_NAME, default="Chauffage Central"): str,
-                vol.Required(CONF_TEMP_METHOD, default=CONF_TEMP_METHOD_AVERAGE): selector.SelectSelector(
-                    selector.SelectSelectorConfig(options=[
-                        {"value": CONF_TEMP_METHOD_AVERAGE, "label": "Moyenne des pièces"},
-                        {"value": CONF_TEMP_METHOD_REFERENCE, "label": "Pièce de référence"}
-                    ], mode="dropdown")
-                ),
-                vol.Optional("temperature_sensor"): selector.EntitySelector(
-                    selector.EntitySelectorConfig(domain="sensor", device_class="temperature")
-                ),
-                vol.Optional(CONF_PRESENCE_SENSOR): selector.EntitySelector(selector.EntitySelectorConfig(domain="sensor")),
-                vol.Required("comfort_temp", default=20.0): selector.NumberSelector(selector.NumberSelectorConfig(min=15, max=30, step=0.1, mode="box", unit_of_measurement="°C")),
-                vol.Required("comfort_m1_temp", default=19.0): selector.NumberSelector(selector.NumberSelectorConfig(min=15, max=30, step=0.1, mode="box", unit_of_measurement="°C")),
-                vol.Required("comfort_m2_temp", default=18.0): selector.NumberSelector(selector.NumberSelectorConfig(min=15, max=30, step=0.1, mode="box", unit_of_measurement="°C")),
-                vol.Required("eco_temp", default=16.5): selector.NumberSelector(selector.NumberSelectorConfig(min=10, max=25, step=0.1, mode="box", unit_of_measurement="°C")),
-                vol.Required("frost_temp", default=7.0): selector.NumberSelector(selector.NumberSelectorConfig(min=5, max=10, step=0.1, mode="box", unit_of_measurement="°C")),
-                vol.Required("min_temp", default=7.0): selector.NumberSelector(selector.NumberSelectorConfig(min=5, max=15, step=0.1, mode="box", unit_of_measurement="°C")),
-                vol.Required("max_temp", default=30.0): selector.NumberSelector(selector.NumberSelectorConfig(min=20, max=35, step=0.1, mode="box", unit_of_measurement="°C")),
-                vol.Required("temp_step", default=0.1): selector.NumberSelector(selector.NumberSelectorConfig(min=0.1, max=1.0, step=0.1, mode="box")),
-            }),
+            data_schema=vol.Schema(schema),
             errors=errors,
         )
 
     async def async_step_room(self, user_input=None):
-        if user_input is not None:
+        errors = {}
+        zones = self._zones()
+        if user_input is not None and not (errors := _schedule_error(user_input)):
             return self.async_create_entry(
-                title=user_input[CONF_NAME],
-                data={
-                    "type": ROOM,
-                    CONF_NAME: user_input[CONF_NAME],
-                    "fil_pilote_select": user_input["fil_pilote_select"],
-                    "temperature_sensor": user_input["temperature_sensor"],
-                    "window_sensors": ",".join(user_input.get("window_sensors", [])),
-                }
+                title=user_input[CONF_NAME], data=_room_entry_data(user_input, next(iter(zones), DEFAULT_ZONE))
             )
 
         return self.async_show_form(
             step_id="room",
             data_schema=vol.Schema({
                 vol.Required(CONF_NAME): str,
+                **({
+                    vol.Required(CONF_ZONE, default=next(iter(zones))): selector.SelectSelector(
+                        selector.SelectSelectorConfig(
+                            options=[{"value": zone, "label": title} for zone, title in zones.items()], mode="dropdown"
+                        )
+                    )
+                } if len(zones) > 1 else {}),
                 vol.Required("fil_pilote_select"): selector.EntitySelector(
                     selector.EntitySelectorConfig(domain="select", integration="mqtt")
                 ),
                 vol.Required("temperature_sensor"): selector.EntitySelector(
                     selector.EntitySelectorConfig(domain="sensor", device_class="temperature")
                 ),
+                vol.Optional(CONF_FILTER, default=FILTER_MEDIAN): _filter_selector(),
+                vol.Optional(CONF_FILTER_WINDOW, default=DEFAULT_FILTER_WINDOW): selector.NumberSelector(selector.NumberSelectorConfig(min=2, max=15, step=1, mode="box")),
                 vol.Optional("window_sensors"): selector.EntitySelector(
                     selector.EntitySelectorConfig(multiple=True, domain="binary_sensor", device_class="window")
                 ),
-            })
+                vol.Optional(CONF_WINDOW_DETECTION): selector.BooleanSelector(),
+                vol.Optional(CONF_WINDOW_DROP_RATE, default=DEFAULT_WINDOW_DROP_RATE): selector.NumberSelector(selector.NumberSelectorConfig(min=0.05, max=1.0, step=0.05, mode="box", unit_of_measurement="°C/min")),
+                vol.Optional(CONF_WINDOW_TIMEOUT, default=DEFAULT_WINDOW_TIMEOUT): selector.NumberSelector(selector.NumberSelectorConfig(min=5, max=120, step=5, mode="box", unit_of_measurement="min")),
+                vol.Optional(CONF_AREA): selector.NumberSelector(selector.NumberSelectorConfig(min=1, max=500, step=0.5, mode="box", unit_of_measurement="m²")),
+                vol.Optional(CONF_REGULATION, default=REGULATION_FIL_PILOTE): selector.SelectSelector(
+                    selector.SelectSelectorConfig(options=[
+                        {"value": REGULATION_FIL_PILOTE, "label": "Thermostat du radiateur"},
+                        {"value": REGULATION_PWM, "label": "Cycles confort / éco (PWM)"}
+                    ], mode="dropdown")
+                ),
+                vol.Optional(CONF_PWM_CYCLE, default=DEFAULT_PWM_CYCLE): selector.NumberSelector(selector.NumberSelectorConfig(min=5, max=60, step=1, mode="box", unit_of_measurement="min")),
+                vol.Optional(CONF_PWM_LOW_ORDER, default=PRESET_ECO): selector.SelectSelector(
+                    selector.SelectSelectorConfig(options=[
+                        {"value": PRESET_ECO, "label": "Éco"},
+                        {"value": PRESET_OFF, "label": "Arrêt"}
+                    ], mode="dropdown")
+                ),
+                vol.Optional(CONF_WATTAGE, default=DEFAULT_WATTAGE): selector.NumberSelector(selector.NumberSelectorConfig(min=100, max=5000, step=50, mode="box", unit_of_measurement="W")),
+                vol.Optional(CONF_PRIORITY, default=DEFAULT_PRIORITY): selector.NumberSelector(selector.NumberSelectorConfig(min=1, max=5, step=1, mode="slider")),
+                vol.Optional(CONF_SCHEDULE): selector.TextSelector(selector.TextSelectorConfig(multiline=True)),
+            }),
+            errors=errors,
+        )
+
+    async def async_step_import_rooms(self, user_input=None):
+        """Plusieurs pièces d'un coup (YAML ou CSV), toutes validées avant d'en créer une seule."""
+        errors: dict[str, str] = {}
+        placeholders = {"error": ""}
+        zones = self._zones()
+        if user_input is not None:
+            entries = [e for e in self.hass.config_entries.async_entries(DOMAIN) if e.data.get("type") == ROOM]
+            try:
+                rooms = parse_rooms(
+                    user_input["rooms"],
+                    lambda entity_id: self.hass.states.get(entity_id) is not None,
+                    {e.data["fil_pilote_select"] for e in entries},
+                    set(zones),
+                )
+            except ValueError as err:
+                errors["rooms"] = "invalid_rooms"
+                placeholders["error"] = str(err)
+            else:
+                default_zone = user_input.get(CONF_ZONE) or next(iter(zones), DEFAULT_ZONE)
+                # Chaque pièce reste une entrée (options, diagnostics et appareil propres) ; les
+                # entrées sont créées ensemble et s'installent en parallèle, et le résultat de
+                # chacune est attendu pour ne compter que les pièces réellement créées.
+                results = await asyncio.gather(
+                    *(
+                        self.hass.config_entries.flow.async_init(
+                            DOMAIN,
+                            context={"source": config_entries.SOURCE_IMPORT},
+                            data=_room_entry_data(room, default_zone),
+                        )
+                        for room in rooms
+                    ),
+                    return_exceptions=True,
+                )
+                failed = [
+                    f"{room[CONF_NAME]} ({result if isinstance(result, Exception) else result.get('reason')})"
+                    for room, result in zip(rooms, results)
+                    if isinstance(result, Exception) or result.get("type") != "create_entry"
+                ]
+                return self.async_abort(
+                    reason="rooms_imported",
+                    description_placeholders={
+                        "count": str(len(rooms) - len(failed)),
+                        "failed": f" ; refusées : {', '.join(failed)}" if failed else "",
+                    },
+                )
+
+        return self.async_show_form(
+            step_id="import_rooms",
+            data_schema=vol.Schema({
+                **({
+                    vol.Required(CONF_ZONE, default=next(iter(zones))): selector.SelectSelector(
+                        selector.SelectSelectorConfig(
+                            options=[{"value": zone, "label": title} for zone, title in zones.items()], mode="dropdown"
+                        )
+                    )
+                } if len(zones) > 1 else {}),
+                vol.Required("rooms"): selector.TextSelector(selector.TextSelectorConfig(multiline=True)),
+            }),
+            errors=errors,
+            description_placeholders=placeholders,
+        )
+
+    async def async_step_import(self, import_data):
+        """Pièce importée : mêmes contrôles que l'import groupé, contre les entrées existantes."""
+        entries = [e for e in self.hass.config_entries.async_entries(DOMAIN) if e.data.get("type") == ROOM]
+        try:
+            validate_rooms(
+                [(1, import_data)],
+                lambda entity_id: self.hass.states.get(entity_id) is not None,
+                {e.data["fil_pilote_select"] for e in entries},
+                set(self._zones()),
+            )
+        except ValueError as err:
+            return self.async_abort(reason="invalid_room", description_placeholders={"error": str(err)})
+        return self.async_create_entry(title=import_data[CONF_NAME], data=import_data)
+
+
+class ElectricHeaterOptionsFlow(config_entries.OptionsFlow):
+    """Consignes, sondes, filtre, hystérésis et fenêtres, appliqués sans recharger les entités."""
+
+    async def async_step_init(self, user_input=None):
+        if self.config_entry.data.get("type") == CENTRAL:
+            return await self.async_step_central()
+        return await self.async_step_room()
+
+    def _save(self, user_input: dict, keys: list[str]):
+        """Un champ vidé est enregistré à None pour masquer la valeur de la configuration initiale."""
+        return self.async_create_entry(title="", data={key: user_input.get(key) for key in keys})
+
+    async def async_step_central(self, user_input=None):
+        config = entry_config(self.config_entry)
+        errors = await _tariff_error(self.hass, user_input) if user_input is not None else {}
+        if user_input is not None and not errors:
+            return self._save(user_input, [
+                *TEMP_CONF_KEYS.values(), "temperature_sensor", CONF_PRESENCE_SENSOR, CONF_PRESENCE_DELAY, CONF_FILTER,
+                CONF_FILTER_WINDOW, CONF_TARIFF_COLOR_SENSOR, CONF_TARIFF_NEXT_COLOR_SENSOR, CONF_TARIFF_OFFPEAK_SENSOR, CONF_TARIFF_CALENDAR,
+                CONF_TARIFF_OFFPEAK_HOURS, CONF_TARIFF_FLOOR, CONF_TARIFF_PREHEAT,
+            ])
+
+        # Les consignes proposées sont celles en vigueur, éventuellement réglées depuis les entités number.
+        central = self.hass.data.get(DOMAIN, {}).get("zones", {}).get(config.get(CONF_ZONE) or DEFAULT_ZONE)
+        temps = central.central.temperatures if central and central.central.ready else {}
+        return self.async_show_form(
+            step_id="central",
+            data_schema=vol.Schema({
+                vol.Required("comfort_temp", default=temps.get("comfort", config["comfort_temp"])): selector.NumberSelector(selector.NumberSelectorConfig(min=15, max=30, step=0.1, mode="box", unit_of_measurement="°C")),
+                vol.Required("comfort_m1_temp", default=temps.get("comfort_m1", config["comfort_m1_temp"])): selector.NumberSelector(selector.NumberSelectorConfig(min=15, max=30, step=0.1, mode="box", unit_of_measurement="°C")),
+                vol.Required("comfort_m2_temp", default=temps.get("comfort_m2", config["comfort_m2_temp"])): selector.NumberSelector(selector.NumberSelectorConfig(min=15, max=30, step=0.1, mode="box", unit_of_measurement="°C")),
+                vol.Required("eco_temp", default=temps.get("eco", config["eco_temp"])): selector.NumberSelector(selector.NumberSelectorConfig(min=10, max=25, step=0.1, mode="box", unit_of_measurement="°C")),
+                vol.Required("frost_temp", default=temps.get("frost_protection", config["frost_temp"])): selector.NumberSelector(selector.NumberSelectorConfig(min=5, max=10, step=0.1, mode="box", unit_of_measurement="°C")),
+                vol.Optional("temperature_sensor", description={"suggested_value": config.get("temperature_sensor")}): selector.EntitySelector(
+                    selector.EntitySelectorConfig(domain="sensor", device_class="temperature")
+                ),
+                vol.Optional(CONF_FILTER, default=config.get(CONF_FILTER) or FILTER_MEDIAN): _filter_selector(),
+                vol.Optional(CONF_FILTER_WINDOW, default=config.get(CONF_FILTER_WINDOW) or DEFAULT_FILTER_WINDOW): selector.NumberSelector(selector.NumberSelectorConfig(min=2, max=15, step=1, mode="box")),
+                vol.Optional(CONF_PRESENCE_SENSOR, description={"suggested_value": config.get(CONF_PRESENCE_SENSOR)}): selector.EntitySelector(selector.EntitySelectorConfig(domain="sensor")),
+                vol.Optional(CONF_PRESENCE_DELAY, default=config.get(CONF_PRESENCE_DELAY, DEFAULT_PRESENCE_DELAY)): selector.NumberSelector(selector.NumberSelectorConfig(min=0, max=1800, step=30, mode="box", unit_of_measurement="s")),
+                vol.Optional(CONF_TARIFF_COLOR_SENSOR, description={"suggested_value": config.get(CONF_TARIFF_COLOR_SENSOR)}): selector.EntitySelector(selector.EntitySelectorConfig(domain="sensor")),
+                vol.Optional(CONF_TARIFF_NEXT_COLOR_SENSOR, description={"suggested_value": config.get(CONF_TARIFF_NEXT_COLOR_SENSOR)}): selector.EntitySelector(selector.EntitySelectorConfig(domain="sensor")),
+                vol.Optional(CONF_TARIFF_OFFPEAK_SENSOR, description={"suggested_value": config.get(CONF_TARIFF_OFFPEAK_SENSOR)}): selector.EntitySelector(selector.EntitySelectorConfig(domain=["sensor", "binary_sensor"])),
+                vol.Optional(CONF_TARIFF_CALENDAR, description={"suggested_value": config.get(CONF_TARIFF_CALENDAR)}): str,
+                vol.Optional(CONF_TARIFF_OFFPEAK_HOURS, default=config.get(CONF_TARIFF_OFFPEAK_HOURS) or DEFAULT_TARIFF_OFFPEAK_HOURS): str,
+                vol.Optional(CONF_TARIFF_FLOOR, default=config.get(CONF_TARIFF_FLOOR) or DEFAULT_TARIFF_FLOOR): selector.SelectSelector(
+                    selector.SelectSelectorConfig(options=[
+                        {"value": PRESET_COMFORT_M1, "label": "Confort –1"},
+                        {"value": PRESET_COMFORT_M2, "label": "Confort –2"},
+                        {"value": PRESET_ECO, "label": "Éco"}
+                    ], mode="dropdown")
+                ),
+                vol.Optional(CONF_TARIFF_PREHEAT, default=config.get(CONF_TARIFF_PREHEAT, DEFAULT_TARIFF_PREHEAT)): selector.NumberSelector(selector.NumberSelectorConfig(min=0, max=360, step=15, mode="box", unit_of_measurement="min")),
+            }),
+            errors=errors,
+        )
+
+    async def async_step_room(self, user_input=None):
+        config = entry_config(self.config_entry)
+        if user_input is not None:
+            user_input["window_sensors"] = ",".join(user_input.get("window_sensors", []))
+            user_input.setdefault(CONF_WINDOW_DETECTION, False)
+            return self._save(user_input, [
+                "temperature_sensor", CONF_FILTER, CONF_FILTER_WINDOW, "window_sensors", CONF_WINDOW_DETECTION,
+                CONF_WINDOW_DROP_RATE, CONF_WINDOW_TIMEOUT, CONF_HYSTERESIS, CONF_OVERRIDE_DURATION, CONF_BOOST_DURATION,
+            ])
+
+        window_sensors = [s.strip() for s in (config.get("window_sensors") or "").split(",") if s.strip()]
+        return self.async_show_form(
+            step_id="room",
+            data_schema=vol.Schema({
+                vol.Required("temperature_sensor", default=config["temperature_sensor"]): selector.EntitySelector(
+                    selector.EntitySelectorConfig(domain="sensor", device_class="temperature")
+                ),
+                vol.Optional(CONF_FILTER, default=config.get(CONF_FILTER) or FILTER_MEDIAN): _filter_selector(),
+                vol.Optional(CONF_FILTER_WINDOW, default=config.get(CONF_FILTER_WINDOW) or DEFAULT_FILTER_WINDOW): selector.NumberSelector(selector.NumberSelectorConfig(min=2, max=15, step=1, mode="box")),
+                vol.Optional("window_sensors", description={"suggested_value": window_sensors}): selector.EntitySelector(
+                    selector.EntitySelectorConfig(multiple=True, domain="binary_sensor", device_class="window")
+                ),
+                vol.Optional(CONF_WINDOW_DETECTION, default=bool(config.get(CONF_WINDOW_DETECTION))): selector.BooleanSelector(),
+                vol.Optional(CONF_WINDOW_DROP_RATE, default=config.get(CONF_WINDOW_DROP_RATE) or DEFAULT_WINDOW_DROP_RATE): selector.NumberSelector(selector.NumberSelectorConfig(min=0.05, max=1.0, step=0.05, mode="box", unit_of_measurement="°C/min")),
+                vol.Optional(CONF_WINDOW_TIMEOUT, default=config.get(CONF_WINDOW_TIMEOUT) or DEFAULT_WINDOW_TIMEOUT): selector.NumberSelector(selector.NumberSelectorConfig(min=5, max=120, step=5, mode="box", unit_of_measurement="min")),
+                vol.Optional(CONF_HYSTERESIS, description={"suggested_value": config.get(CONF_HYSTERESIS)}): selector.NumberSelector(selector.NumberSelectorConfig(min=0.1, max=2.0, step=0.1, mode="box", unit_of_measurement="°C")),
+                vol.Optional(CONF_OVERRIDE_DURATION, default=config.get(CONF_OVERRIDE_DURATION) or DEFAULT_OVERRIDE_DURATION): selector.NumberSelector(selector.NumberSelectorConfig(min=15, max=1440, step=15, mode="box", unit_of_measurement="min")),
+                vol.Optional(CONF_BOOST_DURATION, default=config.get(CONF_BOOST_DURATION) or DEFAULT_BOOST_DURATION): selector.NumberSelector(selector.NumberSelectorConfig(min=15, max=240, step=15, mode="box", unit_of_measurement="min")),
+            }),
         )
@@ -3,12 +3,19 @@ DOMAIN = "electric_heater"
 CENTRAL = "central"
 ROOM = "room"
 
+# Zone : un central, ses pièces et ses événements. Les installations d'avant les zones
+# n'en ont qu'une, qui garde les identifiants du central unique.
+CONF_ZONE = "zone"
+DEFAULT_ZONE = "central"
+
 PRESET_COMFORT = "comfort"
 PRESET_COMFORT_M1 = "comfort_-1"
 PRESET_COMFORT_M2 = "comfort_-2"
 PRESET_ECO = "eco"
 PRESET_FROST_PROTECTION = "frost_protection"
 PRESET_OFF = "off"
+# Dérogation courte d'une pièce : ordre confort continu, sans cycles PWM.
+PRESET_BOOST = "boost"
 
 PRESETS = [
     PRESET_COMFORT,
@@ -26,6 +33,17 @@ FIL_PILOTE_PAYLOAD = {
     PRESET_ECO: {"fil_pilote": "eco"},
     PRESET_FROST_PROTECTION: {"fil_pilote": "frost_protection"},
     PRESET_OFF: {"fil_pilote": "off"},
+    PRESET_BOOST: {"fil_pilote": "comfort"},
+}
+
+# Clé de la consigne de chaque preset dans les températures du central.
+PRESET_TEMP_KEY = {
+    PRESET_COMFORT: "comfort",
+    PRESET_COMFORT_M1: "comfort_m1",
+    PRESET_COMFORT_M2: "comfort_m2",
+    PRESET_ECO: "eco",
+    PRESET_FROST_PROTECTION: "frost_protection",
+    PRESET_BOOST: "comfort",
 }
 
 HYSTERESIS = {
@@ -39,4 +57,136 @@ HYSTERESIS = {
 CONF_TEMP_METHOD = "temp_method"
 CONF_TEMP_METHOD_AVERAGE = "average"
 CONF_TEMP_METHOD_REFERENCE = "reference"
+CONF_TEMP_METHOD_WEIGHTED = "weighted"
+CONF_TEMP_METHOD_MEDIAN = "median"
+CONF_TEMP_METHOD_MIN = "min"
+CONF_TEMP_METHOD_MAX = "max"
+CONF_TEMP_METHOD_TRIMMED = "trimmed_mean"
+TRIMMED_MEAN_RATIO = 0.1
+CONF_AREA = "area"
 CONF_PRESENCE_SENSOR = "presence_sensor"
+
+CONF_DISPATCH_CONCURRENCY = "dispatch_concurrency"
+DEFAULT_DISPATCH_CONCURRENCY = 8
+
+CONF_REGULATION = "regulation"
+REGULATION_FIL_PILOTE = "fil_pilote"
+REGULATION_PWM = "pwm"
+CONF_PWM_CYCLE = "pwm_cycle"
+CONF_PWM_LOW_ORDER = "pwm_low_order"
+DEFAULT_PWM_CYCLE = 15
+DEFAULT_PWM_KP = 0.6
+DEFAULT_PWM_KI = 0.01
+PWM_PRESETS = (PRESET_COMFORT, PRESET_COMFORT_M1, PRESET_COMFORT_M2)
+
+CONF_WRITE_WINDOW = "write_window"
+DEFAULT_WRITE_WINDOW = 2.0
+
+CONF_COMMAND_RATE = "command_rate"
+CONF_COMMAND_BURST = "command_burst"
+DEFAULT_COMMAND_RATE = 5.0
+DEFAULT_COMMAND_BURST = 10
+PRIORITY_SAFETY = 0
+PRIORITY_ROOM = 1
+PRIORITY_CENTRAL = 2
+
+CONF_STARTUP_JITTER = "startup_jitter"
+DEFAULT_STARTUP_JITTER = 30
+
+# Anti-cycles courts : maintien minimal d'un ordre par radiateur (s), hors ordres de sécurité.
+CONF_MIN_DWELL = "min_dwell"
+DEFAULT_MIN_DWELL = 60
+# Délai avant de passer en éco d'absence quand le nombre de personnes tombe à 0 (s).
+CONF_PRESENCE_DELAY = "presence_delay"
+DEFAULT_PRESENCE_DELAY = 120
+
+# Niveau de chauffe de chaque ordre fil pilote, du plus chaud au plus froid.
+ORDER_LEVEL = {
+    PRESET_COMFORT: 5,
+    PRESET_COMFORT_M1: 4,
+    PRESET_COMFORT_M2: 3,
+    PRESET_ECO: 2,
+    PRESET_FROST_PROTECTION: 1,
+    PRESET_OFF: 0,
+}
+
+CONF_WATTAGE = "wattage"
+CONF_PRIORITY = "priority"
+DEFAULT_WATTAGE = 1000
+DEFAULT_PRIORITY = 3  # 1 = délestée en dernier, 5 = délestée en premier
+CONF_POWER_SENSOR = "power_sensor"
+CONF_POWER_LIMIT = "power_limit"
+CONF_SHED_ORDER = "shed_order"
+DEFAULT_SHED_ORDER = PRESET_OFF
+SHED_THRESHOLD = 0.95
+RESTORE_THRESHOLD = 0.85
+SHED_SETTLE_SECONDS = 30
+RESTORE_DELAY = 60
+
+CONF_SCHEDULE = "schedule"
+
+CONF_OUTDOOR_SENSOR = "outdoor_sensor"
+DEFAULT_OUTDOOR_TEMP = 10.0
+MAX_PREHEAT_MINUTES = 180
+
+CONF_FILTER = "sensor_filter"
+CONF_FILTER_WINDOW = "filter_window"
+FILTER_NONE = "none"
+FILTER_MEDIAN = "median"
+FILTER_EMA = "ema"
+FILTER_RATE = "rate"
+DEFAULT_FILTER_WINDOW = 5
+TEMP_PLAUSIBLE_MIN = -30.0
+TEMP_PLAUSIBLE_MAX = 60.0
+MAX_TEMP_RATE = 0.5  # °C par minute
+
+CONF_WINDOW_DETECTION = "window_detection"
+CONF_WINDOW_DROP_RATE = "window_drop_rate"
+CONF_WINDOW_TIMEOUT = "window_timeout"
+DEFAULT_WINDOW_DROP_RATE = 0.15  # °C par minute
+DEFAULT_WINDOW_TIMEOUT = 30  # minutes
+
+CONF_COMMAND_BACKEND = "command_backend"
+BACKEND_SELECT = "select"
+BACKEND_MQTT = "mqtt"
+CONF_MQTT_BASE_TOPIC = "mqtt_base_topic"
+DEFAULT_MQTT_BASE_TOPIC = "zigbee2mqtt"
+# Propriété Zigbee2MQTT utilisée quand elle ne se déduit pas de l'entité select.
+DEFAULT_MQTT_PROPERTY = "fil_pilote"
+
+CONF_INSTRUMENTATION = "instrumentation"
+
+# Dérogations par pièce : preset choisi sur le thermostat de la pièce, puis retour à l'ordre du central.
+ROOM_PRESETS = [*PRESETS, PRESET_BOOST]
+CONF_OVERRIDE_DURATION = "override_duration"
+DEFAULT_OVERRIDE_DURATION = 120
+CONF_BOOST_DURATION = "boost_duration"
+DEFAULT_BOOST_DURATION = 60
+
+# Optimisation tarifaire (Tempo, heures pleines / heures creuses), réglée sur le central.
+CONF_TARIFF_COLOR_SENSOR = "tariff_color_sensor"
+CONF_TARIFF_NEXT_COLOR_SENSOR = "tariff_next_color_sensor"
+CONF_TARIFF_OFFPEAK_SENSOR = "tariff_offpeak_sensor"
+CONF_TARIFF_CALENDAR = "tariff_calendar"
+CONF_TARIFF_OFFPEAK_HOURS = "tariff_offpeak_hours"
+DEFAULT_TARIFF_OFFPEAK_HOURS = "22:00-06:00"
+CONF_TARIFF_FLOOR = "tariff_floor"
+DEFAULT_TARIFF_FLOOR = PRESET_COMFORT_M2
+CONF_TARIFF_PREHEAT = "tariff_preheat"
+DEFAULT_TARIFF_PREHEAT = 120
+
+# Options modifiables sans recharger l'entrée : appliquées aux entités en place.
+CONF_HYSTERESIS = "hysteresis"
+TEMP_CONF_KEYS = {
+    "comfort": "comfort_temp",
+    "comfort_m1": "comfort_m1_temp",
+    "comfort_m2": "comfort_m2_temp",
+    "eco": "eco_temp",
+    "frost_protection": "frost_temp",
+}
+LIVE_OPTIONS = frozenset({
+    *TEMP_CONF_KEYS.values(), "temperature_sensor", CONF_PRESENCE_SENSOR, CONF_FILTER, CONF_FILTER_WINDOW,
+    "window_sensors", CONF_WINDOW_DROP_RATE, CONF_WINDOW_TIMEOUT, CONF_HYSTERESIS,
+    CONF_OVERRIDE_DURATION, CONF_BOOST_DURATION, CONF_PRESENCE_DELAY,
+})
+SIGNAL_OPTIONS_UPDATED = f"{DOMAIN}_options_updated_{{}}"
@@ -0,0 +1,222 @@
+"""Coordinateur en mémoire pour Chauffage Électrique Fil Pilote FR."""
+from dataclasses import dataclass, field, fields, replace
+from typing import Any, Callable
+
+from homeassistant.components.climate import HVACAction, HVACMode
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+
+from .aggregation import TemperatureAggregator
+from .const import (
+    DOMAIN, PRESET_COMFORT, DEFAULT_WRITE_WINDOW, DEFAULT_STARTUP_JITTER, DEFAULT_SHED_ORDER, DEFAULT_OUTDOOR_TEMP,
+    CONF_WINDOW_DROP_RATE, CONF_WINDOW_TIMEOUT, CONF_ZONE, DEFAULT_ZONE,
+)
+from .dispatch import FilPiloteDispatcher
+from .energy import STORAGE_KEY as ENERGY_STORAGE_KEY, EnergyAccounting
+from .instrumentation import Instrumentation
+from .load_shedding import LoadShedder
+from .overrides import ExpiryTimers
+from .regulation import CycleScheduler
+from .schedule import ScheduleEngine
+from .tariff import TariffOptimizer
+from .thermal import ThermalModels
+from .window_detection import WindowDetector
+
+ChangeListener = Callable[[dict[str, Any]], None]
+
+
+@dataclass
+class WriteStats:
+    issued: int = 0
+    suppressed: int = 0
+
+
+@dataclass(frozen=True)
+class CentralState:
+    ready: bool = False
+    hvac_mode: HVACMode = HVACMode.HEAT
+    preset_mode: str = PRESET_COMFORT
+    target_temperature: float | None = None
+    current_temperature: float | None = None
+    temperatures: dict[str, float] = field(default_factory=dict)
+    auto_eco_active: bool = False
+    tariff_level: int = 0
+    tariff_preheat: bool = False
+
+
+@dataclass(frozen=True)
+class RoomState:
+    current_temperature: float | None = None
+    hvac_action: HVACAction = HVACAction.IDLE
+    option: str | None = None
+    window_open: bool = False
+    # Ordre réaligné après le démarrage, à son tour dans l'étalement : la pièce reçoit les diffusions du central.
+    started: bool = False
+
+
+def zone_of(entry: ConfigEntry) -> str:
+    return entry.data.get(CONF_ZONE) or DEFAULT_ZONE
+
+
+def entry_config(entry: ConfigEntry) -> dict[str, Any]:
+    """Configuration effective de l'entrée : les options l'emportent sur les données initiales."""
+    return {**entry.data, **entry.options}
+
+
+def zone_device_id(zone: str) -> str:
+    """Identifiant du central d'une zone, préfixe aussi des unique_id de ses entités."""
+    return "electric_heater_central" if zone == DEFAULT_ZONE else f"electric_heater_{zone}"
+
+
+def get_coordinator(hass: HomeAssistant, entry: ConfigEntry) -> "HeatingCoordinator":
+    return hass.data[DOMAIN]["zones"][zone_of(entry)]
+
+
+def energy_storage_key(zone: str) -> str:
+    return ENERGY_STORAGE_KEY if zone == DEFAULT_ZONE else f"{ENERGY_STORAGE_KEY}_{zone}"
+
+
+class HeatingServices:
+    """Services communs à toutes les zones : un seul réseau Zigbee, une seule minuterie par usage."""
+
+    def __init__(self, hass: HomeAssistant):
+        self.instrumentation = Instrumentation()
+        self.dispatcher = FilPiloteDispatcher(hass, instrumentation=self.instrumentation)
+        self.cycles = CycleScheduler(hass)
+        self.schedules = ScheduleEngine(hass)
+        self.overrides = ExpiryTimers(hass)
+        self.thermal = ThermalModels(hass)
+
+    async def async_load(self) -> None:
+        await self.dispatcher.async_load()
+        await self.thermal.async_load()
+
+    async def async_unload(self) -> None:
+        """Arrêt au déchargement de la dernière entrée ; les écritures différées sont faites tout de suite."""
+        self.dispatcher.async_stop()
+        self.cycles.async_stop()
+        self.overrides.clear()
+        await self.dispatcher.async_save()
+        await self.thermal.async_save()
+
+
+class HeatingCoordinator:
+    """État partagé du central et des pièces d'une zone, avec notifications par champ modifié.
+
+    Les entités s'abonnent aux champs qui les intéressent et ne reçoivent que les
+    valeurs qui ont réellement changé, sans relire l'état du central dans `hass.states`.
+    Un changement du central ne réveille que les pièces de sa zone.
+    """
+
+    def __init__(self, hass: HomeAssistant, services: HeatingServices, zone: str = DEFAULT_ZONE):
+        self.hass = hass
+        self.zone = zone
+        self.dispatcher = services.dispatcher
+        self.instrumentation = services.instrumentation
+        self.cycles = services.cycles
+        self.schedules = services.schedules
+        self.overrides = services.overrides
+        self.thermal = services.thermal
+        # Compteurs par zone : le total du central ne compte que ses pièces.
+        self.energy = EnergyAccounting(
+            hass, energy_storage_key(zone)
+        )
+        self.aggregator = TemperatureAggregator()
+        self.shedder = LoadShedder(hass)
+        self.tariff = TariffOptimizer(hass)
+        self.outdoor_sensor: str | None = None
+        self.window_detectors: dict[str, WindowDetector] = {}
+        self.central_thermostat = None
+        self.shed_order = DEFAULT_SHED_ORDER
+        self.central = CentralState()
+        self.rooms: dict[str, RoomState] = {}
+        self.write_window = DEFAULT_WRITE_WINDOW
+        self.write_stats = WriteStats()
+        self.startup_jitter = DEFAULT_STARTUP_JITTER
+        self._central_listeners: list[tuple[frozenset[str], ChangeListener]] = []
+        self._room_listeners: list[tuple[frozenset[str], Callable[[str, dict[str, Any]], None]]] = []
+
+    async def async_load(self) -> None:
+        await self.energy.async_load()
+
+    async def async_unload(self) -> None:
+        """Arrêt au déchargement de la dernière entrée de la zone."""
+        self.energy.async_stop()
+        await self.energy.async_save()
+        for detector in self.window_detectors.values():
+            detector.async_stop()
+        self.window_detectors.clear()
+
+    def outdoor_temperature(self) -> float:
+        """Température extérieure, ou une valeur par défaut sans sonde exploitable."""
+        state = self.hass.states.get(self.outdoor_sensor) if self.outdoor_sensor else None
+        if state and state.state not in ("unknown", "unavailable"):
+            try:
+                return float(state.state)
+            except ValueError:
+                pass
+        return DEFAULT_OUTDOOR_TEMP
+
+    @callback
+    def async_subscribe_central(self, keys: set[str], listener: ChangeListener) -> Callable[[], None]:
+        """Appelle `listener(changements)` quand l'un des champs `keys` du central change."""
+        entry = (frozenset(keys), listener)
+        self._central_listeners.append(entry)
+        return lambda: self._central_listeners.remove(entry)
+
+    @callback
+    def async_subscribe_rooms(
+        self, keys: set[str], listener: Callable[[str, dict[str, Any]], None]
+    ) -> Callable[[], None]:
+        """Appelle `listener(room_id, changements)` quand l'un des champs `keys` d'une pièce change."""
+        entry = (frozenset(keys), listener)
+        self._room_listeners.append(entry)
+        return lambda: self._room_listeners.remove(entry)
+
+    @callback
+    def update_central(self, **values: Any) -> dict[str, Any]:
+        changes = _diff(self.central, values)
+        if not changes:
+            return changes
+        self.central = replace(self.central, **changes)
+        for keys, listener in list(self._central_listeners):
+            if keys.isdisjoint(changes):
+                continue
+            listener({k: v for k, v in changes.items() if k in keys})
+        return changes
+
+    @callback
+    def update_room(self, room_id: str, **values: Any) -> dict[str, Any]:
+        state = self.rooms.get(room_id, RoomState())
+        changes = _diff(state, values)
+        if not changes and room_id in self.rooms:
+            return changes
+        self.rooms[room_id] = replace(state, **changes)
+        for keys, listener in list(self._room_listeners):
+            if keys.isdisjoint(changes):
+                continue
+            listener(room_id, {k: v for k, v in changes.items() if k in keys})
+        return changes
+
+    @callback
+    def window_detector(self, room_id: str, data: dict[str, Any]) -> WindowDetector:
+        """Détecteur de fenêtre de la pièce, partagé entre le thermostat et son capteur binaire."""
+        if room_id not in self.window_detectors:
+            self.window_detectors[room_id] = WindowDetector(
+                self.hass, data.get(CONF_WINDOW_DROP_RATE), data.get(CONF_WINDOW_TIMEOUT)
+            )
+        return self.window_detectors[room_id]
+
+    @callback
+    def remove_room(self, room_id: str) -> None:
+        self.rooms.pop(room_id, None)
+        if detector := self.window_detectors.pop(room_id, None):
+            detector.async_stop()
+
+
+def _diff(state: Any, values: dict[str, Any]) -> dict[str, Any]:
+    names = {f.name for f in fields(state)}
+    unknown = set(values) - names
+    if unknown:
+        raise KeyError(f"Champs inconnus : {', '.join(sorted(unknown))}")
+    return {k: v for k, v in values.items() if getattr(state, k) != v}
@@ -0,0 +1,62 @@
+"""Diagnostics pour Chauffage Électrique Fil Pilote FR."""
+from dataclasses import asdict
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+
+from .const import CENTRAL
+from .coordinator import get_coordinator
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict[str, Any]:
+    coordinator = get_coordinator(hass, entry)
+    dispatcher = coordinator.dispatcher
+    instrumentation = coordinator.instrumentation.as_dict()
+    data: dict[str, Any] = {"entry": dict(entry.data), "options": dict(entry.options), "zone": coordinator.zone}
+
+    if entry.data.get("type") == CENTRAL:
+        shedder = coordinator.shedder
+        data.update(
+            central=asdict(coordinator.central),
+            rooms={room_id: asdict(state) for room_id, state in coordinator.rooms.items()},
+            write_stats=asdict(coordinator.write_stats),
+            dispatcher={
+                "last_dispatch": asdict(dispatcher.last_stats),
+                "acks": asdict(dispatcher.ack_stats),
+                "queued": len(dispatcher.queue),
+                "superseded": dispatcher.queue.superseded,
+                "commands_sent": dict(dispatcher.sent_counts),
+                "min_dwell": dispatcher.guard.min_dwell,
+            },
+            load_shedding={"shed_rooms": shedder.shed_count, "last_reaction_ms": shedder.last_reaction_ms},
+            energy={"runtime_s": coordinator.energy.total_runtime, "energy_kwh": coordinator.energy.total_energy},
+            tariff={
+                "enabled": coordinator.tariff.enabled,
+                "plan": [asdict(step) for step in coordinator.tariff.plan],
+                "rebuilds": coordinator.tariff.rebuilds,
+            },
+            instrumentation=instrumentation,
+        )
+        return data
+
+    room_id = entry.entry_id
+    select_id = entry.data["fil_pilote_select"]
+    meter = coordinator.energy.meter(room_id)
+    detector = coordinator.window_detectors.get(room_id)
+    entity_ids = {e.entity_id for e in er.async_entries_for_config_entry(er.async_get(hass), room_id)}
+    data.update(
+        room=asdict(state) if (state := coordinator.rooms.get(room_id)) else None,
+        commands_sent=dispatcher.sent_counts[select_id],
+        short_cycles=dispatcher.guard.suppressed_for(select_id),
+        select_state=state.state if (state := hass.states.get(select_id)) else None,
+        thermal_model=coordinator.thermal.get(room_id).as_dict(),
+        energy={"runtime_s": meter.runtime, "energy_kwh": meter.energy, "power_w": meter.power},
+        window_detected=detector.detected if detector else None,
+        instrumentation={
+            "handlers": {k: v for k, v in instrumentation["handlers"].items() if k in entity_ids},
+            "state_writes": {k: v for k, v in instrumentation["state_writes"].items() if k in entity_ids},
+        },
+    )
+    return data
@@ -0,0 +1,392 @@
+"""Envoi des ordres fil pilote pour Chauffage Électrique Fil Pilote FR."""
+import asyncio
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import timedelta
+from functools import partial
+from typing import Callable, Collection
+
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later, async_track_state_change_event, async_track_time_interval
+from homeassistant.helpers.storage import Store
+
+from .command_queue import CommandQueue
+from .const import (
+    DOMAIN,
+    DEFAULT_DISPATCH_CONCURRENCY,
+    DEFAULT_COMMAND_RATE,
+    DEFAULT_COMMAND_BURST,
+    DEFAULT_MIN_DWELL,
+    PRIORITY_ROOM,
+    PRIORITY_CENTRAL,
+    BACKEND_SELECT,
+    BACKEND_MQTT,
+    DEFAULT_MQTT_BASE_TOPIC,
+)
+from .instrumentation import Instrumentation, event_started
+from .mqtt_publish import MqttPublisher
+from .short_cycle import ShortCycleGuard
+
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.last_orders"
+SAVE_DELAY = 10
+# Délai de confirmation d'un ordre par le select, doublé à chaque nouvel essai :
+# renvois à 10, 20 et 40 s de l'envoi précédent, échec 80 s après le dernier renvoi.
+ACK_TIMEOUT = 10
+MAX_RETRIES = 3
+# Passage de fond comparant l'ordre voulu et l'état réel de chaque radiateur.
+RECONCILE_INTERVAL = timedelta(minutes=10)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class DispatchStats:
+    """Bilan d'un envoi : nombre d'ordres et latences en millisecondes."""
+
+    requested: int = 0
+    sent: int = 0
+    skipped: int = 0
+    held: int = 0
+    failed: int = 0
+    first_command_ms: float | None = None
+    last_command_ms: float | None = None
+
+
+@dataclass
+class AckStats:
+    """Compteurs cumulés de confirmation des ordres et transitions retenues par la garde anti-cycles courts."""
+
+    confirmed: int = 0
+    retries: int = 0
+    failures: int = 0
+    drift_fixed: int = 0
+    short_cycles: int = 0
+    last_confirm_ms: float | None = None
+
+
+@dataclass
+class _Awaiting:
+    option: str
+    priority: int
+    sent_at: float
+    attempts: int
+    unsub_timer: Callable[[], None] | None = None
+
+
+class FilPiloteDispatcher:
+    """Envoie les ordres aux selects fil pilote via la file commune (`CommandQueue`).
+
+    Le dernier ordre envoyé à chaque select est mémorisé (et sauvegardé) : un ordre
+    identique n'est renvoyé que si l'état réel du select a dérivé entre-temps.
+    Chaque ordre envoyé attend que le select rapporte l'option voulue ; sans
+    confirmation, il est renvoyé avec un délai croissant, puis compté en échec.
+    Un changement d'ordre trop rapproché du précédent est retenu par `guard`.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        concurrency: int = DEFAULT_DISPATCH_CONCURRENCY,
+        instrumentation: Instrumentation | None = None,
+    ):
+        self.hass = hass
+        self.instrumentation = instrumentation or Instrumentation()
+        self.sent_counts: Counter[str] = Counter()
+        self.rooms: dict[str, tuple[str, Callable[[str], str], str | None, Callable[[], str] | None]] = {}
+        self.last_stats = DispatchStats()
+        self.ack_stats = AckStats()
+        self._last_sent: dict[str, str] = {}
+        self._sent_at: dict[str, float] = {}
+        self._awaiting: dict[str, _Awaiting] = {}
+        self._unsub_reconcile: Callable[[], None] | None = None
+        self._store: Store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self.queue = CommandQueue(self._async_select_option, concurrency=concurrency)
+        self.guard = ShortCycleGuard(hass, self._release_held)
+        self.publisher: MqttPublisher | None = None
+
+    async def async_load(self) -> None:
+        if data := await self._store.async_load():
+            self._last_sent = dict(data)
+
+    @callback
+    def _schedule_save(self) -> None:
+        self._store.async_delay_save(lambda: dict(self._last_sent), SAVE_DELAY)
+
+    async def async_save(self) -> None:
+        await self._store.async_save(dict(self._last_sent))
+
+    def configure(
+        self,
+        concurrency: int = DEFAULT_DISPATCH_CONCURRENCY,
+        rate: float = DEFAULT_COMMAND_RATE,
+        burst: int = DEFAULT_COMMAND_BURST,
+        backend: str = BACKEND_SELECT,
+        base_topic: str = DEFAULT_MQTT_BASE_TOPIC,
+        min_dwell: float = DEFAULT_MIN_DWELL,
+    ) -> None:
+        self.queue.configure(rate, burst, concurrency)
+        self.guard.min_dwell = min_dwell
+        if self.publisher:
+            self.publisher.async_stop()
+        if backend == BACKEND_MQTT and "mqtt" not in self.hass.config.components:
+            _LOGGER.warning("Intégration MQTT non chargée : les ordres passent par le service select")
+            backend = BACKEND_SELECT
+        self.publisher = MqttPublisher(self.hass, base_topic) if backend == BACKEND_MQTT else None
+
+    @callback
+    def async_stop(self) -> None:
+        """Libère écoutes et minuteurs ; les ordres encore en file sont abandonnés."""
+        if self.publisher:
+            self.publisher.async_stop()
+            self.publisher = None
+        for select_id in list(self._awaiting):
+            self._drop_ack(select_id)
+        self.guard.clear()
+        self.queue.cancel()
+        if self._unsub_reconcile:
+            self._unsub_reconcile()
+            self._unsub_reconcile = None
+
+    async def _async_select_option(self, select_id: str, option: str) -> None:
+        self._sent_at[select_id] = time.monotonic()
+        if self.publisher and (target := self.publisher.target(select_id)):
+            try:
+                await self.publisher.async_publish(target, option)
+                return
+            except Exception as err:  # noqa: BLE001 - le service select reste disponible
+                _LOGGER.warning("Publication MQTT impossible pour %s (%s) : envoi par le service select", select_id, err)
+        await self.hass.services.async_call(
+            "select", "select_option", {"entity_id": select_id, "option": option}, blocking=True
+        )
+
+    @callback
+    def register_room(
+        self,
+        room_id: str,
+        select_id: str,
+        resolve: Callable[[str], str],
+        zone: str | None = None,
+        desired: Callable[[], str] | None = None,
+    ) -> Callable[[], None]:
+        """Inscrit une pièce ; `resolve` traduit l'ordre central de sa zone en ordre effectif pour la pièce.
+
+        `desired` donne l'ordre attendu à tout instant, pour le passage de réconciliation.
+        """
+        self.rooms[room_id] = (select_id, resolve, zone, desired)
+        if self._unsub_reconcile is None:
+            self._unsub_reconcile = async_track_time_interval(self.hass, self._reconcile_all, RECONCILE_INTERVAL)
+        state = self.hass.states.get(select_id)
+        if state and self._is_known(state.state) and self._last_sent.get(select_id) not in (None, state.state):
+            del self._last_sent[select_id]
+        unsub_state = async_track_state_change_event(self.hass, [select_id], self._handle_select_change)
+
+        @callback
+        def _unregister() -> None:
+            unsub_state()
+            if self.rooms.get(room_id, (None,))[0] == select_id:
+                del self.rooms[room_id]
+                self._drop_ack(select_id)
+                self.guard.forget(select_id)
+            if not self.rooms and self._unsub_reconcile:
+                self._unsub_reconcile()
+                self._unsub_reconcile = None
+
+        return _unregister
+
+    @callback
+    def _handle_select_change(self, event: Event) -> None:
+        select_id = event.data["entity_id"]
+        old_state, new_state = event.data.get("old_state"), event.data.get("new_state")
+        if not new_state or (old_state and old_state.state == new_state.state):
+            return
+        awaiting = self._awaiting.get(select_id)
+        if awaiting and new_state.state == awaiting.option:
+            self._confirm(select_id)
+        if self._last_sent.get(select_id) not in (None, new_state.state) and self._is_known(new_state.state):
+            _LOGGER.debug("Dérive de %s : %s au lieu de %s", select_id, new_state.state, self._last_sent[select_id])
+            del self._last_sent[select_id]
+            self._schedule_save()
+
+    @staticmethod
+    def _is_known(state: str) -> bool:
+        return state not in ("unknown", "unavailable")
+
+    def _is_up_to_date(self, select_id: str, option: str) -> bool:
+        queued = self.queue.pending_option(select_id)
+        if queued is not None:
+            return queued == option
+        if self._last_sent.get(select_id) == option:
+            return True
+        state = self.hass.states.get(select_id)
+        return bool(state and state.state == option)
+
+    def orders_for(
+        self, central_option: str, zone: str | None = None, rooms: Collection[str] | None = None
+    ) -> dict[str, str]:
+        """Ordre effectif de chaque pièce inscrite (ou de celles d'une zone, ou de `rooms`) pour un ordre central donné."""
+        return {
+            select_id: resolve(central_option)
+            for room_id, (select_id, resolve, room_zone, _) in self.rooms.items()
+            if (zone is None or room_zone == zone) and (rooms is None or room_id in rooms)
+        }
+
+    async def async_dispatch(self, orders: dict[str, str], priority: int = PRIORITY_ROOM) -> DispatchStats:
+        """Envoie {select: option}, en sautant les selects déjà dans l'état voulu."""
+        start = time.monotonic()
+        origin = event_started()
+        stats = DispatchStats(requested=len(orders))
+        pending = []
+        for select_id, option in orders.items():
+            if self._is_up_to_date(select_id, option):
+                stats.skipped += 1
+                self._last_sent[select_id] = option
+                self.guard.cancel(select_id)
+            elif not self.guard.allow(select_id, option, priority):
+                stats.held += 1
+            else:
+                pending.append((select_id, option))
+                self._last_sent[select_id] = option
+
+        async def _send(select_id: str, option: str) -> None:
+            try:
+                sent = await self.queue.submit(select_id, option, priority)
+            except Exception as err:  # noqa: BLE001 - un radiateur en erreur ne bloque pas les autres
+                stats.failed += 1
+                if self._last_sent.get(select_id) == option:
+                    del self._last_sent[select_id]
+                _LOGGER.warning("Échec de l'ordre %s sur %s : %s", option, select_id, err)
+                return
+            if not sent:
+                # Remplacé dans la file par un ordre plus récent avant d'être envoyé.
+                stats.skipped += 1
+                return
+            self._await_ack(select_id, option, priority)
+            self.guard.record(select_id, option)
+            self.sent_counts[select_id] += 1
+            self.instrumentation.record_command(origin)
+            elapsed = (time.monotonic() - start) * 1000
+            if stats.first_command_ms is None:
+                stats.first_command_ms = elapsed
+            stats.last_command_ms = elapsed
+            stats.sent += 1
+
+        if pending:
+            self._schedule_save()
+            await asyncio.gather(*(_send(select_id, option) for select_id, option in pending))
+
+        self.ack_stats.short_cycles = self.guard.suppressed
+        self.last_stats = stats
+        _LOGGER.debug(
+            "Envoi fil pilote : %d envoyés, %d déjà à jour, %d retenus, %d en échec, premier %.0f ms, dernier %.0f ms",
+            stats.sent, stats.skipped, stats.held, stats.failed,
+            stats.first_command_ms or 0, stats.last_command_ms or 0,
+        )
+        return stats
+
+    @callback
+    def _release_held(self, select_id: str, option: str, priority: int) -> None:
+        """Fin du maintien minimal : l'ordre retenu part s'il n'a pas été remplacé entre-temps."""
+        self.hass.async_create_task(self.async_send(select_id, option, priority))
+
+    @callback
+    def _await_ack(self, select_id: str, option: str, priority: int, attempts: int = 1) -> None:
+        """Suit l'ordre envoyé jusqu'à ce que le select rapporte `option`."""
+        self._drop_ack(select_id)
+        sent_at = self._sent_at.pop(select_id, time.monotonic())
+        awaiting = self._awaiting[select_id] = _Awaiting(option, priority, sent_at, attempts)
+        state = self.hass.states.get(select_id)
+        if state and state.state == option:
+            self._confirm(select_id)
+            return
+        awaiting.unsub_timer = async_call_later(
+            self.hass, ACK_TIMEOUT * 2 ** (attempts - 1), partial(self._ack_timeout, select_id)
+        )
+
+    @callback
+    def _confirm(self, select_id: str) -> None:
+        awaiting = self._drop_ack(select_id)
+        self.ack_stats.confirmed += 1
+        self.ack_stats.last_confirm_ms = (time.monotonic() - awaiting.sent_at) * 1000
+
+    @callback
+    def _drop_ack(self, select_id: str) -> _Awaiting | None:
+        awaiting = self._awaiting.pop(select_id, None)
+        if awaiting and awaiting.unsub_timer:
+            awaiting.unsub_timer()
+        return awaiting
+
+    @callback
+    def _ack_timeout(self, select_id: str, _now=None) -> None:
+        awaiting = self._awaiting.get(select_id)
+        if awaiting is None:
+            return
+        awaiting.unsub_timer = None
+        if awaiting.attempts > MAX_RETRIES:
+            self._fail(select_id, "pas de confirmation")
+            return
+        self.ack_stats.retries += 1
+        _LOGGER.debug("Ordre %s non confirmé par %s, essai %d", awaiting.option, select_id, awaiting.attempts + 1)
+        self.hass.async_create_task(self._async_retry(select_id, awaiting))
+
+    async def _async_retry(self, select_id: str, awaiting: _Awaiting) -> None:
+        try:
+            sent = await self.queue.submit(select_id, awaiting.option, awaiting.priority)
+        except Exception as err:  # noqa: BLE001 - compté comme un échec, sans bloquer les autres
+            if self._awaiting.get(select_id) is awaiting:
+                self._fail(select_id, err)
+            return
+        # Remplacé dans la file : le nouvel ordre est suivi à son tour.
+        if sent and self._awaiting.get(select_id) is awaiting:
+            self._await_ack(select_id, awaiting.option, awaiting.priority, awaiting.attempts + 1)
+
+    @callback
+    def _fail(self, select_id: str, reason) -> None:
+        awaiting = self._drop_ack(select_id)
+        self.ack_stats.failures += 1
+        # Oublié du cache : le prochain envoi du même ordre repartira réellement.
+        if awaiting and self._last_sent.get(select_id) == awaiting.option:
+            del self._last_sent[select_id]
+            self._schedule_save()
+        _LOGGER.warning(
+            "Ordre %s sur %s abandonné : %s", awaiting.option if awaiting else "?", select_id, reason
+        )
+
+    @callback
+    def _reconcile_all(self, _now=None) -> None:
+        """Renvoie, à basse priorité, l'ordre voulu aux seuls radiateurs qui ont dérivé."""
+        if not self.hass.is_running:
+            return
+        orders = {}
+        for select_id, _, _, desired in self.rooms.values():
+            if (
+                desired is None
+                or select_id in self._awaiting
+                or self.guard.held(select_id) is not None
+                or self.queue.pending_option(select_id) is not None
+            ):
+                continue
+            state = self.hass.states.get(select_id)
+            option = desired()
+            if state and self._is_known(state.state) and state.state != option:
+                orders[select_id] = option
+                self._last_sent.pop(select_id, None)
+        if orders:
+            self.ack_stats.drift_fixed += len(orders)
+            _LOGGER.debug("Réconciliation : %d radiateur(s) à réaligner", len(orders))
+            self.hass.async_create_task(self.async_dispatch(orders, PRIORITY_CENTRAL))
+
+    async def async_reconcile(self, select_id: str, option: str, priority: int = PRIORITY_ROOM) -> bool:
+        """Envoie l'ordre seulement si l'état réel du select diffère, sans se fier au cache."""
+        state = self.hass.states.get(select_id)
+        if state and state.state == option:
+            self._last_sent[select_id] = option
+            return False
+        self._last_sent.pop(select_id, None)
+        await self.async_send(select_id, option, priority)
+        return True
+
+    async def async_send(self, select_id: str, option: str, priority: int = PRIORITY_ROOM) -> DispatchStats:
+        return await self.async_dispatch({select_id: option}, priority)
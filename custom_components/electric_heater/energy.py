@@ -0,0 +1,139 @@
+"""Comptage du temps de chauffe et de l'énergie pour Chauffage Électrique Fil Pilote FR."""
+import time
+from datetime import timedelta
+from typing import Any, Callable
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN
+
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.energy"
+SAVE_DELAY = 300
+# Les compteurs des pièces en chauffe continue sont arrêtés à cette fréquence.
+SETTLE_INTERVAL = timedelta(minutes=5)
+# Cumul des pièces supprimées : le total de la zone ne baisse pas quand une pièce disparaît.
+REMOVED_KEY = "_removed"
+
+
+class EnergyMeter:
+    """Temps de chauffe (s) et énergie (kWh) d'une pièce, intégrés à chaque transition."""
+
+    __slots__ = ("runtime", "energy", "power", "_since", "listeners")
+
+    def __init__(self, runtime: float = 0.0, energy: float = 0.0):
+        self.runtime = runtime
+        self.energy = energy
+        self.power = 0.0
+        self._since = time.monotonic()
+        self.listeners: list[Callable[[], None]] = []
+
+    def settle(self, now: float) -> tuple[float, float]:
+        """Ajoute la période écoulée depuis la dernière transition ; renvoie les incréments."""
+        elapsed = now - self._since
+        self._since = now
+        if not self.power or elapsed <= 0:
+            return 0.0, 0.0
+        energy = self.power * elapsed / 3_600_000
+        self.runtime += elapsed
+        self.energy += energy
+        return elapsed, energy
+
+
+class EnergyAccounting:
+    """Compteurs de toutes les pièces et leur total, enregistrés en différé."""
+
+    def __init__(self, hass: HomeAssistant, key: str = STORAGE_KEY):
+        self.hass = hass
+        self._store: Store = Store(hass, STORAGE_VERSION, key)
+        self._saved: dict[str, list[float]] = {}
+        self._meters: dict[str, EnergyMeter] = {}
+        self._heating: set[str] = set()
+        self._total_listeners: list[Callable[[], None]] = []
+        self._unsub_interval: Callable[[], None] | None = None
+        self.total_runtime = 0.0
+        self.total_energy = 0.0
+
+    async def async_load(self) -> None:
+        if data := await self._store.async_load():
+            self._saved = {room_id: list(values) for room_id, values in data.items()}
+            self.total_runtime = sum(values[0] for values in self._saved.values())
+            self.total_energy = sum(values[1] for values in self._saved.values())
+
+    def meter(self, room_id: str) -> EnergyMeter:
+        if room_id not in self._meters:
+            self._meters[room_id] = EnergyMeter(*self._saved.get(room_id, (0.0, 0.0)))
+        return self._meters[room_id]
+
+    def add_listener(self, room_id: str | None, listener: Callable[[], None]) -> Callable[[], None]:
+        """Écoute les compteurs d'une pièce, ou le total si `room_id` vaut None."""
+        listeners = self._total_listeners if room_id is None else self.meter(room_id).listeners
+        listeners.append(listener)
+        return lambda: listeners.remove(listener)
+
+    @callback
+    def set_power(self, room_id: str, power: float) -> None:
+        """Transition de chauffe : arrête les compteurs puis applique la nouvelle puissance."""
+        meter = self.meter(room_id)
+        self._settle(meter, time.monotonic())
+        meter.power = power
+        if power:
+            self._heating.add(room_id)
+            if not self._unsub_interval:
+                self._unsub_interval = async_track_time_interval(self.hass, self._settle_heating, SETTLE_INTERVAL)
+        else:
+            self._heating.discard(room_id)
+            if not self._heating and self._unsub_interval:
+                self._unsub_interval()
+                self._unsub_interval = None
+
+    @callback
+    def _settle(self, meter: EnergyMeter, now: float) -> None:
+        runtime, energy = meter.settle(now)
+        if not runtime:
+            return
+        self.total_runtime += runtime
+        self.total_energy += energy
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+        for listener in list(meter.listeners) + self._total_listeners:
+            listener()
+
+    @callback
+    def _settle_heating(self, _now=None) -> None:
+        now = time.monotonic()
+        for room_id in list(self._heating):
+            self._settle(self._meters[room_id], now)
+
+    @callback
+    def async_stop(self) -> None:
+        now = time.monotonic()
+        for meter in self._meters.values():
+            self._settle(meter, now)
+        self._heating.clear()
+        if self._unsub_interval:
+            self._unsub_interval()
+            self._unsub_interval = None
+
+    async def async_save(self) -> None:
+        await self._store.async_save(self._data_to_save())
+
+    async def async_forget(self, room_id: str) -> None:
+        """Pièce supprimée : ses compteurs rejoignent le cumul des pièces supprimées."""
+        if meter := self._meters.pop(room_id, None):
+            self._settle(meter, time.monotonic())
+            self._heating.discard(room_id)
+            values = [meter.runtime, meter.energy]
+        elif room_id in self._saved:
+            values = self._saved[room_id]
+        else:
+            return
+        self._saved.pop(room_id, None)
+        removed = self._saved.get(REMOVED_KEY, [0.0, 0.0])
+        self._saved[REMOVED_KEY] = [removed[0] + values[0], removed[1] + values[1]]
+        await self.async_save()
+
+    def _data_to_save(self) -> dict[str, Any]:
+        self._saved.update({room_id: [m.runtime, m.energy] for room_id, m in self._meters.items()})
+        return dict(self._saved)
@@ -0,0 +1,115 @@
+"""Briques communes aux entités de Chauffage Électrique Fil Pilote FR."""
+import time
+from abc import ABC, abstractmethod
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.entity import Entity
+from homeassistant.helpers.event import async_call_later, async_track_state_change_event
+
+from .const import SIGNAL_OPTIONS_UPDATED
+from .coordinator import HeatingCoordinator, WriteStats, entry_config
+
+
+class CoalescedWriteMixin(Entity):
+    """Écritures d'état dédoublonnées et regroupées.
+
+    Une écriture identique à la précédente (état et attributs) est ignorée ; les
+    écritures rapprochées sont fusionnées en une seule à la fin de la fenêtre
+    `write_window` du coordinateur de la zone (`self._coordinator`).
+    """
+
+    _coordinator: HeatingCoordinator
+
+    _last_written: tuple | None = None
+    _last_write_at: float = 0.0
+    _unsub_flush = None
+    _flush_cleanup_registered = False
+
+    def _state_snapshot(self) -> tuple:
+        return (self.state, self.state_attributes, self.extra_state_attributes)
+
+    @property
+    def _write_stats(self) -> WriteStats:
+        return self._coordinator.write_stats
+
+    @callback
+    def async_write_coalesced(self, immediate: bool = False) -> None:
+        """Écrit l'état si quelque chose a changé, au plus une fois par fenêtre."""
+        if self._unsub_flush and not immediate:
+            self._write_stats.suppressed += 1
+            return
+        window = self._coordinator.write_window if not immediate else 0
+        delay = self._last_write_at + window - time.monotonic()
+        if delay > 0:
+            self._write_stats.suppressed += 1
+            if not self._flush_cleanup_registered:
+                self._flush_cleanup_registered = True
+                self.async_on_remove(self._cancel_flush)
+            self._unsub_flush = async_call_later(self.hass, delay, self._flush)
+            return
+        self._flush()
+
+    @callback
+    def _flush(self, _now=None) -> None:
+        self._cancel_flush()
+        snapshot = self._state_snapshot()
+        if snapshot == self._last_written:
+            self._write_stats.suppressed += 1
+            return
+        self._last_written = snapshot
+        self._last_write_at = time.monotonic()
+        self._write_stats.issued += 1
+        self._coordinator.instrumentation.record_write(self.entity_id)
+        self.async_write_ha_state()
+
+    @callback
+    def _cancel_flush(self) -> None:
+        if self._unsub_flush:
+            self._unsub_flush()
+            self._unsub_flush = None
+
+
+class SourceSensorMixin(Entity, ABC):
+    """Entité qui recopie des capteurs désignés dans les options de l'entrée.
+
+    L'abonnement est libéré au retrait de l'entité et refait en place, sans
+    rechargement, quand les options changent. `_update` est appelé à chaque
+    changement d'état d'un capteur source.
+    """
+
+    entry: ConfigEntry
+    _sensors: list[str] = []
+    _unsub_sensors = None
+
+    @abstractmethod
+    def _source_sensors(self, config: dict[str, Any]) -> list[str]:
+        """Capteurs à suivre pour ces options."""
+
+    async def async_added_to_hass(self):
+        self.async_on_remove(self._untrack_sources)
+        self.async_on_remove(
+            async_dispatcher_connect(self.hass, SIGNAL_OPTIONS_UPDATED.format(self.entry.entry_id), self._apply_options)
+        )
+        self._apply_options(entry_config(self.entry))
+
+    @callback
+    def _apply_options(self, config: dict[str, Any]) -> None:
+        self._untrack_sources()
+        self._sensors = self._source_sensors(config)
+        if self._sensors:
+            self._unsub_sensors = async_track_state_change_event(self.hass, self._sensors, self._update)
+        self._update()
+
+    @callback
+    def _untrack_sources(self) -> None:
+        if self._unsub_sensors:
+            self._unsub_sensors()
+            self._unsub_sensors = None
+
+    @abstractmethod
+    @callback
+    def _update(self, event=None) -> None:
+        """Recopie l'état des capteurs source."""
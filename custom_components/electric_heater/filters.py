@@ -0,0 +1,135 @@
+"""Filtrage des sondes de température pour Chauffage Électrique Fil Pilote FR."""
+import time
+
+from homeassistant.core import State
+
+from .const import (
+    FILTER_MEDIAN,
+    FILTER_EMA,
+    FILTER_RATE,
+    DEFAULT_FILTER_WINDOW,
+    TEMP_PLAUSIBLE_MIN,
+    TEMP_PLAUSIBLE_MAX,
+    MAX_TEMP_RATE,
+)
+
+# Nombre de rejets consécutifs du limiteur de pente au-delà duquel le saut est tenu pour réel.
+MAX_REJECTS = 3
+
+
+def is_unavailable(state: State | None) -> bool:
+    """Vrai si la sonde ne donne aucune mesure ; une valeur rejetée n'en fait pas partie."""
+    return state is None or state.state in ("unknown", "unavailable")
+
+
+def parse_temperature(state: State | None) -> float | None:
+    """Valeur numérique et plausible d'un état de sonde, sinon None.
+
+    Une valeur rejetée (pic hors bornes, texte) ne doit pas être traitée comme une
+    sonde indisponible : `is_unavailable` les distingue, l'appelant ignore la mesure.
+    """
+    if is_unavailable(state):
+        return None
+    try:
+        value = float(state.state)
+    except ValueError:
+        return None
+    if not TEMP_PLAUSIBLE_MIN <= value <= TEMP_PLAUSIBLE_MAX:
+        return None
+    return value
+
+
+class SensorFilter:
+    """Sans filtrage : ne garde que les valeurs plausibles.
+
+    `update(None)` signifie sonde indisponible et vide le filtre ; les mesures rejetées
+    par `parse_temperature` ne doivent pas lui être transmises.
+    """
+
+    def update(self, value: float | None, now: float | None = None) -> float | None:
+        return value
+
+    def reset(self) -> None:
+        pass
+
+
+class MedianFilter(SensorFilter):
+    """Médiane des N dernières valeurs, dans un tampon circulaire."""
+
+    def __init__(self, size: int):
+        self._buffer: list[float] = []
+        self._size = size
+        self._index = 0
+
+    def update(self, value: float | None, now: float | None = None) -> float | None:
+        if value is None:
+            self.reset()
+            return None
+        if len(self._buffer) < self._size:
+            self._buffer.append(value)
+        else:
+            self._buffer[self._index] = value
+        self._index = (self._index + 1) % self._size
+        ordered = sorted(self._buffer)
+        middle = len(ordered) // 2
+        return ordered[middle] if len(ordered) % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+
+    def reset(self) -> None:
+        self._buffer.clear()
+        self._index = 0
+
+
+class EmaFilter(SensorFilter):
+    """Moyenne mobile exponentielle, de poids équivalent à N valeurs."""
+
+    def __init__(self, size: int):
+        self._alpha = 2 / (size + 1)
+        self._value: float | None = None
+
+    def update(self, value: float | None, now: float | None = None) -> float | None:
+        if value is None:
+            self.reset()
+            return None
+        self._value = value if self._value is None else self._value + self._alpha * (value - self._value)
+        return self._value
+
+    def reset(self) -> None:
+        self._value = None
+
+
+class RateFilter(SensorFilter):
+    """Rejette les variations plus rapides que `max_rate` °C/min, sauf si elles persistent."""
+
+    def __init__(self, max_rate: float = MAX_TEMP_RATE):
+        self._max_rate = max_rate
+        self._value: float | None = None
+        self._at = 0.0
+        self._rejects = 0
+
+    def update(self, value: float | None, now: float | None = None) -> float | None:
+        if value is None:
+            self.reset()
+            return None
+        now = time.monotonic() if now is None else now
+        if self._value is not None:
+            minutes = max(now - self._at, 1.0) / 60
+            if abs(value - self._value) > self._max_rate * minutes and self._rejects < MAX_REJECTS:
+                self._rejects += 1
+                return self._value
+        self._value, self._at, self._rejects = value, now, 0
+        return value
+
+    def reset(self) -> None:
+        self._value = None
+        self._rejects = 0
+
+
+def build_filter(method: str | None, window: int | None = None) -> SensorFilter:
+    size = int(window or DEFAULT_FILTER_WINDOW)
+    if method == FILTER_MEDIAN:
+        return MedianFilter(size)
+    if method == FILTER_EMA:
+        return EmaFilter(size)
+    if method == FILTER_RATE:
+        return RateFilter()
+    return SensorFilter()
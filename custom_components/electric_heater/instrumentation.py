@@ -0,0 +1,111 @@
+"""Instrumentation des gestionnaires d'événements pour Chauffage Électrique Fil Pilote FR."""
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable
+
+from homeassistant.core import callback
+
+# Bornes supérieures des classes de l'histogramme de latence, en millisecondes.
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+# Instant de l'événement capteur en cours de traitement ; hérité par les tâches qu'il crée.
+_event_started: ContextVar[float | None] = ContextVar("electric_heater_event_started", default=None)
+
+
+def event_started() -> float | None:
+    return _event_started.get()
+
+
+class HandlerStats:
+    __slots__ = ("count", "total")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+
+
+class LatencyHistogram:
+    """Histogramme à classes fixes : un ajout coûte une recherche dichotomique."""
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.total = 0
+
+    def add(self, ms: float) -> None:
+        self.counts[bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+        self.total += 1
+
+    def percentile(self, ratio: float) -> float | None:
+        """Borne supérieure de la classe contenant le percentile demandé, plafonnée à la dernière."""
+        if not self.total:
+            return None
+        rank = ratio * self.total
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return LATENCY_BUCKETS_MS[min(index, len(LATENCY_BUCKETS_MS) - 1)]
+        return None
+
+    def as_dict(self) -> dict[str, int]:
+        labels = [f"<={bound}ms" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+        return dict(zip(labels, self.counts))
+
+
+class Instrumentation:
+    """Compteurs d'exécution, désactivés par défaut.
+
+    Désactivée, un gestionnaire instrumenté ne coûte qu'un test de drapeau ; activée,
+    elle mesure le nombre d'appels et le temps cumulé par entité, les écritures d'état
+    et la latence entre l'événement capteur et l'envoi de l'ordre fil pilote.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.handlers: dict[str, dict[str, HandlerStats]] = {}
+        self.writes: Counter[str] = Counter()
+        self.latency = LatencyHistogram()
+
+    def wrap(self, owner: str, handler: Callable) -> Callable:
+        """Gestionnaire d'événement chronométré sous `owner` (l'entity_id)."""
+        stats = self.handlers.setdefault(owner, {}).setdefault(handler.__name__, HandlerStats())
+
+        @callback
+        @wraps(handler)
+        def _instrumented(*args: Any) -> Any:
+            if not self.enabled:
+                return handler(*args)
+            start = time.perf_counter()
+            token = _event_started.set(time.monotonic())
+            try:
+                return handler(*args)
+            finally:
+                _event_started.reset(token)
+                stats.count += 1
+                stats.total += time.perf_counter() - start
+
+        return _instrumented
+
+    @callback
+    def record_write(self, entity_id: str) -> None:
+        if self.enabled:
+            self.writes[entity_id] += 1
+
+    @callback
+    def record_command(self, origin: float | None) -> None:
+        if self.enabled and origin is not None:
+            self.latency.add((time.monotonic() - origin) * 1000)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "handlers": {
+                owner: {name: {"count": s.count, "total_ms": round(s.total * 1000, 3)} for name, s in stats.items()}
+                for owner, stats in self.handlers.items()
+            },
+            "state_writes": dict(self.writes),
+            "event_to_command_ms": self.latency.as_dict(),
+        }
@@ -0,0 +1,218 @@
+"""Délestage sur dépassement de puissance pour Chauffage Électrique Fil Pilote FR."""
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later, async_track_state_change_event
+
+from .const import (
+    SHED_THRESHOLD,
+    RESTORE_THRESHOLD,
+    SHED_SETTLE_SECONDS,
+    RESTORE_DELAY,
+    DEFAULT_WATTAGE,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(eq=False)
+class _SheddableRoom:
+    room_id: str
+    priority: int
+    wattage: float
+    set_shed: Callable[[bool], Awaitable]
+    is_heating: Callable[[], bool]
+    shed_at: float | None = None
+
+
+class LoadShedder:
+    """Coupe des pièces quand le compteur approche de la puissance souscrite.
+
+    Les pièces sont rangées une fois pour toutes par priorité (la moins prioritaire est
+    délestée d'abord) ; au sein d'une même priorité, une file tournante fait que la pièce
+    délestée passe en dernier la fois suivante. Le relestage se fait une pièce à la fois,
+    dans l'ordre de délestage, tant que la marge le permet.
+    """
+
+    def __init__(self, hass: HomeAssistant):
+        self.hass = hass
+        self._rooms: dict[str, _SheddableRoom] = {}
+        self._by_priority: dict[int, deque[_SheddableRoom]] = {}
+        self._tiers: list[deque[_SheddableRoom]] = []
+        self._shed: dict[str, _SheddableRoom] = {}
+        self._listeners: list[Callable[[], None]] = []
+        self._power_sensor: str | None = None
+        self._limit = 0.0
+        self._relief = 0.0
+        self._relief_until = 0.0
+        self._unsub_power: Callable[[], None] | None = None
+        self._unsub_restore: Callable[[], None] | None = None
+        self.last_reaction_ms: float | None = None
+
+    @property
+    def shed_count(self) -> int:
+        return len(self._shed)
+
+    @property
+    def enabled(self) -> bool:
+        return self._unsub_power is not None
+
+    def add_listener(self, listener: Callable[[], None]) -> Callable[[], None]:
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    @callback
+    def register_room(
+        self,
+        room_id: str,
+        priority: int,
+        wattage: float | None,
+        set_shed: Callable[[bool], Awaitable],
+        is_heating: Callable[[], bool],
+    ) -> Callable[[], None]:
+        self._remove(room_id)
+        room = self._rooms[room_id] = _SheddableRoom(room_id, priority, wattage or DEFAULT_WATTAGE, set_shed, is_heating)
+        if priority not in self._by_priority:
+            self._by_priority[priority] = deque()
+            self._sort_tiers()
+        self._by_priority[priority].append(room)
+
+        @callback
+        def _unregister() -> None:
+            if self._rooms.get(room_id) is room:
+                self._remove(room_id)
+
+        return _unregister
+
+    def _remove(self, room_id: str) -> None:
+        """Retire une pièce de son palier ; seul un palier vidé oblige à retrier les paliers."""
+        if (room := self._rooms.pop(room_id, None)) is None:
+            return
+        if self._shed.pop(room_id, None):
+            self._notify()
+        tier = self._by_priority[room.priority]
+        tier.remove(room)
+        if not tier:
+            del self._by_priority[room.priority]
+            self._sort_tiers()
+
+    def _sort_tiers(self) -> None:
+        self._tiers = [self._by_priority[p] for p in sorted(self._by_priority, reverse=True)]
+
+    @callback
+    def async_start(self, power_sensor: str, limit: float) -> Callable[[], None]:
+        self.async_stop()
+        self._power_sensor = power_sensor
+        self._limit = float(limit)
+        self._unsub_power = async_track_state_change_event(self.hass, [power_sensor], self._handle_power)
+        return self.async_stop
+
+    @callback
+    def async_stop(self) -> None:
+        if self._unsub_power:
+            self._unsub_power()
+            self._unsub_power = None
+        if self._unsub_restore:
+            self._unsub_restore()
+            self._unsub_restore = None
+        if self._shed:
+            rooms = list(self._shed.values())
+            self._shed.clear()
+            for room in rooms:
+                self.hass.async_create_task(room.set_shed(False))
+            self._notify()
+
+    def _read_power(self, state) -> float | None:
+        if not state or state.state in ("unknown", "unavailable"):
+            return None
+        try:
+            power = float(state.state)
+        except ValueError:
+            return None
+        if state.attributes.get("unit_of_measurement") == "kW":
+            power *= 1000
+        return power
+
+    @callback
+    def _handle_power(self, event: Event) -> None:
+        power = self._read_power(event.data.get("new_state"))
+        if power is None or self._limit <= 0:
+            return
+        now = time.monotonic()
+        if now < self._relief_until:
+            # Le compteur ne reflète pas encore les coupures qui viennent d'être envoyées.
+            power -= self._relief
+        else:
+            self._relief = 0.0
+
+        if power > self._limit * SHED_THRESHOLD:
+            self._shed_rooms(power - self._limit * RESTORE_THRESHOLD, now)
+        elif power < self._limit * RESTORE_THRESHOLD and self._shed and not self._unsub_restore:
+            self._restore_next(power)
+
+    @callback
+    def _shed_rooms(self, excess: float, started: float) -> None:
+        selected: list[_SheddableRoom] = []
+        relieved = 0.0
+        for tier in self._tiers:
+            for _ in range(len(tier)):
+                if relieved >= excess:
+                    break
+                room = tier[0]
+                tier.rotate(-1)
+                if room.room_id in self._shed or not room.is_heating():
+                    continue
+                room.shed_at = started
+                self._shed[room.room_id] = room
+                selected.append(room)
+                relieved += room.wattage
+            if relieved >= excess:
+                break
+        if not selected:
+            return
+        if self._unsub_restore:
+            self._unsub_restore()
+            self._unsub_restore = None
+        self._relief += relieved
+        self._relief_until = started + SHED_SETTLE_SECONDS
+        _LOGGER.info("Délestage de %d pièce(s) pour %.0f W de dépassement", len(selected), excess)
+        self._notify()
+        self.hass.async_create_task(self._async_apply(selected, True, started))
+
+    @callback
+    def _restore_next(self, power: float) -> None:
+        room = min(self._shed.values(), key=lambda r: r.shed_at or 0)
+        if power + room.wattage > self._limit * SHED_THRESHOLD:
+            return
+        del self._shed[room.room_id]
+        self._notify()
+        self.hass.async_create_task(self._async_apply([room], False, time.monotonic()))
+        if self._shed:
+            self._unsub_restore = async_call_later(self.hass, RESTORE_DELAY, self._restore_timer)
+
+    @callback
+    def _restore_timer(self, _now=None) -> None:
+        self._unsub_restore = None
+        state = self.hass.states.get(self._power_sensor) if self._power_sensor else None
+        power = self._read_power(state)
+        if power is not None and self._shed and power < self._limit * RESTORE_THRESHOLD:
+            self._restore_next(power)
+
+    async def _async_apply(self, rooms: list[_SheddableRoom], shed: bool, started: float) -> None:
+        results = await asyncio.gather(*(room.set_shed(shed) for room in rooms), return_exceptions=True)
+        for room, result in zip(rooms, results):
+            if isinstance(result, Exception):
+                _LOGGER.warning("Délestage de %s impossible : %s", room.room_id, result)
+        if shed:
+            self.last_reaction_ms = (time.monotonic() - started) * 1000
+            self._notify()
+
+    @callback
+    def _notify(self) -> None:
+        for listener in list(self._listeners):
+            listener()
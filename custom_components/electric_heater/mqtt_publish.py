@@ -0,0 +1,100 @@
+"""Publication MQTT directe des ordres fil pilote pour Chauffage Électrique Fil Pilote FR."""
+import asyncio
+import json
+import logging
+import re
+import time
+
+from homeassistant.components import mqtt
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+
+from .const import DEFAULT_MQTT_BASE_TOPIC, DEFAULT_MQTT_PROPERTY
+
+_LOGGER = logging.getLogger(__name__)
+
+# unique_id des entités créées par la découverte Zigbee2MQTT : <ieee>_<propriété>_zigbee2mqtt
+_Z2M_UNIQUE_ID = re.compile(r"0x[0-9a-fA-F]+_(.+)_zigbee2mqtt")
+
+Target = tuple[str, str]
+
+
+class MqttPublisher:
+    """Publie les ordres sur le topic `set` Zigbee2MQTT du radiateur, sans passer par le select.
+
+    Le topic vient du nom de l'appareil (le friendly name Zigbee2MQTT) et la propriété
+    du unique_id de l'entité select. Les ordres reçus pendant un même passage de la
+    boucle sont publiés ensemble, dans une seule tâche.
+    """
+
+    def __init__(self, hass: HomeAssistant, base_topic: str = DEFAULT_MQTT_BASE_TOPIC):
+        self.hass = hass
+        self.base_topic = (base_topic or DEFAULT_MQTT_BASE_TOPIC).rstrip("/")
+        self.published = 0
+        self.last_batch_size = 0
+        self.last_latency_ms: float | None = None
+        self._targets: dict[str, Target | None] = {}
+        self._batch: list[tuple[Target, str, asyncio.Future]] = []
+        self._flush_handle: asyncio.Handle | None = None
+        self._unsub_registry = hass.bus.async_listen(dr.EVENT_DEVICE_REGISTRY_UPDATED, self._invalidate)
+
+    def target(self, select_id: str) -> Target | None:
+        """(topic, propriété) du select, ou None s'il ne vient pas de Zigbee2MQTT."""
+        if select_id not in self._targets:
+            self._targets[select_id] = self._resolve(select_id)
+        return self._targets[select_id]
+
+    def _resolve(self, select_id: str) -> Target | None:
+        entity = er.async_get(self.hass).async_get(select_id)
+        device = dr.async_get(self.hass).async_get(entity.device_id) if entity and entity.device_id else None
+        if device is None or not device.name:
+            _LOGGER.debug("Pas de topic Zigbee2MQTT pour %s : envoi par le service select", select_id)
+            return None
+        match = _Z2M_UNIQUE_ID.fullmatch(entity.unique_id or "")
+        return f"{self.base_topic}/{device.name}/set", match.group(1) if match else DEFAULT_MQTT_PROPERTY
+
+    @callback
+    def _invalidate(self, _event: Event) -> None:
+        # Un friendly name renommé dans Zigbee2MQTT renomme l'appareil : le topic change.
+        self._targets.clear()
+
+    def async_publish(self, target: Target, option: str) -> asyncio.Future:
+        """Ajoute l'ordre au lot en cours ; le futur se termine une fois le lot publié."""
+        future = self.hass.loop.create_future()
+        self._batch.append((target, option, future))
+        if self._flush_handle is None:
+            self._flush_handle = self.hass.loop.call_soon(self._flush)
+        return future
+
+    @callback
+    def _flush(self) -> None:
+        self._flush_handle = None
+        batch, self._batch = self._batch, []
+        self.hass.async_create_task(self._async_publish_batch(batch))
+
+    async def _async_publish_batch(self, batch: list[tuple[Target, str, asyncio.Future]]) -> None:
+        start = time.monotonic()
+        results = await asyncio.gather(
+            *(
+                mqtt.async_publish(self.hass, topic, json.dumps({prop: option}))
+                for (topic, prop), option, _ in batch
+            ),
+            return_exceptions=True,
+        )
+        self.last_latency_ms = (time.monotonic() - start) * 1000
+        self.last_batch_size = len(batch)
+        self.published += len(batch)
+        for (_, _, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(None)
+
+    @callback
+    def async_stop(self) -> None:
+        self._unsub_registry()
+        if self._flush_handle:
+            self._flush_handle.cancel()
+            self._flush()
@@ -0,0 +1,58 @@
+"""Consignes par preset pour Chauffage Électrique Fil Pilote FR."""
+from homeassistant.components.number import NumberEntity, NumberMode
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EntityCategory, UnitOfTemperature
+from homeassistant.core import HomeAssistant, callback
+from .const import DOMAIN, CENTRAL
+from .coordinator import HeatingCoordinator, get_coordinator, zone_device_id
+
+PRESET_TEMPERATURES = {
+    "comfort": "Consigne Confort",
+    "comfort_m1": "Consigne Confort -1",
+    "comfort_m2": "Consigne Confort -2",
+    "eco": "Consigne Éco",
+    "frost_protection": "Consigne Hors-gel",
+}
+
+
+async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_entities):
+    if entry.data.get("type") == CENTRAL:
+        async_add_entities([PresetTemperatureNumber(hass, entry, key) for key in PRESET_TEMPERATURES])
+
+
+class PresetTemperatureNumber(NumberEntity):
+    """Consigne d'un preset du central ; remplace l'attribut `temperatures` dans l'historique."""
+
+    _attr_has_entity_name = True
+    _attr_entity_category = EntityCategory.CONFIG
+    _attr_mode = NumberMode.BOX
+    _attr_native_unit_of_measurement = UnitOfTemperature.CELSIUS
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, key: str):
+        self.hass = hass
+        self._key = key
+        self._attr_name = PRESET_TEMPERATURES[key]
+        self._coordinator: HeatingCoordinator = get_coordinator(hass, entry)
+        self._attr_unique_id = f"{zone_device_id(self._coordinator.zone)}_temperature_{key}"
+        self._attr_native_min_value = entry.data["min_temp"]
+        self._attr_native_max_value = entry.data["max_temp"]
+        self._attr_native_step = entry.data["temp_step"]
+
+    @property
+    def device_info(self):
+        return {"identifiers": {(DOMAIN, zone_device_id(self._coordinator.zone))}}
+
+    async def async_added_to_hass(self):
+        self.async_on_remove(self._coordinator.async_subscribe_central({"temperatures"}, self._update))
+        self._update()
+
+    @callback
+    def _update(self, changes=None):
+        value = self._coordinator.central.temperatures.get(self._key)
+        if value != self._attr_native_value:
+            self._attr_native_value = value
+            self.async_write_ha_state()
+
+    async def async_set_native_value(self, value: float) -> None:
+        if thermostat := self._coordinator.central_thermostat:
+            await thermostat.async_set_preset_temperature(self._key, value)
@@ -0,0 +1,65 @@
+"""Échéances des dérogations par pièce pour Chauffage Électrique Fil Pilote FR."""
+import itertools
+import logging
+import time
+from typing import Callable
+
+from homeassistant.core import HomeAssistant, callback
+
+from .timers import HeapTimer
+
+_LOGGER = logging.getLogger(__name__)
+
+# Au-delà de ce nombre d'entrées périmées, le tas est reconstruit à partir des échéances actives.
+_COMPACT_SLACK = 64
+
+
+class ExpiryTimers:
+    """Un seul minuteur pour les fins de dérogation (preset forcé, boost) de toutes les pièces.
+
+    Une échéance remplacée ou annulée reste dans le tas du minuteur et est ignorée quand
+    elle sort : seul le numéro de séquence enregistré pour la pièce fait foi.
+    """
+
+    def __init__(self, hass: HomeAssistant):
+        self.hass = hass
+        self._pending: dict[str, tuple[float, int, Callable[[], None]]] = {}
+        self._seq = itertools.count()
+        self._timer: HeapTimer[tuple[int, str]] = HeapTimer(hass, self._expire)
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    @callback
+    def schedule(self, key: str, delay: float, action: Callable[[], None]) -> None:
+        """Appelle `action` dans `delay` secondes ; remplace l'échéance précédente de `key`."""
+        when = time.monotonic() + max(0.0, delay)
+        seq = next(self._seq)
+        self._pending[key] = (when, seq, action)
+        self._timer.push(when, (seq, key))
+        if len(self._timer) > 2 * len(self._pending) + _COMPACT_SLACK:
+            self._timer.rebuild((when, (seq, key)) for key, (when, seq, _) in self._pending.items())
+
+    @callback
+    def cancel(self, key: str) -> None:
+        self._pending.pop(key, None)
+        if not self._pending:
+            self._timer.clear()
+
+    @callback
+    def clear(self) -> None:
+        """Oublie toutes les échéances et libère le minuteur."""
+        self._pending.clear()
+        self._timer.clear()
+
+    @callback
+    def _expire(self, _when: float, item: tuple[int, str]) -> None:
+        seq, key = item
+        pending = self._pending.get(key)
+        if not pending or pending[1] != seq:
+            return
+        del self._pending[key]
+        try:
+            pending[2]()
+        except Exception:  # noqa: BLE001 - une pièce en erreur ne bloque pas les autres échéances
+            _LOGGER.exception("Fin de dérogation impossible pour %s", key)
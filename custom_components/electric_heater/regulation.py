@@ -0,0 +1,146 @@
+"""Régulation par modulation de durée (PWM) pour Chauffage Électrique Fil Pilote FR."""
+import itertools
+import logging
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DEFAULT_PWM_KP, DEFAULT_PWM_KI
+from .timers import HeapTimer
+
+_LOGGER = logging.getLogger(__name__)
+
+# Décalage de phase entre pièces successives (fraction du nombre d'or) : répartit les
+# débuts de cycle sans connaître à l'avance le nombre de pièces.
+_PHASE_STEP = 0.6180339887
+# Durées de marche/arrêt plus courtes que ceci ne sont pas envoyées au radiateur.
+MIN_SWITCH_SECONDS = 60
+
+
+class PiController:
+    """Loi PI bornée : taux de charge entre 0 et 1 à partir de l'écart à la consigne."""
+
+    def __init__(self, kp: float = DEFAULT_PWM_KP, ki: float = DEFAULT_PWM_KI):
+        self.kp = kp
+        self.ki = ki
+        self.integral = 0.0
+        self.duty = 0.0
+        self._last: float | None = None
+
+    def reset(self) -> None:
+        self.integral = 0.0
+        self.duty = 0.0
+        self._last = None
+
+    def update(self, target: float | None, current: float | None, now: float | None = None) -> float:
+        """Nouveau taux de charge ; `ki` s'exprime par °C et par minute."""
+        if target is None or current is None:
+            self.reset()
+            return 0.0
+        now = time.monotonic() if now is None else now
+        error = target - current
+        if self._last is not None:
+            integral = self.integral + error * (now - self._last) / 60
+            # Anti-emballement : l'intégrale ne peut pas pousser au-delà de 0..1 à elle seule.
+            if self.ki:
+                integral = min(max(integral, 0.0), 1.0 / self.ki)
+            self.integral = integral
+        self._last = now
+        self.duty = min(max(self.kp * error + self.ki * self.integral, 0.0), 1.0)
+        return self.duty
+
+
+@dataclass
+class _CycleRoom:
+    cycle: float
+    offset: float
+    duty: Callable[[], float]
+    switch: Callable[[bool], None]
+    generation: int
+    on: bool | None = None
+    cycle_start: float = 0.0
+
+
+class CycleScheduler:
+    """Un seul minuteur pour les cycles PWM de toutes les pièces.
+
+    Les échéances (début de cycle, fin de la phase de chauffe) de toutes les pièces partagent
+    un `HeapTimer`, armé sur la plus proche. Chaque pièce reçoit un décalage de
+    phase différent pour que les radiateurs ne basculent pas tous à la même seconde.
+    """
+
+    def __init__(self, hass: HomeAssistant):
+        self.hass = hass
+        self._rooms: dict[str, _CycleRoom] = {}
+        self._phases = itertools.count()
+        self._generations = itertools.count()
+        self._timer: HeapTimer[tuple[str, int, str]] = HeapTimer(hass, self._due)
+
+    @callback
+    def register(
+        self, room_id: str, cycle: float, duty: Callable[[], float], switch: Callable[[bool], None]
+    ) -> Callable[[], None]:
+        """Inscrit une pièce ; `duty` est lu à chaque début de cycle, `switch` reçoit marche/arrêt."""
+        offset = (next(self._phases) * _PHASE_STEP % 1) * cycle
+        room = _CycleRoom(cycle, offset, duty, switch, generation=next(self._generations))
+        self._rooms[room_id] = room
+        now = time.monotonic()
+        start = now + (offset - now) % cycle
+        self._push(start, room_id, room, "start")
+        # Premier cycle partiel immédiat, pour ne pas attendre jusqu'au début du cycle décalé.
+        room.cycle_start = start - cycle
+        self._switch(room_id, room, now)
+
+        @callback
+        def _unregister() -> None:
+            if self._rooms.get(room_id) is room:
+                del self._rooms[room_id]
+
+        return _unregister
+
+    @callback
+    def async_stop(self) -> None:
+        self._rooms.clear()
+        self._timer.clear()
+
+    @callback
+    def _push(self, when: float, room_id: str, room: _CycleRoom, action: str) -> None:
+        self._timer.push(when, (room_id, room.generation, action))
+
+    @callback
+    def _due(self, when: float, item: tuple[str, int, str]) -> None:
+        room_id, generation, action = item
+        room = self._rooms.get(room_id)
+        if room is None or room.generation != generation:
+            return
+        if action == "start":
+            room.cycle_start = when
+            self._push(when + room.cycle, room_id, room, "start")
+            self._switch(room_id, room, time.monotonic())
+        else:
+            self._set(room_id, room, False)
+
+    @callback
+    def _switch(self, room_id: str, room: _CycleRoom, now: float) -> None:
+        try:
+            duty = room.duty()
+        except Exception:  # noqa: BLE001 - une pièce en erreur ne bloque pas le minuteur commun
+            _LOGGER.exception("Calcul du taux de charge impossible pour %s", room_id)
+            duty = 0.0
+        off_at = room.cycle_start + duty * room.cycle
+        cycle_end = room.cycle_start + room.cycle
+        if off_at - now < MIN_SWITCH_SECONDS:
+            self._set(room_id, room, False)
+            return
+        self._set(room_id, room, True)
+        if cycle_end - off_at >= MIN_SWITCH_SECONDS:
+            self._push(off_at, room_id, room, "off")
+
+    @callback
+    def _set(self, room_id: str, room: _CycleRoom, on: bool) -> None:
+        if room.on == on:
+            return
+        room.on = on
+        room.switch(on)
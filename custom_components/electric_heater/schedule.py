@@ -0,0 +1,186 @@
+"""Programmation hebdomadaire pour Chauffage Électrique Fil Pilote FR."""
+import bisect
+import itertools
+import logging
+import re
+from datetime import datetime, time, timedelta
+from time import monotonic
+from typing import Callable
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.util import dt as dt_util
+
+from .const import PRESETS
+from .timers import HeapTimer
+
+_LOGGER = logging.getLogger(__name__)
+
+MINUTES_PER_WEEK = 7 * 24 * 60
+DAYS = ("lun", "mar", "mer", "jeu", "ven", "sam", "dim")
+
+
+def _parse_days(text: str) -> list[int]:
+    days: set[int] = set()
+    for part in text.split(","):
+        part = part.strip().lower()
+        if part == "*":
+            days.update(range(7))
+        elif "-" in part:
+            first, last = (DAYS.index(d.strip()[:3]) for d in part.split("-", 1))
+            days.update(range(first, last + 1) if first <= last else [*range(first, 7), *range(0, last + 1)])
+        else:
+            days.add(DAYS.index(part[:3]))
+    return sorted(days)
+
+
+class WeeklySchedule:
+    """Programme compilé : créneaux triés en minutes depuis lundi 00:00.
+
+    Syntaxe : `lun-ven 06:30=comfort 08:30=eco; sam,dim 08:00=comfort 23:00=eco`,
+    un bloc de jours par ligne ou séparé par `;`.
+    Chaque créneau dure jusqu'au suivant, y compris d'une semaine sur l'autre.
+    """
+
+    def __init__(self, text: str):
+        slots: dict[int, str] = {}
+        for block in filter(None, (b.strip() for b in re.split(r"[;\n]", text))):
+            days_text, *changes = block.split()
+            try:
+                days = _parse_days(days_text)
+            except ValueError as err:
+                raise ValueError(f"jours invalides : {days_text}") from err
+            if not changes:
+                raise ValueError(f"aucun horaire pour {days_text}")
+            for change in changes:
+                hour, _, preset = change.partition("=")
+                if preset not in PRESETS:
+                    raise ValueError(f"preset inconnu : {preset}")
+                try:
+                    hours, minutes = (int(v) for v in hour.split(":"))
+                except ValueError as err:
+                    raise ValueError(f"heure invalide : {hour}") from err
+                if not (0 <= hours < 24 and 0 <= minutes < 60):
+                    raise ValueError(f"heure invalide : {hour}")
+                for day in days:
+                    slots[day * 1440 + hours * 60 + minutes] = preset
+        if not slots:
+            raise ValueError("programme vide")
+        minutes = sorted(slots)
+        # Seuls les vrais changements de preset sont des transitions.
+        kept = [m for i, m in enumerate(minutes) if slots[m] != slots[minutes[i - 1]]] or minutes[:1]
+        self.minutes = kept
+        self.presets = [slots[m] for m in kept]
+
+    def preset_at(self, minute: int) -> str:
+        return self.presets[bisect.bisect_right(self.minutes, minute) - 1]
+
+
+def minute_of_week(moment: datetime) -> int:
+    return moment.weekday() * 1440 + moment.hour * 60 + moment.minute
+
+
+def _next(minutes: list[int], now: datetime) -> tuple[int, datetime]:
+    """Position dans `minutes` de la prochaine échéance après `now` (heure locale), et son instant en UTC.
+
+    L'échéance est une heure murale du fuseau de `now` : un changement d'heure d'ici là
+    allonge ou raccourcit le délai d'une heure, sans déplacer la transition. Dans l'heure
+    répétée de l'automne, l'échéance est prise dans la même occurrence que `now`.
+    """
+    position = bisect.bisect_right(minutes, minute_of_week(now))
+    following = minutes[position] if position < len(minutes) else minutes[0] + MINUTES_PER_WEEK
+    monday = datetime.combine(now.date() - timedelta(days=now.weekday()), time(), now.tzinfo)
+    return position % len(minutes), dt_util.as_utc((monday + timedelta(minutes=following)).replace(fold=now.fold))
+
+
+class ScheduleEngine:
+    """Un seul minuteur, armé sur la prochaine transition de tous les programmes.
+
+    Les transitions de chaque programme sont fusionnées dans un index trié ; à
+    l'échéance, seuls les propriétaires dont le preset change sont appelés.
+    """
+
+    def __init__(self, hass: HomeAssistant):
+        self.hass = hass
+        self._schedules: dict[str, tuple[WeeklySchedule, Callable[[str], None]]] = {}
+        self._index: list[tuple[int, str]] = []
+        self._minutes: list[int] = []
+        self._timer: HeapTimer[datetime] = HeapTimer(hass, self._due)
+        self._target: int | None = None
+        self._target_at: datetime | None = None
+
+    @callback
+    def register(self, owner: str, schedule: WeeklySchedule, action: Callable[[str], None]) -> Callable[[], None]:
+        """Inscrit un programme ; `action(preset)` est appelée à chacune de ses transitions."""
+        entry = (schedule, action)
+        self._schedules[owner] = entry
+        self._rebuild()
+
+        @callback
+        def _unregister() -> None:
+            if self._schedules.get(owner) is entry:
+                del self._schedules[owner]
+                self._rebuild()
+
+        return _unregister
+
+    def current_preset(self, owner: str) -> str | None:
+        if owner not in self._schedules:
+            return None
+        return self._schedules[owner][0].preset_at(minute_of_week(dt_util.now()))
+
+    def next_transition(self, owner: str) -> tuple[float, str] | None:
+        """Délai (s) et preset de la prochaine transition du programme `owner`."""
+        if owner not in self._schedules:
+            return None
+        schedule = self._schedules[owner][0]
+        if len(schedule.minutes) < 2:
+            return None
+        position, at = _next(schedule.minutes, dt_util.now())
+        return (at - dt_util.utcnow()).total_seconds(), schedule.presets[position]
+
+    @callback
+    def _rebuild(self) -> None:
+        self._index = sorted(
+            itertools.chain.from_iterable(
+                ((minute, owner) for minute in schedule.minutes if len(schedule.minutes) > 1)
+                for owner, (schedule, _) in self._schedules.items()
+            )
+        )
+        self._minutes = [minute for minute, _ in self._index]
+        self._arm()
+
+    @callback
+    def _arm(self, after: datetime | None = None) -> None:
+        """Arme le minuteur sur la prochaine transition, strictement après `after` (UTC) si donné."""
+        self._timer.clear()
+        if not self._index:
+            return
+        # Depuis l'échéance qui vient d'être traitée : une heure répétée à l'automne ne la rejoue pas.
+        now = dt_util.utcnow() if after is None else max(dt_util.utcnow(), after)
+        position, self._target_at = _next(self._minutes, dt_util.as_local(now))
+        self._target = self._minutes[position]
+        self._schedule_fire()
+
+    @callback
+    def _schedule_fire(self) -> None:
+        delay = (self._target_at - dt_util.utcnow()).total_seconds()
+        self._timer.push(monotonic() + max(delay, 0.0), self._target_at)
+
+    @callback
+    def _due(self, _when: float, target_at: datetime) -> None:
+        if target_at != self._target_at:
+            return
+        if self._target_at > dt_util.utcnow():
+            # L'horloge murale a pris du retard sur le minuteur : on attend le temps restant.
+            self._schedule_fire()
+            return
+        minute = self._target
+        start = bisect.bisect_left(self._minutes, minute)
+        end = bisect.bisect_right(self._minutes, minute)
+        for _, owner in self._index[start:end]:
+            schedule, action = self._schedules[owner]
+            try:
+                action(schedule.preset_at(minute))
+            except Exception:  # noqa: BLE001 - un programme en erreur ne bloque pas les autres
+                _LOGGER.exception("Transition de programme impossible pour %s", owner)
+        self._arm(self._target_at)
@@ -1,76 +1,92 @@
 """Sensors pour Chauffage Électrique Fil Pilote FR."""
 from homeassistant.components.sensor import SensorEntity, SensorDeviceClass, SensorStateClass
-from homeassistant.const import UnitOfTemperature
+from homeassistant.const import EntityCategory, UnitOfEnergy, UnitOfTemperature, UnitOfTime
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant, callback
-from homeassistant.helpers.event import async_track_state_change_event
-from .const import DOMAIN, CENTRAL, ROOM, CONF_PRESENCE_SENSOR
+from .const import (
+    DOMAIN, CENTRAL, ROOM, CONF_PRESENCE_SENSOR, CONF_POWER_SENSOR, CONF_COMMAND_BACKEND, BACKEND_MQTT, DEFAULT_ZONE,
+)
+from .coordinator import HeatingCoordinator, entry_config, get_coordinator, zone_device_id
+from .entity import CoalescedWriteMixin, SourceSensorMixin
+from .filters import is_unavailable, parse_temperature
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_entities):
     entities = []
     if entry.data.get("type") == CENTRAL:
-        entities.append(CentralTemperatureSensor(hass))
-        if entry.data.get(CONF_PRESENCE_SENSOR):
+        entities.append(CentralTemperatureSensor(hass, entry))
+        entities.extend([HeatingEnergySensor(hass, entry, "energy"), HeatingEnergySensor(hass, entry, "runtime")])
+        entities.extend([WriteStatsSensor(hass, entry, "issued"), WriteStatsSensor(hass, entry, "suppressed")])
+        if entry_config(entry).get(CONF_PRESENCE_SENSOR):
             entities.append(CentralPersonsSensor(hass, entry))
+        if entry.data.get(CONF_POWER_SENSOR):
+            entities.extend([LoadSheddingSensor(hass, entry, "rooms"), LoadSheddingSensor(hass, entry, "reaction")])
+        if get_coordinator(hass, entry).zone == DEFAULT_ZONE:
+            # Les ordres passent par une file commune à toutes les zones : compteurs sur le premier central.
+            if entry.data.get(CONF_COMMAND_BACKEND) == BACKEND_MQTT:
+                entities.append(MqttPublishLatencySensor(hass, entry))
+            entities.extend(CommandStatsSensor(hass, entry, counter) for counter in COMMAND_STATS)
+            entities.extend([InstrumentationSensor(hass, entry, "latency"), InstrumentationSensor(hass, entry, "handlers")])
     else:
         entities.append(RoomTemperatureSensor(hass, entry))
+        entities.extend([HeatingEnergySensor(hass, entry, "energy"), HeatingEnergySensor(hass, entry, "runtime")])
+        entities.append(RoomCommandsSensor(hass, entry))
     async_add_entities(entities)
 
 
-class CentralTemperatureSensor(SensorEntity):
+class CentralTemperatureSensor(CoalescedWriteMixin, SensorEntity):
     _attr_has_entity_name = True
     _attr_name = "Température Centrale"
-    _attr_unique_id = "electric_heater_central_temperature"
     _attr_device_class = SensorDeviceClass.TEMPERATURE
     _attr_state_class = SensorStateClass.MEASUREMENT
     _attr_native_unit_of_measurement = UnitOfTemperature.CELSIUS
 
-    def __init__(self, hass: HomeAssistant):
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry):
         self.hass = hass
+        self._coordinator: HeatingCoordinator = get_coordinator(hass, entry)
+        self._attr_unique_id = f"{zone_device_id(self._coordinator.zone)}_temperature"
 
     @property
     def device_info(self):
-        return {"identifiers": {(DOMAIN, "electric_heater_central")}}
+        return {"identifiers": {(DOMAIN, zone_device_id(self._coordinator.zone))}}
 
     async def async_added_to_hass(self):
-        self.hass.bus.async_listen(f"{DOMAIN}_central_changed", self._update)
+        self.async_on_remove(self._coordinator.async_subscribe_central({"current_temperature"}, self._update))
         self._update()
 
     @callback
-    def _update(self, event=None):
-        central = self.hass.states.get("climate.electric_heater_central")
-        self._attr_native_value = central.attributes.get("current_temperature") if central else None
-        self.async_write_ha_state()
+    def _update(self, changes=None):
+        self._attr_native_value = self._coordinator.central.current_temperature
+        self.async_write_coalesced()
 
 
-class CentralPersonsSensor(SensorEntity):
+class CentralPersonsSensor(SourceSensorMixin, SensorEntity):
     _attr_has_entity_name = True
     _attr_name = "Nombre de Personnes"
-    _attr_unique_id = "electric_heater_central_personnes"
     _attr_state_class = SensorStateClass.MEASUREMENT
     _attr_native_unit_of_measurement = "personnes"
 
     def __init__(self, hass: HomeAssistant, entry: ConfigEntry):
         self.hass = hass
-        self._sensor = entry.data[CONF_PRESENCE_SENSOR]
+        self.entry = entry
+        self._device_id = zone_device_id(get_coordinator(hass, entry).zone)
+        self._attr_unique_id = f"{self._device_id}_personnes"
 
     @property
     def device_info(self):
-        return {"identifiers": {(DOMAIN, "electric_heater_central")}}
+        return {"identifiers": {(DOMAIN, self._device_id)}}
 
-    async def async_added_to_hass(self):
-        async_track_state_change_event(self.hass, [self._sensor], self._update)
-        self._update()
+    def _source_sensors(self, config):
+        return [config[CONF_PRESENCE_SENSOR]] if config.get(CONF_PRESENCE_SENSOR) else []
 
     @callback
     def _update(self, event=None):
-        state = self.hass.states.get(self._sensor)
+        state = self.hass.states.get(self._sensors[0]) if self._sensors else None
         self._attr_native_value = int(float(state.state)) if state and state.state not in ("unknown", "unavailable") else 0
         self.async_write_ha_state()
 
 
-class RoomTemperatureSensor(SensorEntity):
+class RoomTemperatureSensor(SourceSensorMixin, CoalescedWriteMixin, SensorEntity):
     _attr_has_entity_name = True
     _attr_name = "Température Pièce"
     _attr_device_class = SensorDeviceClass.TEMPERATURE
@@ -80,19 +96,282 @@ class RoomTemperatureSensor(SensorEntity):
     def __init__(self, hass: HomeAssistant, entry: ConfigEntry):
         self.hass = hass
         self.entry = entry
-        self._sensor = entry.data["temperature_sensor"]
         self._attr_unique_id = f"electric_heater_room_{entry.entry_id}_temperature"
+        self._coordinator: HeatingCoordinator = get_coordinator(hass, entry)
+
+    @property
+    def device_info(self):
+        return {
+            "identifiers": {(DOMAIN, f"room_{self.entry.entry_id}")},
+            "via_device": (DOMAIN, zone_device_id(self._coordinator.zone)),
+        }
+
+    def _source_sensors(self, config):
+        return [config["temperature_sensor"]]
+
+    @callback
+    def _update(self, event=None):
+        state = self.hass.states.get(self._sensors[0])
+        value = parse_temperature(state)
+        if value is None and not is_unavailable(state):
+            return
+        self._attr_native_value = round(value, 1) if value is not None else None
+        self.async_write_coalesced()
+
+
+class WriteStatsSensor(SensorEntity):
+    """Compteur d'écritures d'état de l'intégration, relevé périodiquement."""
+
+    _attr_has_entity_name = True
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _attr_should_poll = True
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, counter: str):
+        self.hass = hass
+        self._counter = counter
+        self._coordinator: HeatingCoordinator = get_coordinator(hass, entry)
+        self._attr_name = {"issued": "Écritures d'État Émises", "suppressed": "Écritures d'État Évitées"}[counter]
+        self._attr_unique_id = f"{zone_device_id(self._coordinator.zone)}_writes_{counter}"
+
+    @property
+    def device_info(self):
+        return {"identifiers": {(DOMAIN, zone_device_id(self._coordinator.zone))}}
+
+    async def async_update(self):
+        self._attr_native_value = getattr(self._coordinator.write_stats, self._counter)
+
+
+COMMAND_STATS = {
+    "retries": "Ordres Relancés",
+    "failures": "Ordres Sans Confirmation",
+    "drift_fixed": "Dérives Corrigées",
+    "short_cycles": "Transitions Retenues",
+    "last_confirm_ms": "Latence de Confirmation",
+}
+
+
+class CommandStatsSensor(SensorEntity):
+    """Compteur de confirmation des ordres fil pilote, relevé périodiquement."""
+
+    _attr_has_entity_name = True
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_should_poll = True
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, counter: str):
+        self.hass = hass
+        self._counter = counter
+        self._coordinator: HeatingCoordinator = get_coordinator(hass, entry)
+        self._attr_name = COMMAND_STATS[counter]
+        self._attr_unique_id = f"{zone_device_id(self._coordinator.zone)}_commands_{counter}"
+        if counter == "last_confirm_ms":
+            self._attr_device_class = SensorDeviceClass.DURATION
+            self._attr_state_class = SensorStateClass.MEASUREMENT
+            self._attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+        else:
+            self._attr_state_class = SensorStateClass.TOTAL_INCREASING
+
+    @property
+    def device_info(self):
+        return {"identifiers": {(DOMAIN, zone_device_id(self._coordinator.zone))}}
+
+    async def async_update(self):
+        value = getattr(self._coordinator.dispatcher.ack_stats, self._counter)
+        self._attr_native_value = round(value) if self._counter == "last_confirm_ms" and value is not None else value
+
+
+class InstrumentationSensor(SensorEntity):
+    """Latence événement capteur → ordre (95e centile) ou temps cumulé des gestionnaires d'événements.
+
+    Ne compte rien tant que l'instrumentation n'est pas activée sur un central.
+    """
+
+    _attr_has_entity_name = True
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_should_poll = True
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, kind: str):
+        self.hass = hass
+        self._kind = kind
+        self._coordinator: HeatingCoordinator = get_coordinator(hass, entry)
+        self._attr_unique_id = f"{zone_device_id(self._coordinator.zone)}_instrumentation_{kind}"
+        if kind == "latency":
+            self._attr_name = "Latence Événement → Ordre"
+            self._attr_state_class = SensorStateClass.MEASUREMENT
+        else:
+            self._attr_name = "Temps de Traitement des Événements"
+            self._attr_state_class = SensorStateClass.TOTAL_INCREASING
+
+    @property
+    def device_info(self):
+        return {"identifiers": {(DOMAIN, zone_device_id(self._coordinator.zone))}}
+
+    async def async_update(self):
+        instrumentation = self._coordinator.instrumentation
+        if self._kind == "latency":
+            histogram = instrumentation.latency
+            self._attr_native_value = histogram.percentile(0.95)
+            self._attr_extra_state_attributes = {"p50": histogram.percentile(0.5), **histogram.as_dict()}
+            return
+        per_handler: dict[str, dict[str, float]] = {}
+        for stats in instrumentation.handlers.values():
+            for name, handler in stats.items():
+                total = per_handler.setdefault(name, {"count": 0, "total_ms": 0.0})
+                total["count"] += handler.count
+                total["total_ms"] += handler.total * 1000
+        self._attr_native_value = round(sum(t["total_ms"] for t in per_handler.values()), 1)
+        self._attr_extra_state_attributes = {
+            name: {"count": t["count"], "total_ms": round(t["total_ms"], 1)} for name, t in per_handler.items()
+        }
+
+
+class RoomCommandsSensor(SensorEntity):
+    """Nombre d'ordres fil pilote réellement envoyés au radiateur de la pièce."""
+
+    _attr_has_entity_name = True
+    _attr_name = "Ordres Envoyés"
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _attr_should_poll = True
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry):
+        self.hass = hass
+        self.entry = entry
+        self._select = entry.data["fil_pilote_select"]
+        self._coordinator: HeatingCoordinator = get_coordinator(hass, entry)
+        self._attr_unique_id = f"electric_heater_room_{entry.entry_id}_commands"
+
+    @property
+    def device_info(self):
+        return {
+            "identifiers": {(DOMAIN, f"room_{self.entry.entry_id}")},
+            "via_device": (DOMAIN, zone_device_id(self._coordinator.zone)),
+        }
+
+    async def async_update(self):
+        dispatcher = self._coordinator.dispatcher
+        self._attr_native_value = dispatcher.sent_counts[self._select]
+        self._attr_extra_state_attributes = {
+            "short_cycles": dispatcher.guard.suppressed_for(self._select),
+            "held_option": dispatcher.guard.held(self._select),
+        }
+
+
+class MqttPublishLatencySensor(SensorEntity):
+    """Durée de publication du dernier lot d'ordres MQTT, relevée périodiquement."""
+
+    _attr_has_entity_name = True
+    _attr_name = "Latence de Publication MQTT"
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_should_poll = True
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry):
+        self.hass = hass
+        self._coordinator: HeatingCoordinator = get_coordinator(hass, entry)
+        self._attr_unique_id = f"{zone_device_id(self._coordinator.zone)}_mqtt_publish_latency"
 
     @property
     def device_info(self):
-        return {"identifiers": {(DOMAIN, f"room_{self.entry.entry_id}")}, "via_device": (DOMAIN, "electric_heater_central")}
+        return {"identifiers": {(DOMAIN, zone_device_id(self._coordinator.zone))}}
+
+    async def async_update(self):
+        publisher = self._coordinator.dispatcher.publisher
+        if publisher and publisher.last_latency_ms is not None:
+            self._attr_native_value = round(publisher.last_latency_ms, 1)
+            self._attr_extra_state_attributes = {"batch_size": publisher.last_batch_size}
+
+
+class LoadSheddingSensor(SensorEntity):
+    """Nombre de pièces délestées, ou durée entre la mesure de puissance et l'envoi des ordres."""
+
+    _attr_has_entity_name = True
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, kind: str):
+        self.hass = hass
+        self._kind = kind
+        self._coordinator: HeatingCoordinator = get_coordinator(hass, entry)
+        self._attr_unique_id = f"{zone_device_id(self._coordinator.zone)}_load_shedding_{kind}"
+        if kind == "rooms":
+            self._attr_name = "Pièces Délestées"
+            self._attr_native_unit_of_measurement = "pièces"
+        else:
+            self._attr_name = "Temps de Réaction du Délestage"
+            self._attr_device_class = SensorDeviceClass.DURATION
+            self._attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+            self._attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    @property
+    def device_info(self):
+        return {"identifiers": {(DOMAIN, zone_device_id(self._coordinator.zone))}}
 
     async def async_added_to_hass(self):
-        async_track_state_change_event(self.hass, [self._sensor], self._update)
+        self.async_on_remove(self._coordinator.shedder.add_listener(self._update))
         self._update()
 
     @callback
-    def _update(self, event=None):
-        state = self.hass.states.get(self._sensor)
-        self._attr_native_value = round(float(state.state), 1) if state and state.state not in ("unknown", "unavailable") else None
-        self.async_write_ha_state()
+    def _update(self):
+        shedder = self._coordinator.shedder
+        if self._kind == "rooms":
+            value = shedder.shed_count
+        else:
+            value = round(shedder.last_reaction_ms, 1) if shedder.last_reaction_ms is not None else None
+        if value != self._attr_native_value:
+            self._attr_native_value = value
+            self.async_write_ha_state()
+
+
+class HeatingEnergySensor(CoalescedWriteMixin, SensorEntity):
+    """Énergie (kWh) ou temps de chauffe (h) estimés d'une pièce, ou de toute sa zone pour le central."""
+
+    _attr_has_entity_name = True
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, kind: str):
+        self.hass = hass
+        self.entry = entry
+        self._kind = kind
+        self._coordinator: HeatingCoordinator = get_coordinator(hass, entry)
+        self._room_id = entry.entry_id if entry.data.get("type") == ROOM else None
+        prefix = f"electric_heater_room_{entry.entry_id}" if self._room_id else zone_device_id(self._coordinator.zone)
+        self._attr_unique_id = f"{prefix}_{kind}"
+        if kind == "energy":
+            self._attr_name = "Énergie de Chauffe"
+            self._attr_device_class = SensorDeviceClass.ENERGY
+            self._attr_native_unit_of_measurement = UnitOfEnergy.KILO_WATT_HOUR
+            self._attr_suggested_display_precision = 2
+        else:
+            self._attr_name = "Temps de Chauffe"
+            self._attr_device_class = SensorDeviceClass.DURATION
+            self._attr_native_unit_of_measurement = UnitOfTime.HOURS
+            self._attr_suggested_display_precision = 1
+
+    @property
+    def device_info(self):
+        device_id = zone_device_id(self._coordinator.zone)
+        if self._room_id:
+            return {"identifiers": {(DOMAIN, f"room_{self._room_id}")}, "via_device": (DOMAIN, device_id)}
+        return {"identifiers": {(DOMAIN, device_id)}}
+
+    async def async_added_to_hass(self):
+        self.async_on_remove(self._coordinator.energy.add_listener(self._room_id, self._update))
+        self._update()
+
+    @callback
+    def _update(self):
+        energy = self._coordinator.energy
+        if self._room_id:
+            meter = energy.meter(self._room_id)
+            runtime, kwh = meter.runtime, meter.energy
+        else:
+            runtime, kwh = energy.total_runtime, energy.total_energy
+        self._attr_native_value = round(kwh, 3) if self._kind == "energy" else round(runtime / 3600, 3)
+        self.async_write_coalesced()
@@ -0,0 +1,101 @@
+"""Garde anti-cycles courts des radiateurs pour Chauffage Électrique Fil Pilote FR."""
+import time
+from dataclasses import dataclass
+from functools import partial
+from typing import Callable
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DEFAULT_MIN_DWELL, PRIORITY_SAFETY
+from .overrides import ExpiryTimers
+
+
+@dataclass(slots=True)
+class DwellRecord:
+    """État d'un radiateur : ordre en place et depuis quand, ordre retenu, transitions retenues."""
+
+    option: str
+    since: float
+    held: str | None = None
+    held_priority: int = 0
+    suppressed: int = 0
+
+
+class ShortCycleGuard:
+    """Durée minimale de maintien de chaque ordre, radiateur par radiateur.
+
+    Un ordre qui changerait l'état d'un radiateur moins de `min_dwell` secondes après
+    le précédent est retenu, puis envoyé à l'échéance par `release` ; un ordre plus
+    récent le remplace, le retour à l'ordre en place l'annule. Les ordres de sécurité
+    (fenêtre ouverte, délestage) passent toujours immédiatement. Les échéances de tous
+    les radiateurs partagent un seul minuteur.
+    """
+
+    def __init__(self, hass: HomeAssistant, release: Callable[[str, str, int], None], min_dwell: float = DEFAULT_MIN_DWELL):
+        self.min_dwell = min_dwell
+        self.suppressed = 0
+        self._records: dict[str, DwellRecord] = {}
+        self._timers = ExpiryTimers(hass)
+        self._release = release
+
+    def allow(self, select_id: str, option: str, priority: int) -> bool:
+        """Vrai si l'ordre peut partir ; sinon il est retenu jusqu'à la fin du maintien."""
+        record = self._records.get(select_id)
+        if record is None or option == record.option or priority == PRIORITY_SAFETY:
+            self.cancel(select_id)
+            return True
+        wait = record.since + self.min_dwell - time.monotonic()
+        if wait <= 0:
+            self.cancel(select_id)
+            return True
+        if record.held != option:
+            record.suppressed += 1
+            self.suppressed += 1
+        if record.held is None:
+            self._timers.schedule(select_id, wait, partial(self._fire, select_id))
+        record.held, record.held_priority = option, priority
+        return False
+
+    @callback
+    def record(self, select_id: str, option: str) -> None:
+        """Ordre réellement envoyé : le maintien repart s'il change l'état du radiateur."""
+        record = self._records.get(select_id)
+        if record is None:
+            self._records[select_id] = DwellRecord(option, time.monotonic())
+        elif record.option != option:
+            record.option, record.since = option, time.monotonic()
+
+    def held(self, select_id: str) -> str | None:
+        record = self._records.get(select_id)
+        return record.held if record else None
+
+    def suppressed_for(self, select_id: str) -> int:
+        record = self._records.get(select_id)
+        return record.suppressed if record else 0
+
+    @callback
+    def cancel(self, select_id: str) -> None:
+        record = self._records.get(select_id)
+        if record and record.held is not None:
+            record.held = None
+            self._timers.cancel(select_id)
+
+    @callback
+    def forget(self, select_id: str) -> None:
+        self.cancel(select_id)
+        self._records.pop(select_id, None)
+
+    @callback
+    def clear(self) -> None:
+        self._records.clear()
+        self._timers.clear()
+
+    @callback
+    def _fire(self, select_id: str) -> None:
+        record = self._records.get(select_id)
+        if record is None or record.held is None:
+            return
+        option, record.held = record.held, None
+        # Échéance atteinte : l'ordre retenu doit passer même si le minuteur part un peu en avance.
+        record.since = min(record.since, time.monotonic() - self.min_dwell)
+        self._release(select_id, option, record.held_priority)
@@ -0,0 +1,272 @@
+"""Optimisation tarifaire (Tempo, heures pleines / heures creuses) pour Chauffage Électrique Fil Pilote FR."""
+import bisect
+import logging
+import re
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import Callable
+
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later, async_track_state_change_event
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    PRESET_COMFORT,
+    PRESET_COMFORT_M1,
+    PRESET_COMFORT_M2,
+    PRESET_ECO,
+    DEFAULT_TARIFF_FLOOR,
+    DEFAULT_TARIFF_OFFPEAK_HOURS,
+    DEFAULT_TARIFF_PREHEAT,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Échelle des presets sur laquelle l'optimiseur descend en heures pleines chères.
+LADDER = [PRESET_COMFORT, PRESET_COMFORT_M1, PRESET_COMFORT_M2, PRESET_ECO]
+COLORS = {"bleu": "blue", "blue": "blue", "blanc": "white", "white": "white", "rouge": "red", "red": "red"}
+# Crans de baisse en heures pleines selon la couleur du jour.
+STEPS = {"blue": 0, "white": 1, "red": 2}
+OFFPEAK_STATES = {"on", "hc", "heures creuses", "heures_creuses", "offpeak", "off_peak"}
+PEAK_STATES = {"off", "hp", "heures pleines", "heures_pleines", "peak"}
+# Le plan couvre deux jours ; il est recalculé quand son dernier segment commence.
+PLAN_HORIZON = timedelta(days=2)
+
+
+def parse_color(value: object) -> str | None:
+    """Couleur Tempo d'un état (`Rouge`, `TEMPO_ROUGE`, `red`…), None si inconnue."""
+    words = re.split(r"[\s_]+", str(value or "").strip().lower())
+    return COLORS.get(words[-1])
+
+
+def parse_hours(text: str) -> list[tuple[int, int]]:
+    """Plages `22:00-06:00, 12:30-14:30` en minutes depuis minuit ; une plage peut passer minuit."""
+    ranges = []
+    for part in filter(None, (p.strip() for p in re.split(r"[,;]", text))):
+        try:
+            start, end = (int(h) * 60 + int(m) for h, m in (t.strip().split(":") for t in part.split("-")))
+        except ValueError as err:
+            raise ValueError(f"plage horaire invalide : {part}") from err
+        if not (0 <= start < 1440 and 0 <= end <= 1440) or start == end:
+            raise ValueError(f"plage horaire invalide : {part}")
+        ranges.append((start, end))
+    return ranges
+
+
+@dataclass
+class TariffCalendar:
+    """Calendrier local : une ligne `2026-01-15 rouge` par jour, `hc 22:00-06:00` pour les heures creuses."""
+
+    colors: dict[date, str]
+    offpeak_hours: list[tuple[int, int]] | None = None
+
+    @classmethod
+    def load(cls, path: str) -> "TariffCalendar":
+        """Lecture bloquante : à appeler dans l'exécuteur."""
+        colors: dict[date, str] = {}
+        hours = None
+        with open(path, encoding="utf-8") as file:
+            for number, line in enumerate(file, 1):
+                line = line.split("#", 1)[0].strip()
+                if not line:
+                    continue
+                key, _, value = line.partition(" ")
+                if key.lower() == "hc":
+                    hours = parse_hours(value)
+                    continue
+                try:
+                    day = date.fromisoformat(key)
+                except ValueError as err:
+                    raise ValueError(f"ligne {number} : date invalide {key}") from err
+                if (color := parse_color(value)) is None:
+                    raise ValueError(f"ligne {number} : couleur inconnue {value.strip()}")
+                colors[day] = color
+        return cls(colors, hours)
+
+
+@dataclass(frozen=True)
+class TariffStep:
+    """Segment du plan : jusqu'au segment suivant, heures creuses ou pleines d'une couleur donnée."""
+
+    start: datetime
+    offpeak: bool
+    color: str | None
+    preheat: bool = False
+
+
+class TariffOptimizer:
+    """Plan tarifaire d'une zone, appliqué par chaque pièce à son propre preset.
+
+    En heures pleines, les presets confort descendent d'un cran les jours blancs et de
+    deux les jours rouges, sans passer sous un plancher. Pendant la fin des heures creuses
+    qui précèdent des heures pleines chères, confort –1 et –2 remontent à confort pour
+    stocker la chaleur au tarif bas. Le plan (segments des deux prochains jours) n'est recalculé que
+    si une entrée change ; un seul minuteur est armé sur la prochaine frontière.
+    """
+
+    def __init__(self, hass: HomeAssistant):
+        self.hass = hass
+        self.plan: list[TariffStep] = []
+        self.color: str | None = None
+        self.offpeak = False
+        self.level = 0
+        self.preheat = False
+        self._color_entity: str | None = None
+        self._next_color_entity: str | None = None
+        self._offpeak_entity: str | None = None
+        self._calendar: TariffCalendar | None = None
+        self._offpeak_hours = parse_hours(DEFAULT_TARIFF_OFFPEAK_HOURS)
+        self._floor = LADDER.index(DEFAULT_TARIFF_FLOOR)
+        self._preheat = timedelta(minutes=DEFAULT_TARIFF_PREHEAT)
+        self._listeners: list[Callable[[], None]] = []
+        self._unsub_entities: Callable[[], None] | None = None
+        self._unsub_timer: Callable[[], None] | None = None
+        self.rebuilds = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._calendar or self._color_entity)
+
+    @property
+    def active(self) -> bool:
+        return self.level > 0 or self.preheat
+
+    def add_listener(self, listener: Callable[[], None]) -> Callable[[], None]:
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    def adjust(self, preset: str) -> str:
+        """Preset après optimisation ; éco, hors-gel et arrêt ne sont jamais relevés par le préchauffage."""
+        if preset not in LADDER or not self.active:
+            return preset
+        if self.preheat:
+            return PRESET_COMFORT if preset != PRESET_ECO else preset
+        index = LADDER.index(preset)
+        return LADDER[max(index, min(index + self.level, self._floor))]
+
+    @callback
+    def async_start(
+        self,
+        color_entity: str | None,
+        next_color_entity: str | None,
+        offpeak_entity: str | None,
+        calendar: TariffCalendar | None,
+        offpeak_hours: str | None,
+        floor: str | None,
+        preheat_minutes: float | None,
+    ) -> Callable[[], None]:
+        self.async_stop()
+        self._color_entity = color_entity
+        self._next_color_entity = next_color_entity
+        self._offpeak_entity = offpeak_entity
+        self._calendar = calendar
+        hours = calendar.offpeak_hours if calendar and calendar.offpeak_hours else None
+        self._offpeak_hours = hours or parse_hours(offpeak_hours or DEFAULT_TARIFF_OFFPEAK_HOURS)
+        self._floor = LADDER.index(floor or DEFAULT_TARIFF_FLOOR)
+        self._preheat = timedelta(minutes=DEFAULT_TARIFF_PREHEAT if preheat_minutes is None else preheat_minutes)
+        if entities := [e for e in (color_entity, next_color_entity, offpeak_entity) if e]:
+            self._unsub_entities = async_track_state_change_event(self.hass, entities, self._handle_input)
+        self._rebuild()
+        return self.async_stop
+
+    @callback
+    def async_stop(self) -> None:
+        for unsub in (self._unsub_entities, self._unsub_timer):
+            if unsub:
+                unsub()
+        self._unsub_entities = self._unsub_timer = None
+        self._color_entity = self._next_color_entity = self._offpeak_entity = None
+        self._calendar = None
+        self.plan = []
+        self._set(None, False, 0, False)
+
+    @callback
+    def _handle_input(self, event: Event) -> None:
+        # Une nouvelle couleur change le plan ; la période seule ne change que le segment courant.
+        if event.data.get("entity_id") == self._offpeak_entity:
+            self._evaluate()
+        else:
+            self._rebuild()
+
+    def _color_of(self, day: date, today: date) -> str | None:
+        if self._calendar and day in self._calendar.colors:
+            return self._calendar.colors[day]
+        entity = {today: self._color_entity, today + timedelta(days=1): self._next_color_entity}.get(day)
+        state = self.hass.states.get(entity) if entity else None
+        return parse_color(state.state) if state else None
+
+    def build_plan(self, now: datetime) -> list[TariffStep]:
+        """Segments heures creuses / pleines de `now` à l'horizon, avec leur couleur et le préchauffage."""
+        today = now.date()
+        offpeak: list[tuple[datetime, datetime]] = []
+        for offset in range(-1, PLAN_HORIZON.days + 1):
+            day = today + timedelta(days=offset)
+            midnight = datetime.combine(day, time(), now.tzinfo)
+            for start, end in self._offpeak_hours:
+                end += 1440 if end <= start else 0
+                offpeak.append((midnight + timedelta(minutes=start), midnight + timedelta(minutes=end)))
+        offpeak.sort()
+
+        # Frontières : débuts et fins d'heures creuses dans l'horizon.
+        bounds = sorted({now, *(t for span in offpeak for t in span if now < t < now + PLAN_HORIZON)})
+        steps: list[TariffStep] = []
+        for start in bounds:
+            is_offpeak = any(s <= start < e for s, e in offpeak)
+            color = None if is_offpeak else self._color_of(start.date(), today)
+            if steps and steps[-1].offpeak == is_offpeak and steps[-1].color == color:
+                continue
+            steps.append(TariffStep(start, is_offpeak, color))
+
+        # Préchauffage : fin des heures creuses qui précèdent des heures pleines blanches ou rouges.
+        planned: list[TariffStep] = []
+        for index, step in enumerate(steps):
+            following = steps[index + 1] if index + 1 < len(steps) else None
+            if step.offpeak and following and STEPS.get(following.color, 0) and self._preheat:
+                preheat_at = max(step.start, following.start - self._preheat)
+                if preheat_at > step.start:
+                    planned.append(step)
+                planned.append(TariffStep(preheat_at, True, None, preheat=True))
+            else:
+                planned.append(step)
+        return planned
+
+    @callback
+    def _rebuild(self) -> None:
+        self.rebuilds += 1
+        self.plan = self.build_plan(dt_util.now())
+        self._evaluate()
+
+    @callback
+    def _evaluate(self, _now=None) -> None:
+        if self._unsub_timer:
+            self._unsub_timer()
+            self._unsub_timer = None
+        now = dt_util.now()
+        index = bisect.bisect_right([step.start for step in self.plan], now) - 1
+        if not self.plan or index >= len(self.plan) - 1:
+            # Dernier segment atteint : le plan suivant couvre de nouveau deux jours.
+            self.plan = self.build_plan(now)
+            self.rebuilds += 1
+            index = 0
+        step = self.plan[max(index, 0)]
+        offpeak = step.offpeak
+        state = self.hass.states.get(self._offpeak_entity) if self._offpeak_entity else None
+        if state and state.state.lower() in OFFPEAK_STATES | PEAK_STATES:
+            # Le compteur fait foi sur la période en cours ; le plan ne sert qu'à anticiper.
+            offpeak = state.state.lower() in OFFPEAK_STATES
+        color = step.color or self._color_of(now.date(), now.date())
+        level = 0 if offpeak else STEPS.get(color, 0)
+        self._set(color, offpeak, level, step.preheat and offpeak)
+        if index + 1 < len(self.plan):
+            delay = (self.plan[index + 1].start - now).total_seconds()
+            self._unsub_timer = async_call_later(self.hass, max(delay, 1.0), self._evaluate)
+
+    @callback
+    def _set(self, color: str | None, offpeak: bool, level: int, preheat: bool) -> None:
+        # Couleur et période sont publiées aussi : tout changement est notifié, même sans effet sur les ordres.
+        changed = (color, offpeak, level, preheat) != (self.color, self.offpeak, self.level, self.preheat)
+        self.color, self.offpeak, self.level, self.preheat = color, offpeak, level, preheat
+        if changed:
+            _LOGGER.debug("Tarif : couleur %s, heures creuses %s, %d cran(s), préchauffage %s", color, offpeak, level, preheat)
+            for listener in list(self._listeners):
+                listener()
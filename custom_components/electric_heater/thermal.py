@@ -0,0 +1,152 @@
+"""Modèle thermique appris en ligne pour Chauffage Électrique Fil Pilote FR."""
+import logging
+import math
+import time
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN, MAX_PREHEAT_MINUTES
+
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.thermal_models"
+SAVE_DELAY = 600
+
+# Écart minimal entre deux points d'apprentissage : en dessous, la résolution de 0,1 °C
+# des sondes domine la pente mesurée.
+MIN_SAMPLE_SECONDS = 600
+MAX_SAMPLE_SECONDS = 7200
+MIN_SAMPLES = 12
+FORGETTING = 0.998
+MAX_COVARIANCE = 1e4
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ThermalModel:
+    """Modèle RC du premier ordre : dT/dt = a·(T_ext − T) + b·u, en °C par heure.
+
+    `a` est l'inverse de la constante de temps de la pièce, `b` le gain du radiateur ;
+    `u` est la part de l'intervalle passée à chauffer. Les deux paramètres sont ajustés
+    par moindres carrés récursifs avec oubli, en mémoire constante.
+    """
+
+    __slots__ = ("a", "b", "p", "samples", "_anchor", "_heat_seconds", "_heating", "_last")
+
+    def __init__(self, data: dict[str, Any] | None = None):
+        data = data or {}
+        self.a: float = data.get("a", 0.0)
+        self.b: float = data.get("b", 0.0)
+        self.p: list[float] = list(data.get("p", (100.0, 0.0, 0.0, 100.0)))
+        self.samples: int = data.get("n", 0)
+        self._anchor: tuple[float, float] | None = None
+        self._heat_seconds = 0.0
+        self._heating = False
+        self._last = 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"a": self.a, "b": self.b, "p": self.p, "n": self.samples}
+
+    @property
+    def ready(self) -> bool:
+        return self.samples >= MIN_SAMPLES and self.a > 0 and self.b > 0
+
+    def reset_anchor(self) -> None:
+        """Interrompt l'apprentissage en cours (fenêtre ouverte, sonde indisponible)."""
+        self._anchor = None
+
+    def observe(self, temperature: float, heating: bool, outdoor: float, now: float | None = None) -> bool:
+        """Ajoute une mesure ; renvoie True si les paramètres ont été mis à jour."""
+        now = time.monotonic() if now is None else now
+        if self._anchor is None:
+            self._start(now, temperature, heating)
+            return False
+        if self._heating:
+            self._heat_seconds += now - self._last
+        self._last = now
+        self._heating = heating
+        start, start_temp = self._anchor
+        elapsed = now - start
+        if elapsed > MAX_SAMPLE_SECONDS:
+            self._start(now, temperature, heating)
+            return False
+        if elapsed < MIN_SAMPLE_SECONDS:
+            return False
+        slope = (temperature - start_temp) * 3600 / elapsed
+        self._fit(outdoor - (start_temp + temperature) / 2, self._heat_seconds / elapsed, slope)
+        self._start(now, temperature, heating)
+        return True
+
+    def _start(self, now: float, temperature: float, heating: bool) -> None:
+        self._anchor = (now, temperature)
+        self._heat_seconds = 0.0
+        self._heating = heating
+        self._last = now
+
+    def _fit(self, x1: float, x2: float, y: float) -> None:
+        p11, p12, p21, p22 = self.p
+        px1 = p11 * x1 + p12 * x2
+        px2 = p21 * x1 + p22 * x2
+        gain = FORGETTING + x1 * px1 + x2 * px2
+        k1, k2 = px1 / gain, px2 / gain
+        error = y - (self.a * x1 + self.b * x2)
+        self.a += k1 * error
+        self.b += k2 * error
+        # Sans excitation (radiateur jamais en chauffe), l'oubli ferait diverger la covariance.
+        forget = FORGETTING if p11 + p22 < MAX_COVARIANCE else 1.0
+        self.p = [
+            (p11 - k1 * px1) / forget,
+            (p12 - k1 * px2) / forget,
+            (p21 - k2 * px1) / forget,
+            (p22 - k2 * px2) / forget,
+        ]
+        self.samples += 1
+
+    def time_to_reach(self, current: float, target: float, outdoor: float) -> float | None:
+        """Durée de chauffe estimée (s) pour passer de `current` à `target`, ou None si le modèle n'est pas prêt."""
+        if not self.ready:
+            return None
+        if current >= target:
+            return 0.0
+        limit = MAX_PREHEAT_MINUTES * 60
+        equilibrium = outdoor + self.b / self.a
+        if equilibrium <= target:
+            return float(limit)
+        hours = math.log((equilibrium - current) / (equilibrium - target)) / self.a
+        return min(hours * 3600, limit)
+
+
+class ThermalModels:
+    """Modèles de toutes les pièces, enregistrés en différé pour limiter les écritures disque."""
+
+    def __init__(self, hass: HomeAssistant):
+        self._store: Store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._saved: dict[str, dict[str, Any]] = {}
+        self._models: dict[str, ThermalModel] = {}
+
+    async def async_load(self) -> None:
+        if data := await self._store.async_load():
+            self._saved = dict(data)
+
+    def get(self, room_id: str) -> ThermalModel:
+        if room_id not in self._models:
+            self._models[room_id] = ThermalModel(self._saved.get(room_id))
+        return self._models[room_id]
+
+    @callback
+    def async_schedule_save(self) -> None:
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    async def async_save(self) -> None:
+        await self._store.async_save(self._data_to_save())
+
+    async def async_forget(self, room_id: str) -> None:
+        """Pièce supprimée : son modèle n'est plus enregistré."""
+        self._models.pop(room_id, None)
+        if self._saved.pop(room_id, None) is not None:
+            await self.async_save()
+
+    def _data_to_save(self) -> dict[str, dict[str, Any]]:
+        self._saved.update({room_id: model.as_dict() for room_id, model in self._models.items()})
+        return dict(self._saved)
@@ -0,0 +1,83 @@
+"""Minuteur unique sur un tas d'échéances pour Chauffage Électrique Fil Pilote FR."""
+import heapq
+import itertools
+import time
+from typing import Callable, Generic, Iterable, TypeVar
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+T = TypeVar("T")
+
+
+class HeapTimer(Generic[T]):
+    """Échéances rangées dans un tas, un seul minuteur armé sur la plus proche.
+
+    À l'échéance, `on_due(when, item)` est appelé pour chaque élément échu, dans l'ordre ;
+    un élément ajouté pendant ces appels n'arme le minuteur qu'à la fin du passage, et il
+    est traité dans le même passage s'il est déjà échu. Un réveil en avance ne traite rien
+    et réarme sur le temps restant. Les échéances périmées restent dans le tas : `on_due`
+    les ignore, et `rebuild` permet de le compacter. Les instants suivent `time.monotonic`.
+    """
+
+    def __init__(self, hass: HomeAssistant, on_due: Callable[[float, T], None]):
+        self.hass = hass
+        self._on_due = on_due
+        self._heap: list[tuple[float, int, T]] = []
+        self._seq = itertools.count()
+        self._unsub_timer: Callable[[], None] | None = None
+        self._timer_at: float | None = None
+        self._firing = False
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    @callback
+    def push(self, when: float, item: T) -> None:
+        heapq.heappush(self._heap, (when, next(self._seq), item))
+        if not self._firing and (self._timer_at is None or when < self._timer_at):
+            self._arm(when)
+
+    @callback
+    def rebuild(self, entries: Iterable[tuple[float, T]]) -> None:
+        """Remplace tout le contenu du tas par `entries` (instant, élément)."""
+        self._heap = [(when, next(self._seq), item) for when, item in entries]
+        heapq.heapify(self._heap)
+        if self._heap:
+            self._arm(self._heap[0][0])
+        else:
+            self._cancel()
+
+    @callback
+    def clear(self) -> None:
+        self._heap.clear()
+        self._cancel()
+
+    @callback
+    def _cancel(self) -> None:
+        if self._unsub_timer:
+            self._unsub_timer()
+            self._unsub_timer = None
+        self._timer_at = None
+
+    @callback
+    def _arm(self, when: float) -> None:
+        if self._unsub_timer:
+            self._unsub_timer()
+        self._timer_at = when
+        self._unsub_timer = async_call_later(self.hass, max(0.0, when - time.monotonic()), self._fire)
+
+    @callback
+    def _fire(self, _now=None) -> None:
+        self._unsub_timer = None
+        self._timer_at = None
+        self._firing = True
+        now = time.monotonic()
+        try:
+            while self._heap and self._heap[0][0] <= now:
+                when, _, item = heapq.heappop(self._heap)
+                self._on_due(when, item)
+        finally:
+            self._firing = False
+            if self._heap:
+                self._arm(self._heap[0][0])
@@ -0,0 +1,107 @@
+"""Détection de fenêtre ouverte par chute de température pour Chauffage Électrique Fil Pilote FR."""
+import time
+from typing import Callable
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+from .const import DEFAULT_WINDOW_DROP_RATE, DEFAULT_WINDOW_TIMEOUT
+
+# Taille du tampon de mesures et nombre minimal de points pour estimer la pente.
+SAMPLES = 6
+MIN_SAMPLES = 3
+# La pente n'est estimée que sur au moins cette durée, pour ne pas réagir au bruit de la sonde.
+MIN_SPAN_SECONDS = 120
+# Durée minimale de coupure avant qu'une remontée ne vaille fermeture.
+MIN_OPEN_SECONDS = 300
+
+
+class WindowDetector:
+    """Pente glissante des dernières mesures d'une pièce ; ouverte sur chute brutale.
+
+    Les mesures sont rangées dans un tampon circulaire de taille fixe : chaque mesure
+    coûte le même temps quel que soit le nombre de pièces. La détection retombe quand
+    la température se remet à monter, ou au bout du délai configuré.
+    """
+
+    def __init__(self, hass: HomeAssistant, drop_rate: float | None = None, timeout: float | None = None):
+        self.hass = hass
+        self.configure(drop_rate, timeout)
+        self.detected = False
+        self._times = [0.0] * SAMPLES
+        self._values = [0.0] * SAMPLES
+        self._count = 0
+        self._index = 0
+        self._detected_at = 0.0
+        self._listeners: list[Callable[[], None]] = []
+        self._unsub_timeout: Callable[[], None] | None = None
+
+    def configure(self, drop_rate: float | None = None, timeout: float | None = None) -> None:
+        """Seuil de chute (°C/min) et durée maximale de détection (min) ; pris en compte dès la mesure suivante."""
+        self.drop_rate = drop_rate or DEFAULT_WINDOW_DROP_RATE
+        self.timeout = (timeout or DEFAULT_WINDOW_TIMEOUT) * 60
+
+    def add_listener(self, listener: Callable[[], None]) -> Callable[[], None]:
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    @callback
+    def add_sample(self, value: float | None, now: float | None = None) -> None:
+        if value is None:
+            return
+        now = time.monotonic() if now is None else now
+        self._times[self._index] = now
+        self._values[self._index] = value
+        self._index = (self._index + 1) % SAMPLES
+        self._count = min(self._count + 1, SAMPLES)
+        slope = self._slope()
+        if slope is None:
+            return
+        if not self.detected and slope <= -self.drop_rate:
+            self._set(True, now)
+        elif self.detected and slope >= 0 and now - self._detected_at >= MIN_OPEN_SECONDS:
+            self._set(False, now)
+
+    def _slope(self) -> float | None:
+        """Pente des moindres carrés, en °C par minute."""
+        if self._count < MIN_SAMPLES:
+            return None
+        points = range(self._count)
+        times = [self._times[i] for i in points]
+        origin = min(times)
+        if max(times) - origin < MIN_SPAN_SECONDS:
+            return None
+        xs = [(t - origin) / 60 for t in times]
+        ys = [self._values[i] for i in points]
+        mean_x = sum(xs) / self._count
+        mean_y = sum(ys) / self._count
+        variance = sum((x - mean_x) ** 2 for x in xs)
+        return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / variance
+
+    @callback
+    def _set(self, detected: bool, now: float) -> None:
+        self.detected = detected
+        self._detected_at = now
+        # On ne garde que la dernière mesure : la pente suivante ne porte que sur la suite.
+        last = (self._index - 1) % SAMPLES
+        self._times[0], self._values[0] = self._times[last], self._values[last]
+        self._index, self._count = 1, 1
+        if self._unsub_timeout:
+            self._unsub_timeout()
+            self._unsub_timeout = None
+        if detected:
+            self._unsub_timeout = async_call_later(self.hass, self.timeout, self._expire)
+        for listener in list(self._listeners):
+            listener()
+
+    @callback
+    def _expire(self, _now=None) -> None:
+        self._unsub_timeout = None
+        if self.detected:
+            self._set(False, time.monotonic())
+
+    @callback
+    def async_stop(self) -> None:
+        if self._unsub_timeout:
+            self._unsub_timeout()
+            self._unsub_timeout = None